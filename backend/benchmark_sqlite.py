@@ -0,0 +1,138 @@
+"""
+SQLite profile benchmark: default connection settings vs the SQLITE_* profile.
+Builds a synthetic database in a temp dir for each run and measures
+per-row commit throughput, read throughput and a mixed readers/writer load.
+
+Usage: python -m backend.benchmark_sqlite [--posts 5000] [--snapshots 20] [--seconds 5]
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event, func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from backend.db import Base, apply_sqlite_profile
+from backend.models import Post, PostMetricSnapshot
+
+
+def make_engine(path: str, tuned: bool):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    if tuned:
+        event.listen(engine, "connect", lambda conn, record: apply_sqlite_profile(conn))
+    return engine
+
+
+def seed(engine, posts: int, snapshots: int):
+    Base.metadata.create_all(engine)
+    now = datetime(2026, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(Post.__table__.insert(), [{
+            "content": f"Synthetic post {i}",
+            "status": random.choice(["sent"] * 8 + ["scheduled", "draft"]),
+            "username": f"user{i % 3}",
+            "tweet_id": str(10_000_000 + i),
+            "views_count": random.randint(0, 5000),
+            "likes_count": random.randint(0, 200),
+            "created_at": now - timedelta(hours=i),
+            "updated_at": now - timedelta(hours=i),
+            "is_repost": False
+        } for i in range(posts)])
+        conn.execute(PostMetricSnapshot.__table__.insert(), [{
+            "post_id": 1 + (i % posts),
+            "views": i,
+            "likes": i // 10,
+            "timestamp": now - timedelta(minutes=i)
+        } for i in range(posts * snapshots)])
+
+
+def read_once(Session, posts: int):
+    db = Session()
+    try:
+        db.query(func.count(Post.id), func.sum(Post.views_count)).filter(Post.status == "sent", Post.is_repost.isnot(True)).first()
+        db.query(PostMetricSnapshot).filter(PostMetricSnapshot.post_id == random.randint(1, posts))\
+            .order_by(PostMetricSnapshot.timestamp.desc()).first()
+    finally:
+        db.close()
+
+
+def write_once(Session, posts: int):
+    # Same shape as the analytics loop: one snapshot + post update, one commit
+    db = Session()
+    try:
+        post_id = random.randint(1, posts)
+        db.add(PostMetricSnapshot(post_id=post_id, views=1, timestamp=datetime.now()))
+        db.query(Post).filter(Post.id == post_id).update({Post.views_count: Post.views_count + 1})
+        db.commit()
+    finally:
+        db.close()
+
+
+def timed(fn, seconds: float) -> int:
+    done = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        fn()
+        done += 1
+    return done
+
+
+def mixed(Session, posts: int, seconds: float, readers: int = 4):
+    counts = {"reads": 0, "writes": 0, "locked": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def loop(op, key):
+        while time.perf_counter() < deadline:
+            try:
+                op(Session, posts)
+                with lock:
+                    counts[key] += 1
+            except OperationalError as e:
+                if "locked" not in str(e):
+                    raise
+                with lock:
+                    counts["locked"] += 1
+
+    threads = [threading.Thread(target=loop, args=(read_once, "reads")) for _ in range(readers)]
+    threads.append(threading.Thread(target=loop, args=(write_once, "writes")))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return counts
+
+
+def run(label: str, tuned: bool, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(os.path.join(tmp, "bench.db"), tuned)
+        seed(engine, args.posts, args.snapshots)
+        Session = sessionmaker(bind=engine)
+
+        writes = timed(lambda: write_once(Session, args.posts), args.seconds)
+        reads = timed(lambda: read_once(Session, args.posts), args.seconds)
+        load = mixed(Session, args.posts, args.seconds)
+        engine.dispose()
+
+    print(f"{label:<8} commits/s: {writes / args.seconds:8.0f}   reads/s: {reads / args.seconds:8.0f}   "
+          f"mixed reads/s: {load['reads'] / args.seconds:8.0f}   mixed commits/s: {load['writes'] / args.seconds:6.0f}   "
+          f"locked errors: {load['locked']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--snapshots", type=int, default=20, help="snapshots per post")
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration of each measurement")
+    args = parser.parse_args()
+
+    print(f"Dataset: {args.posts} posts, {args.posts * args.snapshots} snapshots, {args.seconds}s per measurement")
+    run("default", False, args)
+    run("tuned", True, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,15 @@ class Settings(BaseSettings):
     PORT: int = 8000
     HOST: str = "0.0.0.0"
     
+    # SQLite connection profile (ignored for other databases)
+    SQLITE_TUNING: bool = True
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE: int = -20000 # Negative = KiB (~20 MB)
+    SQLITE_MMAP_SIZE: int = 268435456 # 256 MB
+    SQLITE_TEMP_STORE: str = "MEMORY"
+    
     # X Credentials
     X_USERNAME: Optional[str] = None
     X_PASSWORD: Optional[str] = None
@@ -17,6 +26,38 @@ class Settings(BaseSettings):
     # Security
     ADMIN_TOKEN: Optional[str] = "196677d"
 
+    # Read paths (stats, import, session check): "http" tries plain requests first, "browser" always uses Playwright
+    READ_TRANSPORT: str = "http"
+    X_HTTP_BASE_URL: str = "https://x.com"
+    X_HTTP_TIMEOUT: float = 15.0
+    X_GRAPHQL_TWEET_QUERY_ID: str = "Xl5pC_lBk_gcO2ItU39DQw"
+
+    # Scheduler
+    SCHEDULER_SAFETY_SCAN_MINUTES: int = 5
+    # Browsers publishing at the same time (each account still publishes one post at a time)
+    PUBLISH_CONCURRENCY: int = 2
+    # Publish claims expire if not renewed (the heartbeat renews every LEASE_SECONDS / 3)
+    LEASE_SECONDS: int = 120
+    # Failed posts retry with exponential backoff + jitter: base, 2x base, 4x base... capped
+    PUBLISH_MAX_RETRIES: int = 3
+    RETRY_BASE_SECONDS: int = 300
+    RETRY_MAX_SECONDS: int = 3600
+    # A post whose content the same account already published in the last N days fails
+    # before the browser is launched, without retries (0 = any time)
+    DUPLICATE_CHECK_DAYS: int = 30
+    # Startup backlog drain: one overdue post per account every N seconds.
+    # Posts overdue by more than BACKLOG_STALE_HOURS: "publish", "skip" (to draft) or "reschedule" (next day)
+    BACKLOG_RELEASE_SECONDS: int = 120
+    BACKLOG_STALE_HOURS: int = 24
+    BACKLOG_STALE_POLICY: str = "publish"
+    # Analytics: max posts scraped per refresh cycle (most overdue first)
+    ANALYTICS_SCRAPE_BUDGET: int = 20
+    # Snapshot compaction: raw snapshots for N days, then hourly rollups, then daily rollups.
+    # Daily rollups older than SNAPSHOT_RETENTION_DAYS are deleted (0 = keep forever)
+    SNAPSHOT_RAW_DAYS: int = 7
+    SNAPSHOT_HOURLY_DAYS: int = 90
+    SNAPSHOT_RETENTION_DAYS: int = 0
+
     @field_validator("DATABASE_URL", mode="before")
     @classmethod
     def validate_database_url(cls, v: str) -> str:
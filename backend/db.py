@@ -1,6 +1,7 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from backend.config import settings
 
 # Engine Configuration
@@ -11,13 +12,64 @@ engine = create_engine(
     connect_args=connect_args
 )
 
+def sqlite_profile() -> dict:
+    """PRAGMAs applied to every SQLite connection (see SQLITE_* settings)."""
+    return {
+        # WAL: readers don't block the writer and vice versa
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        # NORMAL is durable in WAL mode except for the last commits on power loss
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        # Wait for a lock instead of failing right away with "database is locked"
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+        "cache_size": settings.SQLITE_CACHE_SIZE,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "temp_store": settings.SQLITE_TEMP_STORE,
+    }
+
+def apply_sqlite_profile(dbapi_connection, profile: dict = None):
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma, value in (profile or sqlite_profile()).items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+    finally:
+        cursor.close()
+
+if settings.DATABASE_URL.startswith("sqlite") and settings.SQLITE_TUNING:
+    @event.listens_for(engine, "connect")
+    def _on_sqlite_connect(dbapi_connection, connection_record):
+        apply_sqlite_profile(dbapi_connection)
+
+def async_database_url(url: str) -> str:
+    """Same database through an asyncio driver (aiosqlite / asyncpg)."""
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+# Async engine for coroutines (scheduler jobs, async routes) so queries don't block the event loop.
+# The sync engine above stays for sync routes, startup and scripts.
+async_engine = create_async_engine(async_database_url(settings.DATABASE_URL))
+
+if settings.DATABASE_URL.startswith("sqlite") and settings.SQLITE_TUNING:
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _on_async_sqlite_connect(dbapi_connection, connection_record):
+        apply_sqlite_profile(dbapi_connection)
+
 Base = declarative_base()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# expire_on_commit=False: attributes stay readable after commit without an implicit (sync) refresh
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
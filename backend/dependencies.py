@@ -1,5 +1,9 @@
-from fastapi import Header, HTTPException, Request
+from typing import Callable, List, Optional
+from fastapi import Depends, Header, HTTPException, Request, Response
+from sqlalchemy.orm import Session
 from backend.config import settings
+from backend.db import get_db
+from backend.services.data_versions import NotModified, etag_matches, resource_etag
 from loguru import logger
 
 async def verify_token(request: Request, x_admin_token: str = Header(None)):
@@ -21,3 +25,24 @@ async def verify_token(request: Request, x_admin_token: str = Header(None)):
             logger.warning(f"Auth Failed. {debug_msg}")
             raise HTTPException(status_code=401, detail=f"Invalid token. Debug: {debug_msg}")
     return x_admin_token
+
+def conditional_get(tables: List[str], windowed: bool = False, extra: Optional[Callable[[], str]] = None):
+    """
+    Dependency for GET endpoints that read `tables`: answers 304 when If-None-Match still
+    matches their data versions, otherwise tags the response with an ETag.
+    windowed: the response covers a sliding time window (see WINDOW_BUCKET_SECONDS).
+    extra: fingerprint of state kept outside the database (e.g. account files).
+    """
+    def check(request: Request, response: Response, db: Session = Depends(get_db)):
+        if request.method != "GET":
+            return
+        key = f"{request.url.path}?{request.url.query}"
+        etag = resource_etag(db, tables, key, windowed, extra() if extra else "")
+        if etag is None:
+            return
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            raise NotModified(etag)
+        response.headers["ETag"] = etag
+        # Cache, but revalidate every time: the browser sends If-None-Match on refetches
+        response.headers["Cache-Control"] = "no-cache"
+    return check
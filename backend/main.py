@@ -7,7 +7,7 @@ from datetime import datetime
 if sys.platform == 'win32':
     asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
 
-from fastapi import FastAPI, Header, HTTPException, Depends, Request
+from fastapi import FastAPI, Header, HTTPException, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from .db import engine, Base, SessionLocal
 from fastapi.staticfiles import StaticFiles
@@ -23,9 +23,6 @@ logger.add(sys.stderr, format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <leve
 # LOG_PATH se define más abajo, así que usamos settings.DATA_DIR aquí o movemos la lógica
 logger.add(os.path.join(settings.DATA_DIR, "logs", "backend.log"), rotation="10 MB", retention="10 days", level="INFO")
 
-# Create tables
-Base.metadata.create_all(bind=engine)
-
 app = FastAPI(title="X Scheduler")
 
 # Ensure data, uploads and logs directory exists
@@ -59,6 +56,12 @@ async def log_requests(request: Request, call_next):
     return response
 
 from .dependencies import verify_token
+from .services.data_versions import NotModified
+
+@app.exception_handler(NotModified)
+async def not_modified(request: Request, exc: NotModified):
+    # Conditional GET hit: the client's copy is current, no body
+    return Response(status_code=304, headers={"ETag": exc.etag, "Cache-Control": "no-cache"})
 
 app.include_router(posts.router, prefix="/api/posts", tags=["posts"], dependencies=[Depends(verify_token)])
 app.include_router(upload.router, prefix="/api/upload", tags=["upload"], dependencies=[Depends(verify_token)])
@@ -70,15 +73,23 @@ app.include_router(health.router, prefix="/api/health", tags=["health"])
 async def startup_event():
     logger.info("Application starting up...")
     
-    # Run DB Migrations
+    # Create tables and run pending DB migrations (versioned, skipped when up to date)
     from .migrate import run_migrations
     run_migrations()
     
     from .scheduler import start_scheduler
     logger.info("Starting scheduler...")
-    start_scheduler()
+    await start_scheduler()
     logger.info("Scheduler started successfully.")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Release pooled HTTP connections of the read transport
+    from worker.http_transport import get_read_transport
+    transport = get_read_transport()
+    if transport:
+        await transport.aclose()
+
 
 
 from fastapi.responses import HTMLResponse
@@ -9,7 +9,7 @@ from sqlalchemy.orm import sessionmaker
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from backend.config import settings
-from backend.models import Post, PostMetricSnapshot
+from backend.models import Post, PostMetricSnapshot, PostMetricRollup, PostMetricLatest
 
 def cleanup_instagram_orphans():
     db_url = settings.DATABASE_URL
@@ -34,6 +34,8 @@ def cleanup_instagram_orphans():
             
             # Delete associated snapshots
             session.query(PostMetricSnapshot).filter(PostMetricSnapshot.post_id == post.id).delete()
+            session.query(PostMetricRollup).filter(PostMetricRollup.post_id == post.id).delete()
+            session.query(PostMetricLatest).filter(PostMetricLatest.post_id == post.id).delete()
             
             # Cleanup media files
             if post.media_paths:
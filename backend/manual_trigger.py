@@ -2,11 +2,14 @@
 Manual trigger for scheduled posts - for testing
 """
 import asyncio
-from backend.scheduler import check_scheduled_posts
+from backend.scheduler import check_scheduled_posts, submit_due_posts, publish_post
+from backend.services.dispatcher import dispatcher
 
 async def main():
     print("Manually triggering scheduled posts check...")
+    await dispatcher.start(submit_due_posts, publish_post)
     await check_scheduled_posts()
+    await dispatcher.wait_idle()
     print("Done!")
 
 if __name__ == "__main__":
@@ -1,192 +1,364 @@
+from datetime import datetime, timezone
 from sqlalchemy import text, inspect
-from backend.db import engine
+from backend.db import engine, Base
+from backend.services.refresh_planner import REFRESH_TIERS
+from backend.services.content_hash import content_hash
+from backend.services.data_versions import install_version_triggers
+from backend.services.daily_stats import install_daily_stats_triggers, rebuild_daily_stats
+from backend.services.media_service import describe_file, parse_media_paths
+from backend.services.search import install_search_index
 from loguru import logger
 
+# Versioned migrations.
+# Each step runs once, in order, in its own transaction, and is recorded in schema_migrations.
+# Steps stay idempotent (they check columns first) so databases that predate the version
+# table, or were created by create_all with the final schema, go through them safely.
+# Never edit or reorder an applied step: append a new one.
+# Steps spell out their DDL and queries (text() and explicit column lists) instead of going
+# through the ORM models: the models describe the latest schema, a step runs against the
+# schema as it was when the step was written.
+
+
+def _columns(conn, table):
+    inspector = inspect(conn)
+    if not inspector.has_table(table):
+        return None
+    return {col["name"] for col in inspector.get_columns(table)}
+
+
+def _add_columns(conn, table, definitions):
+    """Adds the (name, DDL type) columns missing from table. Returns the names added."""
+    columns = _columns(conn, table)
+    if columns is None:
+        return []
+    added = []
+    for name, ddl in definitions:
+        if name not in columns:
+            logger.info(f"Migrating: Adding {name} column to {table}")
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+            added.append(name)
+    return added
+
+
+def _post_metric_columns(conn):
+    # Legacy rows may have NULL counters from before the DEFAULT existed
+    existing = _columns(conn, "posts") or set()
+    _add_columns(conn, "posts", [
+        ("views_count", "INTEGER DEFAULT 0"),
+        ("likes_count", "INTEGER DEFAULT 0"),
+        ("reposts_count", "INTEGER DEFAULT 0"),
+    ])
+    for name in ("views_count", "likes_count", "reposts_count"):
+        if name in existing:
+            conn.execute(text(f"UPDATE posts SET {name} = 0 WHERE {name} IS NULL"))
+
+    _add_columns(conn, "posts", [
+        ("tweet_id", "VARCHAR(255)"),
+        ("username", "VARCHAR(255)"),
+        ("media_url", "VARCHAR(500)"), # thumbnails
+        ("is_repost", "BOOLEAN DEFAULT FALSE"),
+        ("bookmarks_count", "INTEGER DEFAULT 0"),
+        ("replies_count", "INTEGER DEFAULT 0"),
+        ("tags", "VARCHAR(500)"),
+        ("url_link_clicks", "INTEGER DEFAULT 0"),
+        ("user_profile_clicks", "INTEGER DEFAULT 0"),
+        ("detail_expands", "INTEGER DEFAULT 0"),
+    ])
+
+
+def _snapshot_metric_columns(conn):
+    _add_columns(conn, "post_metrics_snapshots", [
+        ("bookmarks", "INTEGER DEFAULT 0"),
+        ("replies", "INTEGER DEFAULT 0"),
+        ("url_link_clicks", "INTEGER DEFAULT 0"),
+        ("user_profile_clicks", "INTEGER DEFAULT 0"),
+        ("detail_expands", "INTEGER DEFAULT 0"),
+    ])
+
+
+def _sanitize_legacy_data(conn):
+    # Fix 500 Errors from NULLs in legacy rows
+    conn.execute(text("UPDATE posts SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL"))
+    conn.execute(text("UPDATE posts SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL"))
+    conn.execute(text("UPDATE posts SET content = '(No content)' WHERE content IS NULL"))
+
+
+def _deduplicate_posts(conn):
+    # 1. Deduplicate by tweet_id (strict duplicates): keep the newest row
+    conn.execute(text("""
+        DELETE FROM posts
+        WHERE id NOT IN (
+            SELECT MAX(id)
+            FROM posts
+            WHERE tweet_id IS NOT NULL
+            GROUP BY tweet_id
+        )
+        AND tweet_id IS NOT NULL
+    """))
+
+    # 2. Match Imports to Drafts (Fuzzy Match)
+    # A draft whose first 30 characters match an imported tweet is the draft that
+    # should have been merged into the import, so it is deleted.
+    # This handles cases where X modifies whitespace or links.
+    conn.execute(text("""
+        DELETE FROM posts
+        WHERE tweet_id IS NULL
+        AND EXISTS (
+            SELECT 1
+            FROM posts p2
+            WHERE p2.tweet_id IS NOT NULL
+            AND p2.id != posts.id
+            AND substr(p2.content, 1, 30) = substr(posts.content, 1, 30)
+        )
+        AND length(content) > 15
+    """))
+
+    # 3. Clean up specific noise (pizzeria retweet)
+    conn.execute(text("""
+        DELETE FROM posts
+        WHERE content LIKE '%La pizzeria 24/7 cerca del pentágono esta repotando%'
+    """))
+
+
+def _publish_leases(conn):
+    _add_columns(conn, "posts", [
+        ("lease_owner", "VARCHAR(255)"),
+        ("lease_expires_at", "TIMESTAMP"),
+    ])
+
+
+def _retry_schedule(conn):
+    if _add_columns(conn, "posts", [("next_attempt_at", "TIMESTAMP")]):
+        # Failed posts that still had retries left under the old rule retry on the next scan
+        conn.execute(text("UPDATE posts SET next_attempt_at = CURRENT_TIMESTAMP WHERE status = 'failed' AND retry_count < 3"))
+
+
+def _refresh_schedule(conn):
+    if _add_columns(conn, "posts", [("published_at", "TIMESTAMP")]):
+        # Best guess for existing posts: scheduled time, else created_at (set to the X date by sync/import)
+        conn.execute(text("UPDATE posts SET published_at = COALESCE(scheduled_at, created_at) WHERE status = 'sent' AND tweet_id IS NOT NULL"))
+
+    if _add_columns(conn, "posts", [("next_refresh_at", "TIMESTAMP")]):
+        # Posts still inside the refresh window get one refresh now; the planner takes over from there
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        conn.execute(text(
+            "UPDATE posts SET next_refresh_at = :now WHERE status = 'sent' AND tweet_id IS NOT NULL AND published_at >= :cutoff"
+        ), {"now": now, "cutoff": now - REFRESH_TIERS[-1][0]})
+
+
+def _publish_attempt_columns(conn):
+    _add_columns(conn, "publish_attempts", [
+        ("queue_wait_ms", "INTEGER"),
+        ("dispatch_lag_ms", "INTEGER"),
+    ])
+
+
+def _model_indexes(conn):
+    # After the dedup step: uq_posts_tweet_id needs unique tweet_ids
+    own_posts = "is_repost IS NOT 1" if conn.dialect.name == "sqlite" else "is_repost IS NOT TRUE"
+    for statement in [
+        "CREATE INDEX IF NOT EXISTS ix_posts_next_refresh_at ON posts (next_refresh_at)",
+        "CREATE INDEX IF NOT EXISTS ix_posts_status_scheduled_at ON posts (status, scheduled_at)",
+        "CREATE INDEX IF NOT EXISTS ix_posts_status_next_attempt_at ON posts (status, next_attempt_at)",
+        "CREATE INDEX IF NOT EXISTS ix_posts_username_status_created_at ON posts (username, status, created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_posts_parent_id ON posts (parent_id)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_posts_tweet_id ON posts (tweet_id) WHERE tweet_id IS NOT NULL",
+        f"CREATE INDEX IF NOT EXISTS ix_posts_original_status_created_at ON posts (status, created_at) WHERE {own_posts}",
+        "CREATE INDEX IF NOT EXISTS ix_post_metrics_snapshots_post_id_timestamp ON post_metrics_snapshots (post_id, timestamp)",
+    ]:
+        conn.execute(text(statement))
+
+
+def _post_metrics_latest(conn):
+    # create_all made the table; seed it with each post's newest snapshot,
+    # or its newest rollup when the raw snapshots were already compacted away.
+    # Posts that already have a row (written by the app) keep it
+    columns = "views, likes, reposts, bookmarks, replies, url_link_clicks, user_profile_clicks, detail_expands"
+    prefixed = ", ".join(f"s.{c.strip()}" for c in columns.split(","))
+    conn.execute(text(f"""
+        INSERT INTO post_metrics_latest (post_id, username, {columns}, timestamp)
+        SELECT s.post_id, p.username, {prefixed}, s.timestamp
+        FROM post_metrics_snapshots s
+        JOIN posts p ON p.id = s.post_id
+        WHERE s.id = (
+            SELECT s2.id FROM post_metrics_snapshots s2
+            WHERE s2.post_id = s.post_id
+            ORDER BY s2.timestamp DESC, s2.id DESC
+            LIMIT 1
+        )
+        AND s.post_id NOT IN (SELECT post_id FROM post_metrics_latest)
+    """))
+    conn.execute(text(f"""
+        INSERT INTO post_metrics_latest (post_id, username, {columns}, timestamp)
+        SELECT s.post_id, p.username, {prefixed}, s.timestamp
+        FROM post_metrics_rollups s
+        JOIN posts p ON p.id = s.post_id
+        WHERE s.id = (
+            SELECT s2.id FROM post_metrics_rollups s2
+            WHERE s2.post_id = s.post_id
+            ORDER BY s2.timestamp DESC, s2.id DESC
+            LIMIT 1
+        )
+        AND s.post_id NOT IN (SELECT post_id FROM post_metrics_latest)
+    """))
+
+
+def _daily_account_stats(conn):
+    install_daily_stats_triggers(conn)
+    rebuild_daily_stats(conn)
+
+
+def _post_media(conn):
+    # post_media itself comes from create_all; describe the attachments of existing posts once
+    _add_columns(conn, "posts", [("has_media", "BOOLEAN DEFAULT FALSE")])
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_posts_has_media ON posts (has_media)"))
+
+    columns = ["post_id", "position", "path", "status", "size_bytes", "mime_type",
+               "width", "height", "duration_ms", "sha256", "created_at"]
+    insert = text(f"INSERT INTO post_media ({', '.join(columns)}) VALUES ({', '.join(':' + c for c in columns)})")
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    posts = conn.execute(text(
+        "SELECT id, media_paths, media_url FROM posts WHERE media_paths IS NOT NULL OR media_url IS NOT NULL"
+    )).fetchall()
+    described = conn.execute(text("SELECT DISTINCT post_id FROM post_media WHERE post_id IS NOT NULL")).scalars().all()
+    for post in posts:
+        paths = parse_media_paths(post.media_paths)
+        if paths and post.id not in described:
+            rows = [{**dict.fromkeys(columns), **describe_file(path), "post_id": post.id, "position": position, "created_at": now}
+                    for position, path in enumerate(paths)]
+            conn.execute(insert, [{c: row[c] for c in columns} for row in rows])
+        conn.execute(text("UPDATE posts SET has_media = :has_media WHERE id = :id"),
+                     {"has_media": bool(paths) or bool(post.media_url), "id": post.id})
+    logger.info(f"Migrating: described the media of {len(posts)} posts")
+
+
+def _search_index(conn):
+    install_search_index(conn)
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_posts_created_at ON posts (created_at)"))
+
+
+def _hash_contents(conn, condition: str, params: dict = None) -> int:
+    """(Re)computes content_hash for the posts matching condition. Returns how many."""
+    # Normalization is done in Python (NFKC), so the backfill is too; in batches to bound memory
+    last_id, hashed = 0, 0
+    while True:
+        rows = conn.execute(text(
+            f"SELECT id, content FROM posts WHERE id > :last_id AND ({condition}) ORDER BY id LIMIT 1000"
+        ), {**(params or {}), "last_id": last_id}).fetchall()
+        if not rows:
+            return hashed
+        conn.execute(text("UPDATE posts SET content_hash = :hash WHERE id = :id"),
+                     [{"id": row.id, "hash": content_hash(row.content)} for row in rows])
+        last_id, hashed = rows[-1].id, hashed + len(rows)
+
+
+def _content_hash(conn):
+    _add_columns(conn, "posts", [("content_hash", "VARCHAR(64)")])
+    hashed = _hash_contents(conn, "content_hash IS NULL")
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_posts_content_hash ON posts (content_hash)"))
+    logger.info(f"Migrating: hashed the content of {hashed} posts")
+
+
+def _data_versions(conn):
+    install_version_triggers(conn)
+
+
+def _orphan_post_media(conn):
+    # Attachments of posts deleted before delete_post cleaned them up
+    deleted = conn.execute(text(
+        "DELETE FROM post_media WHERE post_id IS NOT NULL AND post_id NOT IN (SELECT id FROM posts)"
+    )).rowcount
+    logger.info(f"Migrating: removed {deleted} post_media rows of deleted posts")
+
+
+def _orphan_latest_metrics(conn):
+    # Latest-metrics rows of deleted posts, and of posts gone from X
+    deleted = conn.execute(text(
+        "DELETE FROM post_metrics_latest WHERE post_id NOT IN (SELECT id FROM posts WHERE COALESCE(status, '') != 'deleted_on_x')"
+    )).rowcount
+    logger.info(f"Migrating: removed {deleted} post_metrics_latest rows of deleted posts")
+
+
+def _data_version_sequences(conn):
+    # Postgres: counters move from data_versions rows to per-table sequences (no-op rewrite on SQLite)
+    install_version_triggers(conn)
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("DELETE FROM data_versions"))
+
+
+def _multiline_content_hash(conn):
+    # Normalization keeps line breaks now: multi-line posts were hashed as one line
+    hashed = _hash_contents(conn, "content LIKE :lf OR content LIKE :cr", {"lf": "%\n%", "cr": "%\r%"})
+    logger.info(f"Migrating: rehashed {hashed} multi-line posts")
+
+
+# (version, name, step). Append only.
+MIGRATIONS = [
+    (1, "post_metric_columns", _post_metric_columns),
+    (2, "snapshot_metric_columns", _snapshot_metric_columns),
+    (3, "sanitize_legacy_data", _sanitize_legacy_data),
+    (4, "deduplicate_posts", _deduplicate_posts),
+    (5, "publish_leases", _publish_leases),
+    (6, "retry_schedule", _retry_schedule),
+    (7, "refresh_schedule", _refresh_schedule),
+    (8, "publish_attempt_columns", _publish_attempt_columns),
+    (9, "model_indexes", _model_indexes),
+    (10, "post_metrics_latest", _post_metrics_latest),
+    (11, "daily_account_stats", _daily_account_stats),
+    (12, "post_media", _post_media),
+    (13, "search_index", _search_index),
+    (14, "content_hash", _content_hash),
+    (15, "data_versions", _data_versions),
+    (16, "orphan_post_media", _orphan_post_media),
+    (17, "orphan_latest_metrics", _orphan_latest_metrics),
+    (18, "data_version_sequences", _data_version_sequences),
+    (19, "multiline_content_hash", _multiline_content_hash),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def _applied_versions(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL, applied_at TIMESTAMP NOT NULL)"
+    ))
+    conn.commit()
+    return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
 def run_migrations():
     """
-    Checks for missing columns in the 'posts' table and adds them if necessary.
-    Database agnostic implementation using SQLAlchemy Inspector.
+    Creates missing tables, then applies the pending migration steps in order.
+    When the database is up to date, only create_all's table checks and one small query run.
+    A failing step is rolled back and stops the run; it is retried on the next startup.
     """
     logger.info("Checking for database migrations...")
-    try:
-        inspector = inspect(engine)
-        if not inspector.has_table("posts"):
-            logger.info("Table 'posts' does not exist yet. Skipping migration (will be created by generic init).")
+    Base.metadata.create_all(bind=engine)
+
+    with engine.connect() as conn:
+        applied = _applied_versions(conn)
+        pending = [m for m in MIGRATIONS if m[0] not in applied]
+        if not pending:
+            logger.info(f"Database schema is up to date (version {LATEST_VERSION}).")
             return
 
-        columns = [col["name"] for col in inspector.get_columns("posts")]
-        
-        with engine.connect() as conn:
-            # 1. Add views_count
-            if "views_count" not in columns:
-                logger.info("Migrating: Adding views_count column")
-                conn.execute(text("ALTER TABLE posts ADD COLUMN views_count INTEGER DEFAULT 0"))
-            else:
-                 conn.execute(text("UPDATE posts SET views_count = 0 WHERE views_count IS NULL"))
-                
-            # 2. Add likes_count
-            if "likes_count" not in columns:
-                logger.info("Migrating: Adding likes_count column")
-                conn.execute(text("ALTER TABLE posts ADD COLUMN likes_count INTEGER DEFAULT 0"))
-            else:
-                 conn.execute(text("UPDATE posts SET likes_count = 0 WHERE likes_count IS NULL"))
-                
-            # 3. Add reposts_count
-            if "reposts_count" not in columns:
-                logger.info("Migrating: Adding reposts_count column")
-                conn.execute(text("ALTER TABLE posts ADD COLUMN reposts_count INTEGER DEFAULT 0"))
-            else:
-                 conn.execute(text("UPDATE posts SET reposts_count = 0 WHERE reposts_count IS NULL"))
-            
-            # 4. Add tweet_id (if missing)
-            if "tweet_id" not in columns:
-                logger.info("Migrating: Adding tweet_id column")
-                conn.execute(text("ALTER TABLE posts ADD COLUMN tweet_id VARCHAR(255)"))
-                
-            # 5. Add username (if missing)
-            if "username" not in columns:
-                logger.info("Migrating: Adding username column")
-                conn.execute(text("ALTER TABLE posts ADD COLUMN username VARCHAR(255)"))
-
-            # 6. Add media_url (for thumbnails)
-            if "media_url" not in columns:
-                logger.info("Migrating: Adding media_url column")
-                conn.execute(text("ALTER TABLE posts ADD COLUMN media_url VARCHAR(500)"))
-
-            # 7. Add is_repost
-            if "is_repost" not in columns:
-                logger.info("Migrating: Adding is_repost column")
-                conn.execute(text("ALTER TABLE posts ADD COLUMN is_repost BOOLEAN DEFAULT FALSE"))
-
-            # 8. Add bookmarks_count
-            if "bookmarks_count" not in columns:
-                logger.info("Migrating: Adding bookmarks_count column")
-                conn.execute(text("ALTER TABLE posts ADD COLUMN bookmarks_count INTEGER DEFAULT 0"))
-
-            # 9. Add replies_count
-            if "replies_count" not in columns:
-                logger.info("Migrating: Adding replies_count column")
-                conn.execute(text("ALTER TABLE posts ADD COLUMN replies_count INTEGER DEFAULT 0"))
-
-            # 10. Add tags
-            if "tags" not in columns:
-                logger.info("Migrating: Adding tags column")
-                conn.execute(text("ALTER TABLE posts ADD COLUMN tags VARCHAR(500)"))
-
-            # 11. Add url_link_clicks
-            if "url_link_clicks" not in columns:
-                logger.info("Migrating: Adding url_link_clicks column")
-                conn.execute(text("ALTER TABLE posts ADD COLUMN url_link_clicks INTEGER DEFAULT 0"))
-
-            # 12. Add user_profile_clicks
-            if "user_profile_clicks" not in columns:
-                logger.info("Migrating: Adding user_profile_clicks column")
-                conn.execute(text("ALTER TABLE posts ADD COLUMN user_profile_clicks INTEGER DEFAULT 0"))
-
-            # 13. Add detail_expands
-            if "detail_expands" not in columns:
-                logger.info("Migrating: Adding detail_expands column")
-                conn.execute(text("ALTER TABLE posts ADD COLUMN detail_expands INTEGER DEFAULT 0"))
-
-            # --- Check post_metrics_snapshots table ---
-            if inspector.has_table("post_metrics_snapshots"):
-                snap_columns = [col["name"] for col in inspector.get_columns("post_metrics_snapshots")]
-                
-                if "bookmarks" not in snap_columns:
-                    logger.info("Migrating: Adding bookmarks column to post_metrics_snapshots")
-                    conn.execute(text("ALTER TABLE post_metrics_snapshots ADD COLUMN bookmarks INTEGER DEFAULT 0"))
-
-                if "replies" not in snap_columns:
-                    logger.info("Migrating: Adding replies column to post_metrics_snapshots")
-                    conn.execute(text("ALTER TABLE post_metrics_snapshots ADD COLUMN replies INTEGER DEFAULT 0"))
-
-                if "url_link_clicks" not in snap_columns:
-                    logger.info("Migrating: Adding url_link_clicks column to post_metrics_snapshots")
-                    conn.execute(text("ALTER TABLE post_metrics_snapshots ADD COLUMN url_link_clicks INTEGER DEFAULT 0"))
-
-                if "user_profile_clicks" not in snap_columns:
-                    logger.info("Migrating: Adding user_profile_clicks column to post_metrics_snapshots")
-                    conn.execute(text("ALTER TABLE post_metrics_snapshots ADD COLUMN user_profile_clicks INTEGER DEFAULT 0"))
-
-                if "detail_expands" not in snap_columns:
-                    logger.info("Migrating: Adding detail_expands column to post_metrics_snapshots")
-                    conn.execute(text("ALTER TABLE post_metrics_snapshots ADD COLUMN detail_expands INTEGER DEFAULT 0"))
-
-            # 6. Sanitize Legacy Data (Fix 500 Errors)
-            logger.info("Migrating: Sanitizing legacy data...")
-            
-            # Fix NULL created_at
-            if "created_at" in columns:
-                conn.execute(text("UPDATE posts SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL"))
-            
-            # Fix NULL updated_at
-            if "updated_at" in columns:
-                conn.execute(text("UPDATE posts SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL"))
-            
-            # Fix NULL content
-            if "content" in columns:
-                conn.execute(text("UPDATE posts SET content = '(No content)' WHERE content IS NULL"))
-
-            # 14. Deduplicate Posts (Merge Strategy Cleanup)
-            # Find groups of posts with same content same tweet_id (or one has null)
-            # Strategy: If found multiple posts with same tweet_id, keep the one with most recent updated_at
-            # If found multiple posts with same content, and one has tweet_id and other doesn't, DELETE the one without tweet_id (assuming it was the draft)
-            
-            logger.info("Migrating: Checking for duplicates to clean up...")
-            
-            # 1. Deduplicate by tweet_id (strict duplicates)
-            # Delete older duplicates of the same tweet_id
-            conn.execute(text("""
-                DELETE FROM posts 
-                WHERE id NOT IN (
-                    SELECT MAX(id) 
-                    FROM posts 
-                    WHERE tweet_id IS NOT NULL 
-                    GROUP BY tweet_id
-                ) 
-                AND tweet_id IS NOT NULL
-            """))
-
-            # 2. Match Imports to Drafts (The implementation of merge strategy for OLD imports)
-            # If we have a post with tweet_id='X' and content='ABC'
-            # AND a post with tweet_id=NULL and content='ABC'
-            # We should assume the one with tweet_id is the Import, and the other is the Draft that SHOULD have been merged.
-            # So we delete the Draft.
-            
-            # Note: This is aggressive. We only do it for status='sent' vs status='scheduled'/'draft'? 
-            # Or just content match.
-            # Let's be careful: Only delete if content is long enough to be unique (> 20 chars) matching "Acabo de lanzar un pane"
-            
-            # 2. Match Imports to Drafts (Fuzzy Match)
-            # Use the first 30 characters to match drafts to imported tweets.
-            # This handles cases where X modifies whitespace or links.
-            
-            logger.info("Migrating: Running fuzzy deduplication...")
-            conn.execute(text("""
-                DELETE FROM posts 
-                WHERE tweet_id IS NULL 
-                AND EXISTS (
-                    SELECT 1 
-                    FROM posts p2 
-                    WHERE p2.tweet_id IS NOT NULL 
-                    AND p2.id != posts.id
-                    AND substr(p2.content, 1, 30) = substr(posts.content, 1, 30)
+        for version, name, step in pending:
+            logger.info(f"Migrating: {version} {name}")
+            try:
+                step(conn)
+                conn.execute(
+                    text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:version, :name, :applied_at)"),
+                    {"version": version, "name": name, "applied_at": datetime.now(timezone.utc).replace(tzinfo=None)}
                 )
-                AND length(content) > 15
-            """))
-
-            # 3. Clean up specific noise (pizzeria retweet)
-            logger.info("Migrating: Removing specific noisy retweet...")
-            conn.execute(text("""
-                DELETE FROM posts 
-                WHERE content LIKE '%La pizzeria 24/7 cerca del pentágono esta repotando%'
-            """))
-
-            conn.commit()
-            logger.info("Migrations completed successfully.")
-            
-    except Exception as e:
-        logger.error(f"Migration failed: {e}")
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Migration {version} {name} failed: {e}")
+                return
+
+    logger.info(f"Migrations completed successfully (version {LATEST_VERSION}).")
+
 
 if __name__ == "__main__":
     run_migrations()
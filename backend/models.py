@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Date, DateTime, Text, ForeignKey, Boolean, Index, event, text
 from datetime import datetime, timezone
 from .db import Base
+from .services.content_hash import content_hash
 
 class Post(Base):
     __tablename__ = "posts"
@@ -15,6 +16,7 @@ class Post(Base):
     logs = Column(Text, nullable=True) # Simple text log for now
     screenshot_path = Column(String, nullable=True)
     retry_count = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, nullable=True) # When a failed post is retried (NULL = no more retries)
     parent_id = Column(Integer, ForeignKey('posts.id'), nullable=True)
     tweet_id = Column(String, nullable=True) # The actual ID on X
     views_count = Column(Integer, default=0)
@@ -29,6 +31,63 @@ class Post(Base):
     media_url = Column(String, nullable=True) # URL of the first image/video thumbnail
     is_repost = Column(Boolean, default=False)
     tags = Column(String, nullable=True) # Comma separate tags e.g "tech,ai,sales"
+    lease_owner = Column(String, nullable=True) # Replica currently publishing the post
+    lease_expires_at = Column(DateTime, nullable=True) # Renewed by heartbeat while publishing
+    published_at = Column(DateTime, nullable=True) # When the post went live on X
+    next_refresh_at = Column(DateTime, nullable=True, index=True) # Next metrics scrape (NULL = stopped)
+    has_media = Column(Boolean, default=False, index=True) # Attachments in post_media, or a scraped media_url
+    content_hash = Column(String(64), nullable=True) # sha256 of the normalized content, set whenever content is
+
+    __table_args__ = (
+        # Scheduler: due scheduled posts and due retries
+        Index("ix_posts_status_scheduled_at", "status", "scheduled_at"),
+        Index("ix_posts_status_next_attempt_at", "status", "next_attempt_at"),
+        # Per-account listings and history
+        Index("ix_posts_username_status_created_at", "username", "status", "created_at"),
+        # Thread children lookups
+        Index("ix_posts_parent_id", "parent_id"),
+        # Newest-first listings and search without a text query
+        Index("ix_posts_created_at", "created_at"),
+        # Import merges and the pre-publish duplicate check
+        Index("ix_posts_content_hash", "content_hash"),
+        # Sync/import lookups; drafts have no tweet_id yet
+        Index("uq_posts_tweet_id", "tweet_id", unique=True,
+              sqlite_where=text("tweet_id IS NOT NULL"), postgresql_where=text("tweet_id IS NOT NULL")),
+        # /stats and /latest: own posts only (is_repost IS NOT TRUE)
+        Index("ix_posts_original_status_created_at", "status", "created_at",
+              sqlite_where=text("is_repost IS NOT 1"), postgresql_where=text("is_repost IS NOT TRUE")),
+    )
+
+@event.listens_for(Post.content, "set")
+def _set_content_hash(target, value, oldvalue, initiator):
+    # Every ORM write of content (constructor, update, sync) keeps the hash in step
+    target.content_hash = content_hash(value)
+
+class PostMedia(Base):
+    """
+    One attachment of a post, described at upload time.
+    post_id is NULL between the upload and the post that uses it being saved.
+    """
+    __tablename__ = "post_media"
+
+    id = Column(Integer, primary_key=True, index=True)
+    post_id = Column(Integer, ForeignKey('posts.id'), nullable=True)
+    position = Column(Integer, default=0) # Order of the attachment in the post
+    path = Column(String, nullable=False) # Absolute path, or the URL of remote (imported) media
+    url = Column(String, nullable=True) # /uploads/... URL for the frontend
+    size_bytes = Column(Integer, nullable=True)
+    mime_type = Column(String, nullable=True)
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    duration_ms = Column(Integer, nullable=True) # Videos only
+    sha256 = Column(String(64), nullable=True)
+    status = Column(String, default="ready") # ready, missing (file gone), empty (0 bytes), remote (URL, not uploadable)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        Index("ix_post_media_post_id_position", "post_id", "position"),
+        Index("ix_post_media_path", "path"),
+    )
 
 class PostMetricSnapshot(Base):
     __tablename__ = "post_metrics_snapshots"
@@ -45,6 +104,83 @@ class PostMetricSnapshot(Base):
     detail_expands = Column(Integer, default=0)
     timestamp = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
+    __table_args__ = (
+        # "Latest snapshot of a post" and per-post history
+        Index("ix_post_metrics_snapshots_post_id_timestamp", "post_id", "timestamp"),
+    )
+
+class PostMetricLatest(Base):
+    """Most recent snapshot of each post, written with every snapshot insert (see services/post_metrics.py)."""
+    __tablename__ = "post_metrics_latest"
+
+    post_id = Column(Integer, ForeignKey('posts.id'), primary_key=True)
+    username = Column(String, nullable=True) # Copied from the post for per-account lookups
+    views = Column(Integer, default=0)
+    likes = Column(Integer, default=0)
+    reposts = Column(Integer, default=0)
+    bookmarks = Column(Integer, default=0)
+    replies = Column(Integer, default=0)
+    url_link_clicks = Column(Integer, default=0)
+    user_profile_clicks = Column(Integer, default=0)
+    detail_expands = Column(Integer, default=0)
+    timestamp = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        # "Last metrics refresh" of an account
+        Index("ix_post_metrics_latest_username_timestamp", "username", "timestamp"),
+    )
+
+class DailyAccountStats(Base):
+    """Per account and day post counts and sent-post metric sums, maintained by triggers on posts (see services/daily_stats.py)."""
+    __tablename__ = "daily_account_stats"
+
+    username = Column(String, primary_key=True) # "" for posts without an account
+    day = Column(Date, primary_key=True) # Publish date, created_at until published
+    sent = Column(Integer, nullable=False, default=0) # Excludes reposts
+    failed = Column(Integer, nullable=False, default=0)
+    scheduled = Column(Integer, nullable=False, default=0)
+    drafts = Column(Integer, nullable=False, default=0)
+    views = Column(Integer, nullable=False, default=0)
+    likes = Column(Integer, nullable=False, default=0)
+    reposts = Column(Integer, nullable=False, default=0)
+    bookmarks = Column(Integer, nullable=False, default=0)
+    replies = Column(Integer, nullable=False, default=0)
+    url_link_clicks = Column(Integer, nullable=False, default=0)
+    user_profile_clicks = Column(Integer, nullable=False, default=0)
+    detail_expands = Column(Integer, nullable=False, default=0)
+
+class PostMetricRollup(Base):
+    """Downsampled post_metrics_snapshots: last value of each bucket plus growth within it."""
+    __tablename__ = "post_metrics_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    post_id = Column(Integer, ForeignKey('posts.id'), nullable=False)
+    tier = Column(String, nullable=False) # hour, day
+    bucket_start = Column(DateTime, nullable=False)
+    timestamp = Column(DateTime, nullable=False) # Time of the last raw snapshot in the bucket
+    samples = Column(Integer, default=0) # Raw snapshots folded into the bucket
+    views = Column(Integer, default=0)
+    likes = Column(Integer, default=0)
+    reposts = Column(Integer, default=0)
+    bookmarks = Column(Integer, default=0)
+    replies = Column(Integer, default=0)
+    url_link_clicks = Column(Integer, default=0)
+    user_profile_clicks = Column(Integer, default=0)
+    detail_expands = Column(Integer, default=0)
+    views_delta = Column(Integer, default=0)
+    likes_delta = Column(Integer, default=0)
+    reposts_delta = Column(Integer, default=0)
+    bookmarks_delta = Column(Integer, default=0)
+    replies_delta = Column(Integer, default=0)
+    url_link_clicks_delta = Column(Integer, default=0)
+    user_profile_clicks_delta = Column(Integer, default=0)
+    detail_expands_delta = Column(Integer, default=0)
+
+    __table_args__ = (
+        Index("uq_post_metrics_rollups_post_tier_bucket", "post_id", "tier", "bucket_start", unique=True),
+        Index("ix_post_metrics_rollups_tier_bucket_start", "tier", "bucket_start"),
+    )
+
 class AccountMetricSnapshot(Base):
     __tablename__ = "account_metrics"
 
@@ -53,3 +189,39 @@ class AccountMetricSnapshot(Base):
     followers_count = Column(Integer, default=0)
     following_count = Column(Integer, default=0)
     timestamp = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+class PublishAttempt(Base):
+    __tablename__ = "publish_attempts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    post_id = Column(Integer, ForeignKey('posts.id'), nullable=False, index=True)
+    source = Column(String, nullable=True) # scheduler, immediate
+    success = Column(Boolean, default=False)
+    started_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    queue_wait_ms = Column(Integer, nullable=True) # Waiting for a publish slot, before started_at
+    dispatch_lag_ms = Column(Integer, nullable=True) # started_at minus the time the post was due
+    total_ms = Column(Integer, nullable=True)
+    phases = Column(Text, nullable=True) # JSON list of {"phase", "ms", "ok"}
+
+class JobRun(Base):
+    __tablename__ = "job_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job = Column(String, nullable=False, index=True) # Scheduler job id
+    status = Column(String, nullable=False) # ok, partial, error, cancelled, skipped, missed
+    started_at = Column(DateTime, nullable=False, index=True) # Scheduled run time for skipped/missed runs
+    finished_at = Column(DateTime, nullable=True)
+    duration_ms = Column(Integer, nullable=True)
+    items = Column(Integer, default=0) # Posts submitted/scraped, accounts synced
+    errors = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+
+class DataVersion(Base):
+    """
+    Write counter per table, bumped by triggers (see services/data_versions.py). Feeds the API's ETags.
+    SQLite only: Postgres keeps the counters in one sequence per table.
+    """
+    __tablename__ = "data_versions"
+
+    name = Column(String, primary_key=True) # Table name
+    version = Column(Integer, nullable=False, default=0)
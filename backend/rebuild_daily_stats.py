@@ -0,0 +1,22 @@
+"""
+Recomputes daily_account_stats from posts and reinstalls the triggers that maintain it.
+Use it to backfill, or to repair the table after writes made with the triggers missing
+(e.g. a restore from an older backup).
+
+Usage: python -m backend.rebuild_daily_stats
+"""
+from loguru import logger
+from backend.db import engine, Base
+from backend.services.daily_stats import install_daily_stats_triggers, rebuild_daily_stats
+
+
+def main():
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        install_daily_stats_triggers(conn)
+        rows = rebuild_daily_stats(conn)
+    logger.info(f"daily_account_stats rebuilt ({rows} account-days).")
+
+
+if __name__ == "__main__":
+    main()
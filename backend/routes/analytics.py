@@ -1,45 +1,32 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import case, func
 from datetime import datetime, timedelta, timezone
 from backend.db import get_db
-from backend.models import Post, PostMetricSnapshot, AccountMetricSnapshot
-from typing import List, Dict
+from backend.dependencies import conditional_get
+from backend.services.data_versions import ANALYTICS_TABLES
+from backend.models import Post, PostMetricSnapshot, AccountMetricSnapshot, PublishAttempt, JobRun
+from backend.services.snapshot_rollup import load_post_history
+from backend.services.daily_stats import stats_by_day
+from backend.services.decay_curves import DEFAULT_AGES_HOURS, decay_bands
+from typing import List, Dict, Optional
+import json
 
-router = APIRouter()
+# Reports over sliding windows: ETags also expire with time
+router = APIRouter(dependencies=[Depends(conditional_get(ANALYTICS_TABLES, windowed=True))])
 
 @router.get("/growth")
-def get_growth_data(db: Session = Depends(get_db)):
+def get_growth_data(username: Optional[str] = None, db: Session = Depends(get_db)):
     """
     Returns aggregated engagement data over the last 30 days based on Post publication date.
+    Reads the per-day rows of daily_account_stats (all accounts unless username is given).
     """
-    now = datetime.now(timezone.utc).replace(tzinfo=None)
-    cutoff = now - timedelta(days=30)
-    
-    # Query Posts directly to reconstruct history
-    # We use updated_at because that's where we store the legacy publish date
-    stats = db.query(
-        func.date(Post.updated_at).label('date'),
-        func.sum(Post.views_count).label('views'),
-        func.sum(Post.likes_count).label('likes'),
-        func.sum(Post.reposts_count).label('reposts'),
-        func.sum(Post.bookmarks_count).label('bookmarks'),
-        func.sum(Post.replies_count).label('replies'),
-        func.sum(Post.url_link_clicks).label('url_link_clicks'),
-        func.sum(Post.user_profile_clicks).label('user_profile_clicks'),
-        func.sum(Post.detail_expands).label('detail_expands'),
-        func.count(Post.id).label('post_count')
-    ).filter(
-        Post.status == 'sent',
-        Post.updated_at >= cutoff,
-        Post.is_repost.isnot(True) # Exclude reposts from growth chart too
-    )\
-     .group_by(func.date(Post.updated_at))\
-     .order_by(func.date(Post.updated_at)).all()
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=30)).date()
+    stats = stats_by_day(db, cutoff, username=username)
     
     return [
         {
-            "date": str(s.date),
+            "date": str(s.day),
             "views": s.views or 0,
             "likes": s.likes or 0,
             "reposts": s.reposts or 0,
@@ -49,32 +36,52 @@ def get_growth_data(db: Session = Depends(get_db)):
             "user_profile_clicks": s.user_profile_clicks or 0,
             "detail_expands": s.detail_expands or 0,
             "engagement": (s.likes or 0) + (s.reposts or 0) + (s.bookmarks or 0) + (s.replies or 0) + (s.url_link_clicks or 0),
-            "posts": s.post_count
-        } for s in stats
+            "posts": s.sent or 0
+        } for s in stats if s.sent
     ]
 
+# Engagement of a post: every interaction X reports except views
+_ENGAGEMENT = (
+    func.coalesce(Post.likes_count, 0) + func.coalesce(Post.reposts_count, 0) + func.coalesce(Post.bookmarks_count, 0)
+    + func.coalesce(Post.replies_count, 0) + func.coalesce(Post.url_link_clicks, 0)
+)
+
+def _own_sent_posts(query, username: Optional[str], date_from: Optional[datetime], date_to: Optional[datetime]):
+    """
+    Own (non-repost) sent posts, optionally of one account and created in [date_from, date_to).
+    Served by ix_posts_original_status_created_at, or ix_posts_username_status_created_at with username.
+    """
+    query = query.filter(Post.status == "sent", Post.is_repost.isnot(True))
+    if username:
+        query = query.filter(Post.username == username)
+    if date_from:
+        query = query.filter(Post.created_at >= date_from)
+    if date_to:
+        query = query.filter(Post.created_at < date_to)
+    return query
+
 @router.get("/performance")
-def get_performance_data(db: Session = Depends(get_db)):
+def get_performance_data(
+    username: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
     """
     Compares performance between Text-only and Media posts.
+    One GROUP BY over the media flag: only the sums leave the database.
     """
-    sent_posts = db.query(Post).filter(Post.status == "sent", Post.is_repost.isnot(True)).all()
-    
-    performance = {
-        "text": {"count": 0, "views": 0, "engagement": 0},
-        "media": {"count": 0, "views": 0, "engagement": 0}
-    }
-    
-    for post in sent_posts:
-        # Check both local media paths AND imported media URLs
-        has_media = bool(post.media_paths) or bool(post.media_url)
-        type_key = "media" if has_media else "text"
-        
-        performance[type_key]["count"] += 1
-        performance[type_key]["views"] += (post.views_count or 0)
-        engagement = (post.likes_count or 0) + (post.reposts_count or 0) + (post.bookmarks_count or 0) + (post.replies_count or 0) + (post.url_link_clicks or 0)
-        performance[type_key]["engagement"] += engagement
-    
+    # has_media covers both attachments (post_media) and imported media URLs
+    kind = case((Post.has_media.is_(True), "media"), else_="text")
+    rows = _own_sent_posts(
+        db.query(kind.label("kind"), func.count(Post.id), func.sum(func.coalesce(Post.views_count, 0)), func.sum(_ENGAGEMENT)),
+        username, date_from, date_to
+    ).group_by(kind).all()
+
+    performance = {key: {"count": 0, "views": 0, "engagement": 0} for key in ("text", "media")}
+    for key, count, views, engagement in rows:
+        performance[key] = {"count": count, "views": int(views or 0), "engagement": int(engagement or 0)}
+
     # Calculate averages
     for key in performance:
         if performance[key]["count"] > 0:
@@ -87,33 +94,30 @@ def get_performance_data(db: Session = Depends(get_db)):
     return performance
 
 @router.get("/best-times")
-def get_best_times(db: Session = Depends(get_db)):
+def get_best_times(
+    username: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
     """
     Calculates the best hours to post based on historical performance.
+    Average engagement rate per hour of day (UTC), computed by a GROUP BY on the hour.
     """
-    # Group 'sent' posts by hour and calculate average engagement
-    posts = db.query(Post).filter(Post.status == "sent").all()
-    
-    if not posts:
+    # When the post went out: published_at, else the slot it was scheduled for, else its creation
+    hour = func.extract("hour", func.coalesce(Post.published_at, Post.scheduled_at, Post.created_at))
+    # Engagement rate in %, or the raw engagement for posts without views
+    rate = case((func.coalesce(Post.views_count, 0) > 0, _ENGAGEMENT * 100.0 / Post.views_count), else_=_ENGAGEMENT)
+    rows = _own_sent_posts(
+        db.query(hour.label("hour"), func.avg(rate), func.count(Post.id)),
+        username, date_from, date_to
+    ).group_by(hour).all()
+    rows = [(int(h), float(avg or 0), count) for h, avg, count in rows if h is not None]
+
+    if not rows:
         return {"best_hours": [9, 12, 18, 21], "reason": "Default slots (not enough data yet)"}
-    
-    hourly_engagement = {}
-    for post in posts:
-        # Use scheduled_at, or updated_at (for imported posts), or created_at
-        timestamp = post.scheduled_at or post.updated_at or post.created_at
-        if timestamp:
-            hour = timestamp.hour
-            # Detailed engagement formula
-            engagement = (post.likes_count + post.reposts_count + post.bookmarks_count + post.replies_count + post.url_link_clicks)
-            if post.views_count > 0:
-                 engagement = (engagement / post.views_count) * 100
-            
-            if hour not in hourly_engagement:
-                hourly_engagement[hour] = []
-            hourly_engagement[hour].append(engagement)
-    
-    # Average engagement per hour
-    avg_engagement = {h: sum(e)/len(e) for h, e in hourly_engagement.items()}
+
+    avg_engagement = {h: avg for h, avg, _ in rows}
     # Sort by engagement
     sorted_hours = sorted(avg_engagement.items(), key=lambda x: x[1], reverse=True)
     
@@ -122,7 +126,7 @@ def get_best_times(db: Session = Depends(get_db)):
     return {
         "best_hours": best_slots if best_slots else [9, 12, 18, 21],
         "hourly_data": avg_engagement,
-        "total_posts_analyzed": len(posts)
+        "total_posts_analyzed": sum(count for _, _, count in rows)
     }
 
 @router.get("/account-growth")
@@ -150,3 +154,133 @@ def get_account_growth(db: Session = Depends(get_db)):
         }
         
     return list(daily_stats.values())
+
+def _percentile(sorted_values: List[int], pct: float) -> int:
+    # Nearest-rank percentile on an already sorted list
+    if not sorted_values:
+        return 0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def _describe(values: List[int]) -> dict:
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "p50": _percentile(values, 50),
+        "p90": _percentile(values, 90),
+        "p99": _percentile(values, 99),
+        "max": values[-1] if values else 0
+    }
+
+@router.get("/publish-timings")
+def get_publish_timings(days: int = 7, source: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    Per-phase latency percentiles (ms) of publish attempts over the last N days.
+    queue_wait is the time spent waiting for a publish slot, not included in total.
+    dispatch_lag is how late the attempt started compared to when the post was due.
+    Repeated phases within one attempt (e.g. navigation retries) are summed.
+    """
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=days)
+    query = db.query(PublishAttempt.total_ms, PublishAttempt.queue_wait_ms, PublishAttempt.dispatch_lag_ms, PublishAttempt.phases, PublishAttempt.success)\
+        .filter(PublishAttempt.started_at >= cutoff)
+    if source:
+        query = query.filter(PublishAttempt.source == source)
+    attempts = query.all()
+
+    per_phase: Dict[str, List[int]] = {}
+    totals = []
+    queue_waits = []
+    dispatch_lags = []
+    for attempt in attempts:
+        if attempt.total_ms is not None:
+            totals.append(attempt.total_ms)
+        if attempt.queue_wait_ms is not None:
+            queue_waits.append(attempt.queue_wait_ms)
+        if attempt.dispatch_lag_ms is not None:
+            dispatch_lags.append(attempt.dispatch_lag_ms)
+        phase_sums: Dict[str, int] = {}
+        for span in json.loads(attempt.phases or "[]"):
+            phase_sums[span["phase"]] = phase_sums.get(span["phase"], 0) + span["ms"]
+        for phase, ms in phase_sums.items():
+            per_phase.setdefault(phase, []).append(ms)
+
+    return {
+        "attempts": len(attempts),
+        "failed": sum(1 for a in attempts if not a.success),
+        "queue_wait": _describe(queue_waits),
+        "dispatch_lag": _describe(dispatch_lags),
+        "total": _describe(totals),
+        "phases": {phase: _describe(values) for phase, values in per_phase.items()}
+    }
+
+@router.get("/jobs")
+def get_job_runs(hours: int = 24, db: Session = Depends(get_db)):
+    """
+    Scheduler job ledger summary over the last N hours: run counts by outcome,
+    duration percentiles (ms), items processed and the last run of each job.
+    skipped = the previous run was still going, missed = the run time was missed.
+    """
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=hours)
+    runs = db.query(JobRun).filter(JobRun.started_at >= cutoff).order_by(JobRun.started_at).all()
+
+    summary: Dict[str, dict] = {}
+    durations: Dict[str, List[int]] = {}
+    for run in runs:
+        job = summary.setdefault(run.job, {
+            "runs": 0, "ok": 0, "partial": 0, "error": 0, "cancelled": 0, "skipped": 0, "missed": 0,
+            "items": 0, "errors": 0, "last_run": None
+        })
+        job[run.status] = job.get(run.status, 0) + 1
+        if run.status in ("skipped", "missed"):
+            continue
+        job["runs"] += 1
+        job["items"] += run.items or 0
+        job["errors"] += run.errors or 0
+        job["last_run"] = {
+            "started_at": run.started_at,
+            "duration_ms": run.duration_ms,
+            "status": run.status,
+            "error": run.error
+        }
+        if run.duration_ms is not None:
+            durations.setdefault(run.job, []).append(run.duration_ms)
+
+    for name, job in summary.items():
+        job["duration"] = _describe(durations.get(name, []))
+
+    return summary
+
+@router.get("/posts/{post_id}/history")
+def get_post_history(post_id: int, days: Optional[int] = None, db: Session = Depends(get_db)):
+    """
+    Metric history of one post for charts. Reads whichever storage tier holds each period
+    (raw snapshots, then hourly and daily rollups as the data ages); each point says which.
+    """
+    if db.query(Post.id).filter(Post.id == post_id).first() is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+    since = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=days) if days else None
+    return load_post_history(db, post_id, since)
+
+@router.get("/decay")
+def get_decay_bands(
+    metric: str = "views",
+    username: Optional[str] = None,
+    days: int = Query(90, ge=1, le=365),
+    ages: str = ",".join(str(a) for a in DEFAULT_AGES_HOURS),
+    db: Session = Depends(get_db)
+):
+    """
+    How posts grow with age: per account, percentiles (p10..p90) of a metric at each age in
+    hours (ages=1,6,24,168), over own posts published in the last N days. Each post's snapshot
+    history is interpolated to those ages; "posts" counts the posts old enough to be included.
+    """
+    try:
+        grid = [float(a) for a in ages.split(",") if a.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ages must be a comma separated list of hours")
+    if not grid or len(grid) > 24 or any(a <= 0 for a in grid):
+        raise HTTPException(status_code=400, detail="ages must list 1 to 24 positive hours")
+    try:
+        return decay_bands(db, metric, grid, days, username)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,13 +1,31 @@
+import os
 from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from backend.db import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.db import get_db, get_async_db
 from worker.publisher import login_to_x
 from loguru import logger
-from backend.dependencies import verify_token
+from backend.dependencies import conditional_get, verify_token
+from backend.services.data_versions import ACCOUNT_TABLES
 
 router = APIRouter()
 
+WORKER_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "worker")
+
+def _accounts_fingerprint() -> str:
+    """Sizes and times of the saved account files: /status changes when a login or logout touches them."""
+    accounts_dir = os.path.join(WORKER_DIR, "accounts")
+    paths = [os.path.join(WORKER_DIR, "cookies.json"), os.path.join(WORKER_DIR, "user_info.json")]
+    if os.path.exists(accounts_dir):
+        for username in sorted(os.listdir(accounts_dir)):
+            paths += [os.path.join(accounts_dir, username, "user_info.json"), os.path.join(accounts_dir, username, "cookies.json")]
+    parts = []
+    for path in paths:
+        stat = os.stat(path) if os.path.exists(path) else None
+        parts.append(f"{path}:{stat.st_mtime_ns}:{stat.st_size}" if stat else f"{path}:-")
+    return ";".join(parts)
+
 class LoginRequest(BaseModel):
     username: str
     password: str
@@ -38,7 +56,7 @@ async def login(request: LoginRequest, background_tasks: BackgroundTasks):
     }
 
 @router.post("/sync/{username}")
-async def sync_history(username: str, db: Session = Depends(get_db)):
+async def sync_history(username: str, db: AsyncSession = Depends(get_async_db)):
     """
     Triggers a manual sync of account history.
     Delegates to Sync Service.
@@ -47,8 +65,8 @@ async def sync_history(username: str, db: Session = Depends(get_db)):
     
     return await sync_account_history(username, db)
 
-@router.get("/status")
-async def get_status(db: Session = Depends(get_db)):
+@router.get("/status", dependencies=[Depends(conditional_get(ACCOUNT_TABLES, extra=_accounts_fingerprint))])
+def get_status(db: Session = Depends(get_db)):
     """
     Returns a list of all connected accounts.
     """
@@ -56,7 +74,7 @@ async def get_status(db: Session = Depends(get_db)):
     import json
     from backend.models import AccountMetricSnapshot
     
-    worker_dir = os.path.join(os.path.dirname(__file__), "..", "..", "worker")
+    worker_dir = WORKER_DIR
     accounts_dir = os.path.join(worker_dir, "accounts")
     
     accounts = []
@@ -74,14 +92,11 @@ async def get_status(db: Session = Depends(get_db)):
 
     def get_last_metrics_refresh(username: str) -> str | None:
         try:
-            from backend.models import Post, PostMetricSnapshot
-            # Find the latest snapshot for any post belonging to this user
-            snapshot = db.query(PostMetricSnapshot)\
-                .join(Post)\
-                .filter(Post.username == username)\
-                .order_by(PostMetricSnapshot.timestamp.desc()).first()
-            if snapshot and snapshot.timestamp:
-                return snapshot.timestamp.isoformat()
+            from backend.services.post_metrics import last_metrics_refresh
+            # Newest post_metrics_latest row of the account (indexed, no snapshot scan)
+            timestamp = last_metrics_refresh(db, username)
+            if timestamp:
+                return timestamp.isoformat()
         except Exception as e:
             logger.error(f"Error fetching last metrics refresh: {e}")
         return None
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 from worker.publisher import check_login_state
-from backend.db import SessionLocal
+from backend.db import async_engine
 from datetime import datetime
 from sqlalchemy import text
 
@@ -10,9 +10,8 @@ router = APIRouter()
 async def health_check():
     db_status = "ok"
     try:
-        db = SessionLocal()
-        db.execute(text("SELECT 1"))
-        db.close()
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
     except Exception as e:
         db_status = f"error: {str(e)}"
     
@@ -1,108 +1,89 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import datetime, timezone
-from backend.db import SessionLocal, get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.db import AsyncSessionLocal, get_db, get_async_db
+from backend.dependencies import conditional_get
 from backend.models import Post
 from loguru import logger
 from backend.schemas import PostCreate, PostUpdate, PostResponse, GlobalStats
+from backend.services.publish_service import apply_publish_result, check_publishable
+from backend.services.dispatcher import dispatcher
+from backend.services.leases import LEASE_OWNER, claim_for_immediate_publish, lease_expiry, lease_heartbeat, release_children
+from backend.services.refresh_planner import plan_next_refresh
+from backend.services.daily_stats import stats_totals
+from backend.services.content_hash import content_hash
+from backend.services.data_versions import POSTS_TABLES
+from backend.services.media_service import delete_post_media, sync_post_media
+from backend.services.pagination import NEXT_CURSOR_HEADER
+from backend.services.post_metrics import drop_latest_metrics
+from backend.services.post_list import list_posts, parse_fields
+from backend.services.search import search_posts
 from worker.publisher import publish_post_task, import_single_tweet
-from backend.schemas import PostCreate, PostUpdate, PostResponse, GlobalStats, ImportTweetRequest
+from backend.schemas import PostCreate, PostUpdate, PostResponse, GlobalStats, ImportTweetRequest, BulkPostCreate, BulkPostResult
 import json
 
-router = APIRouter()
+# GETs answer 304 while the posts table is unchanged
+router = APIRouter(dependencies=[Depends(conditional_get(POSTS_TABLES))])
 
 async def run_immediate_publish(post_id: int):
     """
     Background task to publish a post immediately.
     """
     logger.info(f"Running immediate publish for post {post_id}")
-    db = SessionLocal()
+    db = AsyncSessionLocal()
     try:
-        post = db.query(Post).filter(Post.id == post_id).first()
+        post = await db.get(Post, post_id)
         if not post:
             return
 
         # Handle reply_to_id logic
         reply_to_id = None
         if post.parent_id:
-            parent = db.query(Post).filter(Post.id == post.parent_id).first()
+            parent = await db.get(Post, post.parent_id)
             if parent and parent.tweet_id:
                 reply_to_id = parent.tweet_id
 
-        # Publish
-        result = await publish_post_task(
-            post.content, 
-            post.media_paths, 
-            reply_to_id=reply_to_id, 
-            username=post.username
-        )
+        media, rejected = await db.run_sync(check_publishable, post)
+
+        # Publish (same concurrency limits as scheduled posts)
+        # The lease was taken when the post was created/updated; keep it alive meanwhile
+        queue_wait_ms = None
+        started_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        if rejected:
+            result = {**rejected, "screenshot_path": None, "tweet_id": None}
+        else:
+            async with lease_heartbeat(post.id):
+                async with dispatcher.slot(post.username) as queue_wait_ms:
+                    started_at = datetime.now(timezone.utc).replace(tzinfo=None)
+                    result = await publish_post_task(
+                        post.content, 
+                        media=media, 
+                        reply_to_id=reply_to_id, 
+                        username=post.username
+                    )
 
         # Update status
-        post.status = "sent" if result.get("success") else "failed"
-        post.logs = (post.logs or "") + f"\n[Immediate] " + (result.get("log") or "No log provided")
-        post.screenshot_path = result.get("screenshot_path")
-        if result.get("tweet_id"):
-            post.tweet_id = result["tweet_id"]
-            # Day 0 baseline snapshot
-            from backend.models import PostMetricSnapshot
-            snapshot = PostMetricSnapshot(
-                post_id=post.id,
-                views=0,
-                likes=0,
-                reposts=0,
-                bookmarks=0,
-                replies=0,
-                url_link_clicks=0,
-                user_profile_clicks=0,
-                detail_expands=0,
-                timestamp=datetime.now(timezone.utc).replace(tzinfo=None)
-            )
-            db.add(snapshot)
-        
-        post.updated_at = datetime.now(timezone.utc).replace(tzinfo=None)
-        db.commit()
+        applied = await db.run_sync(apply_publish_result, post, result, "Immediate", "immediate", started_at, queue_wait_ms, post.scheduled_at)
+        await db.commit()
+        if not applied:
+            return
+        if post.next_attempt_at:
+            dispatcher.schedule(post.id, post.next_attempt_at)
+        else:
+            await release_children(post.id)
         logger.info(f"Immediate publish for post {post_id} finished. Status: {post.status}")
     except Exception as e:
         logger.error(f"Error in immediate publish for post {post_id}: {e}")
     finally:
-        db.close()
+        await db.close()
 
 @router.get("/stats", response_model=GlobalStats)
-def get_stats(db: Session = Depends(get_db)):
-    from sqlalchemy import func
-    
-    total_sent = db.query(Post).filter(Post.status == "sent", Post.is_repost.isnot(True)).count()
-    total_failed = db.query(Post).filter(Post.status == "failed").count()
-    total_scheduled = db.query(Post).filter(Post.status == "scheduled").count()
-    total_drafts = db.query(Post).filter(Post.status == "draft").count()
-    
-    # Aggregated metrics for sent posts (Excluding reposts)
-    metrics = db.query(
-        func.sum(Post.views_count).label("views"),
-        func.sum(Post.likes_count).label("likes"),
-        func.sum(Post.reposts_count).label("reposts"),
-        func.sum(Post.bookmarks_count).label("bookmarks"),
-        func.sum(Post.replies_count).label("replies"),
-        func.sum(Post.url_link_clicks).label("url_link_clicks"),
-        func.sum(Post.user_profile_clicks).label("user_profile_clicks"),
-        func.sum(Post.detail_expands).label("detail_expands")
-    ).filter(Post.status == "sent", Post.is_repost.isnot(True)).first()
-    
-    return {
-        "sent": total_sent,
-        "failed": total_failed,
-        "scheduled": total_scheduled,
-        "drafts": total_drafts,
-        "views": int(metrics.views or 0),
-        "likes": int(metrics.likes or 0),
-        "reposts": int(metrics.reposts or 0),
-        "bookmarks": int(metrics.bookmarks or 0),
-        "replies": int(metrics.replies or 0),
-        "url_link_clicks": int(metrics.url_link_clicks or 0),
-        "user_profile_clicks": int(metrics.user_profile_clicks or 0),
-        "detail_expands": int(metrics.detail_expands or 0)
-    }
+def get_stats(username: Optional[str] = None, db: Session = Depends(get_db)):
+    # Totals come from daily_account_stats (one row per account and day), not a scan of posts.
+    # Sent counts and metric sums exclude reposts.
+    return stats_totals(db, username=username)
 
 # CRUD Routes
 @router.post("/", response_model=PostResponse)
@@ -117,43 +98,104 @@ def create_post(post: PostCreate, background_tasks: BackgroundTasks, db: Session
         post_data["status"] = "processing"
         # Immediate posts don't need a scheduled_at, but we can keep it as now
         post_data["scheduled_at"] = datetime.now(timezone.utc).replace(tzinfo=None)
+        # Claimed by this replica right away so the scheduler leaves it alone
+        post_data["lease_owner"] = LEASE_OWNER
+        post_data["lease_expires_at"] = lease_expiry()
     
     db_post = Post(**post_data)
     db.add(db_post)
+    db.flush()
+    sync_post_media(db, db_post)
     db.commit()
     db.refresh(db_post)
     
     if is_immediate:
         background_tasks.add_task(run_immediate_publish, db_post.id)
+    elif db_post.status == "scheduled" and db_post.scheduled_at:
+        dispatcher.schedule(db_post.id, db_post.scheduled_at)
         
     return db_post
 
-@router.post("/import", response_model=PostResponse)
-async def import_tweet(request: ImportTweetRequest, db: Session = Depends(get_db)):
+@router.post("/bulk", response_model=BulkPostResult)
+def create_posts_bulk(payload: BulkPostCreate, db: Session = Depends(get_db)):
     """
-    Import a tweet by URL.
+    Creates many posts (threads included) in one transaction.
+    Items reply to each other with ref/parent_ref; a parent must come before its children.
+    Everything is validated first: any error rejects the whole batch with 422.
     """
-    logger.info(f"Importing tweet from {request.url} for user {request.username}")
-    
-    # 1. Run the worker task synchronously (or async await) to get data
-    result = await import_single_tweet(request.url, request.username)
-    
-    if not result.get("success"):
-        raise HTTPException(status_code=400, detail=f"Import failed: {result.get('log')}")
-    
-    tweet_data = result.get("tweet")
-    if not tweet_data:
-         raise HTTPException(status_code=404, detail="Tweet data not found in result.")
+    items = payload.posts
+    logger.info(f"Bulk creating {len(items)} posts")
+
+    errors = []
+    ref_index = {}
+    for i, item in enumerate(items):
+        if item.status == "immediate":
+            errors.append({"index": i, "error": "Immediate publishing is not supported in bulk."})
+        if item.status == "scheduled" and not item.scheduled_at:
+            errors.append({"index": i, "error": "Scheduled posts need scheduled_at."})
+        if item.parent_ref is not None:
+            if item.parent_id is not None:
+                errors.append({"index": i, "error": "Use either parent_id or parent_ref, not both."})
+            elif item.parent_ref not in ref_index:
+                errors.append({"index": i, "error": f"parent_ref '{item.parent_ref}' must refer to an earlier item."})
+        if item.ref is not None:
+            if item.ref in ref_index:
+                errors.append({"index": i, "error": f"Duplicate ref '{item.ref}'."})
+            ref_index[item.ref] = i
+
+    # Parents that already exist: one query for the whole batch
+    parent_ids = {item.parent_id for item in items if item.parent_id is not None}
+    if parent_ids:
+        found = {row.id for row in db.query(Post.id).filter(Post.id.in_(parent_ids))}
+        for i, item in enumerate(items):
+            if item.parent_id is not None and item.parent_id not in found:
+                errors.append({"index": i, "error": f"Parent post {item.parent_id} not found."})
+
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+
+    # Thread depth inside the payload: each level is flushed once so children get their parent's id
+    depth = []
+    for item in items:
+        depth.append(depth[ref_index[item.parent_ref]] + 1 if item.parent_ref is not None else 0)
+
+    db_posts = [Post(**item.model_dump(exclude={"ref", "parent_ref"})) for item in items]
+    for level in range(max(depth) + 1):
+        level_posts = []
+        for i, db_post in enumerate(db_posts):
+            if depth[i] != level:
+                continue
+            if items[i].parent_ref is not None:
+                db_post.parent_id = db_posts[ref_index[items[i].parent_ref]].id
+            level_posts.append(db_post)
+        db.add_all(level_posts)
+        db.flush()
+    for db_post in db_posts:
+        # Also for text-only posts: clears any post_media rows left under a reused id
+        sync_post_media(db, db_post)
+    db.commit()
+
+    dispatcher.schedule_many([
+        (db_post.id, db_post.scheduled_at) for db_post in db_posts
+        if db_post.status == "scheduled" and db_post.scheduled_at
+    ])
+
+    return {
+        "ids": [db_post.id for db_post in db_posts],
+        "refs": {item.ref: db_posts[i].id for i, item in enumerate(items) if item.ref is not None}
+    }
 
-    # 2. Upsert logic
+def _upsert_imported_tweet(db: Session, username: str, tweet_data: dict) -> Post:
+    """Creates or updates the post for an imported tweet and commits."""
+    # Upsert logic
     tweet_id = tweet_data['tweet_id']
     existing_post = db.query(Post).filter(Post.tweet_id == tweet_id).first()
     
     # NEW: Merge Strategy - Check for content match if not found by ID
     if not existing_post:
-        # Normalize content for comparison (basic strip)
-        imported_content = (tweet_data.get("content") or "").strip()
-        if imported_content and imported_content != "(No content)":
+        # Compare normalized content through the indexed content_hash
+        imported_hash = content_hash(tweet_data.get("content"))
+        if imported_hash and imported_hash != content_hash("(No content)"):
              # Find a candidate to merge:
              # - Must not have a tweet_id already (otherwise it's a different tweet)
              # - Status should be draft/scheduled/failed (not sent, unless we want to link sent posts too? 
@@ -161,19 +203,21 @@ async def import_tweet(request: ImportTweetRequest, db: Session = Depends(get_db
              # - Content matches
              candidate = db.query(Post).filter(
                  Post.tweet_id.is_(None),
-                 Post.content == imported_content
+                 Post.content_hash == imported_hash
              ).first()
              
              if candidate:
                  logger.info(f"Merging import {tweet_id} into existing post {candidate.id}")
                  existing_post = candidate
     
+    published_at = datetime.fromisoformat(tweet_data["published_at"].replace("Z", "+00:00")).replace(tzinfo=None) if tweet_data.get("published_at") else None
+
     # Default values for fields not in scraped data or differently named
     post_data = {
         "content": tweet_data.get("content") or "(No content)",
         "media_paths": json.dumps([tweet_data.get("media_url")]) if tweet_data.get("media_url") else None,
         "status": "sent",
-        "username": request.username,
+        "username": username,
         "is_repost": tweet_data.get("is_repost", False),
         "tweet_id": tweet_id,
         "views_count": tweet_data.get("views", 0),
@@ -181,13 +225,16 @@ async def import_tweet(request: ImportTweetRequest, db: Session = Depends(get_db
         "reposts_count": tweet_data.get("reposts", 0),
         "replies_count": tweet_data.get("replies", 0),
         "bookmarks_count": tweet_data.get("bookmarks", 0),
-        "url_link_clicks": tweet_data.get("url_link_clicks", 0),
-        "user_profile_clicks": tweet_data.get("user_profile_clicks", 0),
-        "detail_expands": tweet_data.get("detail_expands", 0),
         # Use published_at for created_at if available
-        "created_at": datetime.fromisoformat(tweet_data["published_at"].replace("Z", "+00:00")).replace(tzinfo=None) if tweet_data.get("published_at") else datetime.now(),
-        "updated_at": datetime.now()
+        "created_at": published_at or datetime.now(),
+        "updated_at": datetime.now(),
+        "published_at": published_at,
+        "next_refresh_at": plan_next_refresh(published_at, datetime.now(timezone.utc).replace(tzinfo=None))
     }
+    # Deep analytics only come from the browser scraper (not the HTTP read): keep the stored ones otherwise
+    for key in ("url_link_clicks", "user_profile_clicks", "detail_expands"):
+        if key in tweet_data:
+            post_data[key] = tweet_data[key]
 
     if existing_post:
         # Update
@@ -199,12 +246,60 @@ async def import_tweet(request: ImportTweetRequest, db: Session = Depends(get_db
         # Create
         db_post = Post(**post_data)
         db.add(db_post)
+    db.flush()
+    sync_post_media(db, db_post)
     
     db.commit()
     db.refresh(db_post)
     
     return db_post
 
+@router.post("/import", response_model=PostResponse)
+async def import_tweet(request: ImportTweetRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Import a tweet by URL.
+    """
+    logger.info(f"Importing tweet from {request.url} for user {request.username}")
+    
+    # 1. Run the worker task synchronously (or async await) to get data
+    result = await import_single_tweet(request.url, request.username)
+    
+    if not result.get("success"):
+        raise HTTPException(status_code=400, detail=f"Import failed: {result.get('log')}")
+    
+    tweet_data = result.get("tweet")
+    if not tweet_data:
+         raise HTTPException(status_code=404, detail="Tweet data not found in result.")
+
+    # 2. Upsert (sync ORM code through run_sync, so DB I/O doesn't block the loop)
+    return await db.run_sync(_upsert_imported_tweet, request.username, tweet_data)
+
+@router.get("/search", response_model=List[PostResponse])
+def search(
+    response: Response,
+    q: Optional[str] = None,
+    status: Optional[str] = None,
+    username: Optional[str] = None,
+    tag: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Full-text search over content and tags, combined with filters. Best match first
+    (newest first without q). The next page's cursor comes in the X-Next-Cursor header.
+    Registered before /{post_id} so "search" isn't read as an id.
+    """
+    try:
+        posts, next_cursor = search_posts(db, q, status, username, tag, date_from, date_to, limit, cursor)
+    except (ValueError, TypeError, IndexError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor ({e}).")
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return posts
+
 @router.get("/latest", response_model=PostResponse)
 def read_latest_post(db: Session = Depends(get_db)):
     logger.info("Fetching latest sent post")
@@ -219,17 +314,30 @@ def read_latest_post(db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="No sent posts found")
     return post
 
-@router.get("/", response_model=List[PostResponse])
-def read_posts(skip: int = 0, limit: int = 100, status: str = None, db: Session = Depends(get_db)):
-    query = db.query(Post)
-    
-    if status:
-        query = query.filter(Post.status == status)
-    else:
-        # Default behavior: Exclude 'quarantine'
-        query = query.filter(Post.status != "quarantine")
-        
-    posts = query.order_by(Post.id.desc()).offset(skip).limit(limit).all()
+@router.get("/", response_model=List[PostResponse], response_model_exclude_unset=True)
+def read_posts(
+    response: Response,
+    status: Optional[str] = None,
+    username: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    skip: int = Query(0, ge=0, deprecated=True),
+    db: Session = Depends(get_db)
+):
+    """
+    Newest posts first, without logs or screenshot paths unless fields= asks for them
+    (e.g. fields=id,content,status,logs returns only those). The next page's cursor
+    comes in the X-Next-Cursor header. skip (offset paging) still works but is
+    deprecated: 400 when combined with cursor.
+    """
+    try:
+        columns = parse_fields(fields)
+        posts, next_cursor = list_posts(db, status=status, username=username, limit=limit, cursor=cursor, fields=columns, skip=skip)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return posts
 
 @router.get("/{post_id}", response_model=PostResponse)
@@ -249,17 +357,27 @@ def update_post(post_id: int, post: PostUpdate, background_tasks: BackgroundTask
     update_data = post.model_dump(exclude_unset=True)
     
     if is_immediate:
-        update_data["status"] = "processing"
-        update_data["scheduled_at"] = datetime.now(timezone.utc).replace(tzinfo=None)
+        if not claim_for_immediate_publish(db, post_id):
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Post is already published or being published.")
+        db.refresh(db_post)
+        update_data.pop("status")
+        update_data.pop("scheduled_at", None)
     
     for key, value in update_data.items():
         setattr(db_post, key, value)
+    if "media_paths" in update_data:
+        sync_post_media(db, db_post)
     
     db.commit()
     db.refresh(db_post)
     
     if is_immediate:
         background_tasks.add_task(run_immediate_publish, db_post.id)
+    elif db_post.status == "scheduled" and db_post.scheduled_at:
+        dispatcher.schedule(db_post.id, db_post.scheduled_at)
+    else:
+        dispatcher.cancel(db_post.id)
         
     return db_post
 
@@ -272,6 +390,9 @@ def delete_post(post_id: int, db: Session = Depends(get_db)):
     if db_post is None:
         raise HTTPException(status_code=404, detail="Post not found")
     
+    delete_post_media(db, post_id)
+    drop_latest_metrics(db, post_id)
     db.delete(db_post)
     db.commit()
+    dispatcher.cancel(post_id)
     return {"ok": True}
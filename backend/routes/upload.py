@@ -1,16 +1,18 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
 import shutil
 import os
 import uuid
 from loguru import logger
-from backend.config import settings
+from backend.db import get_async_db
+from backend.services.media_probe import probe_media
+from backend.services.media_service import UPLOAD_DIR, register_upload
 
 router = APIRouter()
 
-UPLOAD_DIR = os.path.join(settings.DATA_DIR, "uploads")
-
 @router.post("/")
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(file: UploadFile = File(...), db: AsyncSession = Depends(get_async_db)):
     try:
         # Get original filename and extension
         original_filename = file.filename or "unknown"
@@ -29,13 +31,28 @@ async def upload_file(file: UploadFile = File(...)):
             shutil.copyfileobj(file.file, buffer)
             
         logger.info(f"Successfully saved upload: {original_filename} -> {new_filename} ({file_path})")
-
-        # Return absolute path for worker and relative URL for frontend
-        return {
-            "filename": new_filename,
-            "filepath": os.path.abspath(file_path),
-            "url": f"/uploads/{new_filename}" 
-        }
     except Exception as e:
         logger.error(f"Failed to save upload {file.filename}: {e}")
         raise HTTPException(status_code=500, detail=f"Could not save file: {str(e)}")
+
+    # Describe the file once, now: the publisher trusts post_media instead of probing the disk
+    url = f"/uploads/{new_filename}"
+    info = await asyncio.to_thread(probe_media, file_path)
+    media = await db.run_sync(register_upload, os.path.abspath(file_path), url, info)
+    if media.status != "ready":
+        logger.warning(f"Upload {new_filename} is not publishable ({media.status}).")
+
+    # Return absolute path for worker and relative URL for frontend
+    return {
+        "filename": new_filename,
+        "filepath": media.path,
+        "url": url,
+        "media_id": media.id,
+        "status": media.status,
+        "mime_type": media.mime_type,
+        "size_bytes": media.size_bytes,
+        "width": media.width,
+        "height": media.height,
+        "duration_ms": media.duration_ms,
+        "sha256": media.sha256
+    }
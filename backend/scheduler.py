@@ -1,9 +1,19 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from sqlalchemy.orm import Session
+from sqlalchemy import select
 from datetime import datetime, timedelta, timezone
-from backend.db import SessionLocal
-from backend.models import Post, PostMetricSnapshot
+from backend.db import AsyncSessionLocal
+from backend.models import Post
+from backend.services.publish_service import apply_publish_result, check_publishable
+from backend.services.dispatcher import dispatcher
+from backend.services.refresh_planner import plan_next_refresh
+from backend.services.backlog import pending_backlog, release_backlog, triage_backlog
+from backend.services.snapshot_rollup import compact_snapshots
+from backend.services.post_metrics import apply_scraped_stats, record_snapshot
+from backend.services.job_ledger import track_job, on_job_not_run, JOB_NOT_RUN_EVENTS
+from backend.services.leases import claimable_filter, claim_post, lease_heartbeat, parent_ready_filter, release_children
+from backend.config import settings
 from worker.publisher import publish_post_task, scrape_stats_task
+from worker.timing import PhaseTimer
 import asyncio
 from loguru import logger
 
@@ -11,157 +21,213 @@ scheduler = AsyncIOScheduler()
 
 async def check_scheduled_posts():
     """
-    Checks DB for posts that are 'scheduled' and past their scheduled_at time.
-    Triggers publication.
+    Safety-net scan. The dispatcher publishes scheduled posts the moment they are due;
+    this catches retries, posts stuck in 'processing' and anything the dispatcher missed.
+    Due posts are only submitted here, so the job never blocks on a publish.
+    Thread children waiting on their parent are left out: the parent releases them.
     """
     logger.info(f"Checking for due posts at {datetime.now()}...")
-    db: Session = SessionLocal()
+    async with track_job("check_scheduled_posts") as run:
+        db = AsyncSessionLocal()
+        try:
+            now_naive = datetime.now(timezone.utc).replace(tzinfo=None)
+            due_posts = (await db.execute(
+                select(Post.id, Post.username).where(claimable_filter(now_naive), parent_ready_filter())
+            )).all()
+
+            for post_id, username in due_posts:
+                if post_id in pending_backlog:
+                    continue  # Released by the dispatcher at its backlog slot
+                if dispatcher.submit(post_id, username):
+                    run.items += 1
+
+        except Exception as e:
+            run.errors += 1
+            logger.exception(f"Scheduler Loop Error: {e}")
+        finally:
+            await db.close()
+
+async def submit_due_posts(post_ids):
+    """
+    Dispatcher wake handler: submits the given posts if they are still due.
+    Children whose parent isn't published yet are dropped; release_children() picks them up.
+    """
+    pending_backlog.difference_update(post_ids)
+    db = AsyncSessionLocal()
     try:
-        now = datetime.now(timezone.utc)
-        # Fetch scheduled posts OR failed posts with retry_count < 3 (with 10min delay between retries)
-        due_posts = db.query(Post).filter(
-            (Post.status == "scheduled") & (Post.scheduled_at <= now.replace(tzinfo=None)) |
-            (Post.status == "failed") & (Post.retry_count < 3) & (Post.updated_at <= now.replace(tzinfo=None) - timedelta(minutes=10)) |
-            (Post.status == "processing") & (Post.updated_at <= now.replace(tzinfo=None) - timedelta(minutes=10))
-        ).all()
-
-        for post in due_posts:
-            logger.info(f"Triggering post {post.id} (Retry: {post.retry_count})...")
-            
-            # Increment retry count if it was a failure
-            if post.status == "failed":
-                post.retry_count += 1
-            
-            post.status = "processing"
-            db.commit()
-
-            # Check for Parent Post (Threading)
-            reply_to_id = None
-            if post.parent_id:
-                parent_post = db.query(Post).filter(Post.id == post.parent_id).first()
-                if parent_post:
-                    if parent_post.tweet_id:
-                        reply_to_id = parent_post.tweet_id
-                    elif parent_post.status == 'sent':
-                         # Parent sent but no ID? Can't reply properly.
-                         logger.warning(f"Parent {parent_post.id} sent but has no tweet_id. Posting as standalone.")
-                    else:
-                        logger.info(f"Parent {parent_post.id} not yet ready (Status: {parent_post.status}). Skipping child {post.id} for now.")
-                        continue # Skip this cycle, wait for parent
+        now_naive = datetime.now(timezone.utc).replace(tzinfo=None)
+        due_posts = (await db.execute(select(Post.id, Post.username).where(
+            Post.id.in_(post_ids), claimable_filter(now_naive), parent_ready_filter()
+        ))).all()
+
+        for post_id, username in due_posts:
+            dispatcher.submit(post_id, username)
+
+    except Exception as e:
+        logger.exception(f"Dispatcher Submit Error: {e}")
+    finally:
+        await db.close()
+
+async def publish_post(post_id: int, queue_wait_ms: int = None):
+    """
+    Publishes one due post and stores the result.
+    Runs inside a dispatcher slot, with its own session since several run at once.
+    The post is claimed atomically first, so other replicas can't publish it too.
+    """
+    db = AsyncSessionLocal()
+    try:
+        post = await db.get(Post, post_id)
+        if not post or post.status not in ("scheduled", "failed", "processing"):
+            return
+
+        # Check for Parent Post (Threading) before claiming the child
+        reply_to_id = None
+        if post.parent_id:
+            parent_post = await db.get(Post, post.parent_id)
+            if parent_post:
+                if parent_post.tweet_id:
+                    reply_to_id = parent_post.tweet_id
+                elif parent_post.status == 'sent':
+                     # Parent sent but no ID? Can't reply properly.
+                     logger.warning(f"Parent {parent_post.id} sent but has no tweet_id. Posting as standalone.")
                 else:
-                    logger.info(f"Parent {post.parent_id} not found. Posting as standalone.")
+                    logger.info(f"Parent {parent_post.id} not yet ready (Status: {parent_post.status}). Child {post.id} waits for its release.")
+                    return # Released by the parent's publish
+            else:
+                logger.info(f"Parent {post.parent_id} not found. Posting as standalone.")
 
-            # Trigger worker with a total task timeout
+        # What we are late against: the retry time for failed posts, the schedule otherwise
+        due_at = post.next_attempt_at if post.status == "failed" else post.scheduled_at
+
+        # Claim: status -> processing, retry_count + 1 for failed posts, lease for this replica
+        if not await db.run_sync(claim_post, post.id):
+            logger.info(f"Post {post.id} was claimed by another worker or is no longer due. Skipping.")
+            return
+        await db.refresh(post)  # The claim was a bulk UPDATE: reload status/retry_count/lease
+
+        logger.info(f"Triggering post {post.id} (Retry: {post.retry_count}, queued {queue_wait_ms} ms)...")
+
+        # Trigger worker with a total task timeout
+        # The timer is ours so phases survive a wait_for cancellation
+        timer = PhaseTimer()
+        started_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        # Duplicates and posts whose files are gone fail without launching a browser
+        media, rejected = await db.run_sync(check_publishable, post)
+        if rejected:
+            result = {**rejected, "timings": timer.summary(ok=False)}
+        else:
             try:
                 logger.debug(f"Running publish_post_task for {post.id}...")
-                # We wrap the await in a wait_for to be 100% sure it doesn't hang the scheduler thread
-                result = await asyncio.wait_for(
-                    publish_post_task(post.content, post.media_paths, reply_to_id=reply_to_id, username=post.username),
-                    timeout=300.0 # 5 minute max for video processing
-                )
+                # We wrap the await in a wait_for to be 100% sure it doesn't hang the dispatcher slot
+                async with lease_heartbeat(post.id):
+                    result = await asyncio.wait_for(
+                        publish_post_task(post.content, media=media, reply_to_id=reply_to_id, username=post.username, timer=timer),
+                        timeout=300.0 # 5 minute max for video processing
+                    )
             except asyncio.TimeoutError:
-                logger.error(f"Task for post {post.id} TIMED OUT after 2 mins.")
-                result = {"success": False, "log": "Scheduler Timeout: Task took too long (>2 mins)"}
+                logger.error(f"Task for post {post.id} TIMED OUT after 5 mins (phase: {timer.current}).")
+                result = {"success": False, "log": f"Scheduler Timeout: Task took too long (>5 mins) during '{timer.current}'", "timings": timer.summary(ok=False)}
             except Exception as e:
                 logger.exception(f"Task for post {post.id} CRASHED: {e}")
-                result = {"success": False, "log": f"Scheduler Error: {e}"}
-            
-            # Update result
-            post.status = "sent" if result.get("success") else "failed"
-            post.logs = (post.logs or "") + f"\n[Retry {post.retry_count}] " + (result.get("log") or "No log provided")
-            post.screenshot_path = result.get("screenshot_path")
-            if result.get("tweet_id"):
-                post.tweet_id = result["tweet_id"]
-                # Day 0 baseline snapshot
-                snapshot = PostMetricSnapshot(
-                    post_id=post.id,
-                    views=0,
-                    likes=0,
-                    reposts=0,
-                    timestamp=datetime.now(timezone.utc).replace(tzinfo=None)
-                )
-                db.add(snapshot)
-                
-            post.updated_at = datetime.now(timezone.utc).replace(tzinfo=None)
-            db.commit()
-            logger.info(f"Post {post.id} processed. Status: {post.status}. ID: {post.tweet_id}")
+                result = {"success": False, "log": f"Scheduler Error: {e}", "timings": timer.summary(ok=False)}
 
-    except Exception as e:
-        logger.exception(f"Scheduler Loop Error: {e}")
+        # Update result
+        applied = await db.run_sync(apply_publish_result, post, result, f"Retry {post.retry_count}", "scheduler", started_at, queue_wait_ms, due_at)
+        await db.commit()
+        if not applied:
+            return
+        logger.info(f"Post {post.id} processed. Status: {post.status}. ID: {post.tweet_id}")
+        if post.next_attempt_at:
+            logger.info(f"Post {post.id} will be retried at {post.next_attempt_at}.")
+            dispatcher.schedule(post.id, post.next_attempt_at)
+        else:
+            await release_children(post.id)
     finally:
-        db.close()
+        await db.close()
 
 
 async def update_analytics():
     """
-    Updates stats for posts sent in the last 48 hours.
+    Refreshes stats for sent posts whose next_refresh_at is due, most overdue first,
+    up to ANALYTICS_SCRAPE_BUDGET per cycle. The refresh planner spaces scrapes out
+    as posts age and stops after a week, so the load follows recent posting volume.
     """
     logger.info("Running Analytics Update...")
-    db: Session = SessionLocal()
-    try:
-        # Check posts sent recently (e.g. last 48 hours) that have a tweet_id
-        now_naive = datetime.now(timezone.utc).replace(tzinfo=None)
-        cutoff = now_naive - timedelta(hours=48)
-        recent_posts = db.query(Post).filter(
-            (Post.status == "sent") & 
-            (Post.tweet_id.isnot(None)) & 
-            (Post.updated_at >= cutoff)
-        ).all()
-
-        for post in recent_posts:
-            logger.debug(f"Scraping stats for Post {post.id} ({post.tweet_id})...")
-            result = await scrape_stats_task(post.tweet_id, username=post.username)
-            if result["success"]:
-                stats = result["stats"]
-                post.views_count = stats.get("views", 0)
-                post.likes_count = stats.get("likes", 0)
-                post.reposts_count = stats.get("reposts", 0)
-                post.bookmarks_count = stats.get("bookmarks", 0)
-                post.replies_count = stats.get("replies", 0)
-                post.url_link_clicks = stats.get("url_link_clicks", 0)
-                post.user_profile_clicks = stats.get("user_profile_clicks", 0)
-                post.detail_expands = stats.get("detail_expands", 0)
+    async with track_job("update_analytics") as run:
+        db = AsyncSessionLocal()
+        try:
+            now_naive = datetime.now(timezone.utc).replace(tzinfo=None)
+            due_posts = (await db.scalars(select(Post).where(
+                (Post.status == "sent") & 
+                (Post.tweet_id.isnot(None)) & 
+                (Post.next_refresh_at <= now_naive)
+            ).order_by(Post.next_refresh_at).limit(settings.ANALYTICS_SCRAPE_BUDGET))).all()
+
+            for post in due_posts:
+                logger.debug(f"Scraping stats for Post {post.id} ({post.tweet_id})...")
+                result = await scrape_stats_task(post.tweet_id, username=post.username)
+                # Failed scrapes wait for the next slot too, so one broken post can't eat the budget
+                post.next_refresh_at = plan_next_refresh(
+                    post.published_at or post.created_at, datetime.now(timezone.utc).replace(tzinfo=None)
+                )
+                if result["success"]:
+                    stats = result["stats"]
+                    apply_scraped_stats(post, stats)
                 
-                post.updated_at = datetime.now(timezone.utc).replace(tzinfo=None)
-                post.logs = (post.logs or "") + f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M')}] Scraper Success: Views={stats.get('views')}, Likes={stats.get('likes')}, Clicks={stats.get('url_link_clicks')}"
+                    post.updated_at = datetime.now(timezone.utc).replace(tzinfo=None)
+                    post.logs = (post.logs or "") + f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M')}] Scraper Success: Views={stats.get('views')}, Likes={stats.get('likes')}, Clicks={post.url_link_clicks}"
                 
-                # Crear Snapshot histórico completo
-                snapshot = PostMetricSnapshot(
-                    post_id=post.id,
-                    views=post.views_count,
-                    likes=post.likes_count,
-                    reposts=post.reposts_count,
-                    bookmarks=post.bookmarks_count,
-                    replies=post.replies_count,
-                    url_link_clicks=post.url_link_clicks,
-                    user_profile_clicks=post.user_profile_clicks,
-                    detail_expands=post.detail_expands,
-                    timestamp=datetime.now(timezone.utc).replace(tzinfo=None)
-                )
-                db.add(snapshot)
+                    # Crear Snapshot histórico completo
+                    await db.run_sync(record_snapshot, post, post.updated_at)
                 
-                db.commit()
-                logger.info(f"Updated Post {post.id}: {stats}")
-            else:
-                logger.warning(f"Failed to scrape Post {post.id}: {result['log']}")
-                post.logs = (post.logs or "") + f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M')}] Scraper Failed: {result['log']}"
-                db.commit()
+                    await db.commit()
+                    run.items += 1
+                    logger.info(f"Updated Post {post.id}: {stats}")
+                else:
+                    run.errors += 1
+                    logger.warning(f"Failed to scrape Post {post.id}: {result['log']}")
+                    post.logs = (post.logs or "") + f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M')}] Scraper Failed: {result['log']}"
+                    await db.commit()
             
-            # Gentle delay between scrapes
-            await asyncio.sleep(10) 
+                # Gentle delay between scrapes
+                await asyncio.sleep(10) 
 
-    except Exception as e:
-        logger.exception(f"Analytics Update Loop Error: {e}")
-    finally:
-        db.close()
+        except Exception as e:
+            run.errors += 1
+            logger.exception(f"Analytics Update Loop Error: {e}")
+        finally:
+            await db.close()
 
-def start_scheduler():
-    scheduler.add_job(check_scheduled_posts, "interval", minutes=1)
-    # Run analytics every 15 minutes for higher resolution tracking
-    scheduler.add_job(update_analytics, "interval", minutes=15)
+async def compact_snapshots_job():
+    """
+    Rolls old post snapshots up into hourly/daily buckets and applies retention
+    (SNAPSHOT_RAW_DAYS, SNAPSHOT_HOURLY_DAYS, SNAPSHOT_RETENTION_DAYS).
+    """
+    async with track_job("compact_snapshots") as run:
+        async with AsyncSessionLocal() as db:
+            result = await db.run_sync(compact_snapshots)
+            run.items = sum(result.values())
+
+async def start_scheduler():
+    # Scheduled posts are published by the dispatcher's timer heap.
+    # The interval scan is only a safety net (retries, stuck posts, missed wakeups).
+    # Posts that fell due while we were down are released gradually, not all at once:
+    # sorted out before the dispatcher starts, queued before its first wakeup
+    backlog = await triage_backlog()
+    await dispatcher.start(submit_due_posts, publish_post)
+    release_backlog(backlog)
+    scheduler.add_job(check_scheduled_posts, "interval", minutes=settings.SCHEDULER_SAFETY_SCAN_MINUTES, id="check_scheduled_posts")
+    # Run analytics every 15 minutes (the shortest refresh tier); only due posts are scraped
+    scheduler.add_job(update_analytics, "interval", minutes=15, id="update_analytics")
     
     # Run full history sync every 6 hours to catch up with external changes
-    scheduler.add_job(sync_history_job, "interval", hours=6)
+    scheduler.add_job(sync_history_job, "interval", hours=6, id="sync_history_job")
+
+    # Snapshot rollups only move whole hours, so a few runs a day keep the tiers current
+    scheduler.add_job(compact_snapshots_job, "interval", hours=6, id="compact_snapshots")
+
+    # Runs skipped because the previous one was still going (or missed) go to the job ledger too
+    scheduler.add_listener(on_job_not_run, JOB_NOT_RUN_EVENTS)
     
     scheduler.start()
 
@@ -174,37 +240,41 @@ async def sync_history_job():
     import os
     import json
     
-    db: Session = SessionLocal()
-    try:
-        # Discover accounts from file system (similar to get_status)
-        worker_dir = os.path.join(os.path.dirname(__file__), "..", "worker")
-        accounts_dir = os.path.join(worker_dir, "accounts")
+    async with track_job("sync_history_job") as run:
+        db = AsyncSessionLocal()
+        try:
+            # Discover accounts from file system (similar to get_status)
+            worker_dir = os.path.join(os.path.dirname(__file__), "..", "worker")
+            accounts_dir = os.path.join(worker_dir, "accounts")
         
-        usernames = []
+            usernames = []
         
-        # 1. File based accounts
-        if os.path.exists(accounts_dir):
-            for username in os.listdir(accounts_dir):
-                user_info_path = os.path.join(accounts_dir, username, "user_info.json")
-                if os.path.exists(user_info_path):
-                    usernames.append(username)
-
-        # 2. Env var account
-        env_username = os.environ.get('X_USERNAME')
-        if env_username and env_username not in usernames:
-             usernames.append(env_username)
-
-        for username in usernames:
-            logger.info(f"Auto-Syncing {username}...")
-            try:
-                await sync_account_history(username, db)
-            except Exception as e:
-                logger.error(f"Auto-Sync failed for {username}: {e}")
+            # 1. File based accounts
+            if os.path.exists(accounts_dir):
+                for username in os.listdir(accounts_dir):
+                    user_info_path = os.path.join(accounts_dir, username, "user_info.json")
+                    if os.path.exists(user_info_path):
+                        usernames.append(username)
+
+            # 2. Env var account
+            env_username = os.environ.get('X_USERNAME')
+            if env_username and env_username not in usernames:
+                 usernames.append(env_username)
+
+            for username in usernames:
+                logger.info(f"Auto-Syncing {username}...")
+                try:
+                    await sync_account_history(username, db)
+                    run.items += 1
+                except Exception as e:
+                    run.errors += 1
+                    logger.error(f"Auto-Sync failed for {username}: {e}")
             
-            # Sleep between accounts
-            await asyncio.sleep(30)
+                # Sleep between accounts
+                await asyncio.sleep(30)
 
-    except Exception as e:
-        logger.exception(f"History Sync Loop Error: {e}")
-    finally:
-        db.close()
+        except Exception as e:
+            run.errors += 1
+            logger.exception(f"History Sync Loop Error: {e}")
+        finally:
+            await db.close()
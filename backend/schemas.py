@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, ConfigDict, field_validator
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 class PostBase(BaseModel):
     content: str = Field(..., min_length=1, max_length=280)
@@ -16,14 +16,13 @@ class PostCreate(PostBase):
 class PostUpdate(PostBase):
     content: Optional[str] = Field(None, min_length=1, max_length=280)
 
-class PostResponse(PostBase):
+class PostListItem(PostBase):
+    """What post listings return by default: everything but the logs and the screenshot."""
     id: int
     content: Optional[str] = None # Override base to allow robust read
     media_url: Optional[str] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
-    logs: Optional[str] = None
-    screenshot_path: Optional[str] = None
     tweet_id: Optional[str] = None
     views_count: int = 0
     likes_count: int = 0
@@ -35,6 +34,7 @@ class PostResponse(PostBase):
     user_profile_clicks: int = 0
     detail_expands: int = 0
     is_repost: bool = False
+    has_media: bool = False
     
     @field_validator('views_count', 'likes_count', 'reposts_count', 'bookmarks_count', 'replies_count', 'url_link_clicks', 'user_profile_clicks', 'detail_expands', mode='before')
     @classmethod
@@ -55,6 +55,23 @@ class PostResponse(PostBase):
     
     model_config = ConfigDict(from_attributes=True)
 
+class PostResponse(PostListItem):
+    logs: Optional[str] = None
+    screenshot_path: Optional[str] = None
+
+
+class BulkPostItem(PostCreate):
+    # Client-side handle, so later items in the same payload can reply to this one
+    ref: Optional[str] = None
+    parent_ref: Optional[str] = None
+
+class BulkPostCreate(BaseModel):
+    posts: List[BulkPostItem] = Field(..., min_length=1, max_length=1000)
+
+class BulkPostResult(BaseModel):
+    ids: List[int] # Same order as the request
+    refs: Dict[str, int] = {}
+
 
 class ImportTweetRequest(BaseModel):
     url: str
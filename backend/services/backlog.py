@@ -0,0 +1,106 @@
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Set
+from loguru import logger
+from sqlalchemy.orm import Session
+from backend.config import settings
+from backend.db import AsyncSessionLocal
+from backend.models import Post
+from backend.services.dispatcher import dispatcher
+from backend.services.leases import claimable_filter, parent_ready_filter, release_lease
+
+# Overdue posts found at startup that the dispatcher releases gradually.
+# The safety scan leaves them alone until their release slot comes up.
+pending_backlog: Set[int] = set()
+
+
+def _due_at(post: Post) -> datetime:
+    if post.status == "failed" and post.next_attempt_at:
+        return post.next_attempt_at
+    return post.scheduled_at or post.updated_at
+
+
+def _triage_backlog(db: Session, policy: str, now: datetime):
+    """
+    Applies the stale policy to the overdue posts and commits.
+    Returns (overdue count, post ids to release per account oldest first,
+    skipped post ids, rescheduled (post_id, scheduled_at)).
+    """
+    stale_before = now - timedelta(hours=settings.BACKLOG_STALE_HOURS)
+    backlog = db.query(Post).filter(claimable_filter(now), parent_ready_filter()).all()
+
+    by_account = defaultdict(list)
+    skipped, rescheduled = [], []
+    for post in sorted(backlog, key=_due_at):
+        due_at = _due_at(post)
+        if due_at < stale_before and policy == "skip":
+            post.status = "draft"
+            post.next_attempt_at = None
+            release_lease(post)
+            post.logs = (post.logs or "") + f"\n[Backlog] {now.isoformat()} - Overdue since {due_at}. Moved back to drafts."
+            skipped.append(post.id)
+        elif due_at < stale_before and policy == "reschedule":
+            days = math.ceil((now - due_at) / timedelta(days=1))
+            post.status = "scheduled"
+            post.scheduled_at = due_at + timedelta(days=days)
+            # A new publish, not another retry of the missed one: it gets the full retry budget
+            post.next_attempt_at = None
+            post.retry_count = 0
+            release_lease(post)
+            post.logs = (post.logs or "") + f"\n[Backlog] {now.isoformat()} - Overdue since {due_at}. Rescheduled to {post.scheduled_at}."
+            rescheduled.append((post.id, post.scheduled_at))
+        else:
+            by_account[post.username].append(post.id)
+    db.commit()
+    return len(backlog), by_account, skipped, rescheduled
+
+
+async def triage_backlog():
+    """
+    Finds the posts that became due while we were down and applies BACKLOG_STALE_POLICY
+    to those overdue by more than BACKLOG_STALE_HOURS: "publish" (release like the rest),
+    "skip" (back to draft) or "reschedule" (same time of day, on the next day still ahead).
+    Runs before the dispatcher starts, so its first wakeup doesn't publish them all at once.
+    Returns the plan for release_backlog(), None when the drain failed.
+    """
+    policy = settings.BACKLOG_STALE_POLICY
+    if policy not in ("publish", "skip", "reschedule"):
+        logger.warning(f"Unknown BACKLOG_STALE_POLICY '{policy}', using 'publish'.")
+        policy = "publish"
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    try:
+        async with AsyncSessionLocal() as db:
+            return (now, *await db.run_sync(_triage_backlog, policy, now))
+    except Exception as e:
+        logger.exception(f"Backlog drain failed: {e}")
+        return None
+
+
+def release_backlog(plan):
+    """
+    Spreads the overdue posts out: each account gets one post every BACKLOG_RELEASE_SECONDS,
+    oldest first. Must run on the event loop once the dispatcher has started, before it
+    gets to run (no await in between).
+    """
+    if not plan or not plan[1]:
+        return
+    now, overdue, by_account, skipped, rescheduled = plan
+
+    for post_id in skipped:
+        dispatcher.cancel(post_id)
+    dispatcher.schedule_many(rescheduled)
+    spacing = timedelta(seconds=settings.BACKLOG_RELEASE_SECONDS)
+    for post_ids in by_account.values():
+        for slot, post_id in enumerate(post_ids):
+            pending_backlog.add(post_id)
+            dispatcher.schedule(post_id, now + slot * spacing)
+
+    released = sum(len(ids) for ids in by_account.values())
+    longest = max((len(ids) for ids in by_account.values()), default=0)
+    logger.info(
+        f"Backlog drain: {overdue} overdue posts. {released} released over "
+        f"{len(by_account)} accounts (~{int(max(0, longest - 1) * spacing.total_seconds() / 60)} min), "
+        f"{len(skipped)} skipped, {len(rescheduled)} rescheduled."
+    )
@@ -0,0 +1,28 @@
+import hashlib
+import re
+import unicodedata
+from typing import Optional
+
+# posts.content_hash: sha256 of the normalized text, so "same content" is an indexed
+# equality instead of a comparison on the TEXT column.
+# Normalization only removes differences that don't change what is posted:
+# Unicode forms (NFKC), line ending styles, runs of spaces/tabs, spaces at the ends of lines
+# and surrounding whitespace. Line breaks are kept: the same words on one line or on
+# several are different posts.
+
+_LINE_ENDINGS = re.compile(r"\r\n?")
+_HORIZONTAL = re.compile(r"[^\S\n]+")
+_LINE_EDGES = re.compile(r" ?\n ?")
+
+
+def normalize_content(content: Optional[str]) -> str:
+    text = _LINE_ENDINGS.sub("\n", unicodedata.normalize("NFKC", content or ""))
+    return _LINE_EDGES.sub("\n", _HORIZONTAL.sub(" ", text)).strip()
+
+
+def content_hash(content: Optional[str]) -> Optional[str]:
+    """Hex sha256 of the normalized content; None for empty content."""
+    normalized = normalize_content(content)
+    if not normalized:
+        return None
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
@@ -0,0 +1,128 @@
+from datetime import date
+from typing import List, Optional
+from loguru import logger
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+from backend.models import DailyAccountStats
+
+# daily_account_stats holds, per account and day, post counts by status and the metric sums
+# of sent posts: everything the dashboard totals need, without scanning posts.
+# A post belongs to the day it was published (created_at until then). Reposts are not counted as sent.
+# Triggers on posts keep it current: an insert, a delete or an update of a tracked column
+# removes the row's old contribution and adds the new one, so ORM writes, bulk UPDATEs
+# (claims, sync auto-heal) and raw SQL all stay in step.
+# rebuild_daily_stats() recomputes the table from posts (backfill / repair).
+
+METRIC_COLUMNS = {
+    "views": "views_count",
+    "likes": "likes_count",
+    "reposts": "reposts_count",
+    "bookmarks": "bookmarks_count",
+    "replies": "replies_count",
+    "url_link_clicks": "url_link_clicks",
+    "user_profile_clicks": "user_profile_clicks",
+    "detail_expands": "detail_expands",
+}
+COUNT_STATUSES = {"sent": "sent", "failed": "failed", "scheduled": "scheduled", "drafts": "draft"}
+STAT_COLUMNS = list(COUNT_STATUSES) + list(METRIC_COLUMNS)
+
+# Columns whose changes move a post to another row or change what it adds up to
+TRACKED_COLUMNS = ["status", "is_repost", "username", "published_at", "created_at"] + list(METRIC_COLUMNS.values())
+
+
+def _contribution(row: str, dialect: str, sign: int = 1) -> List[str]:
+    """SELECT expressions for what posts row `row` adds to its (username, day) row, times sign."""
+    original = f"{row}.is_repost IS NOT 1" if dialect == "sqlite" else f"{row}.is_repost IS NOT TRUE"
+    sent = f"{row}.status = 'sent' AND {original}"
+    day = f"date(COALESCE({row}.published_at, {row}.created_at))" if dialect == "sqlite" \
+        else f"CAST(COALESCE({row}.published_at, {row}.created_at) AS DATE)"
+
+    parts = [f"COALESCE({row}.username, '')", day]
+    for name, status in COUNT_STATUSES.items():
+        condition = sent if name == "sent" else f"{row}.status = '{status}'"
+        parts.append(f"CASE WHEN {condition} THEN {sign} ELSE 0 END")
+    for column in METRIC_COLUMNS.values():
+        parts.append(f"CASE WHEN {sent} THEN {sign} * COALESCE({row}.{column}, 0) ELSE 0 END")
+    return parts
+
+
+def _upsert(row: str, dialect: str, sign: int) -> str:
+    columns = ", ".join(["username", "day"] + STAT_COLUMNS)
+    updates = ", ".join(f"{c} = daily_account_stats.{c} + excluded.{c}" for c in STAT_COLUMNS)
+    # The WHERE also keeps SQLite from reading ON CONFLICT as a join constraint
+    return (
+        f"INSERT INTO daily_account_stats ({columns}) SELECT {', '.join(_contribution(row, dialect, sign))} "
+        f"WHERE COALESCE({row}.published_at, {row}.created_at) IS NOT NULL "
+        f"ON CONFLICT (username, day) DO UPDATE SET {updates}"
+    )
+
+
+def _trigger_ddl(dialect: str):
+    tracked = ", ".join(TRACKED_COLUMNS)
+    if dialect == "sqlite":
+        return [
+            "DROP TRIGGER IF EXISTS posts_daily_stats_insert",
+            "DROP TRIGGER IF EXISTS posts_daily_stats_update",
+            "DROP TRIGGER IF EXISTS posts_daily_stats_delete",
+            f"CREATE TRIGGER posts_daily_stats_insert AFTER INSERT ON posts BEGIN {_upsert('NEW', dialect, 1)}; END",
+            f"CREATE TRIGGER posts_daily_stats_update AFTER UPDATE OF {tracked} ON posts BEGIN "
+            f"{_upsert('OLD', dialect, -1)}; {_upsert('NEW', dialect, 1)}; END",
+            f"CREATE TRIGGER posts_daily_stats_delete AFTER DELETE ON posts BEGIN {_upsert('OLD', dialect, -1)}; END",
+        ]
+    return [
+        f"""CREATE OR REPLACE FUNCTION posts_daily_stats() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN {_upsert('OLD', dialect, -1)}; END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN {_upsert('NEW', dialect, 1)}; END IF;
+            RETURN NULL;
+        END $$ LANGUAGE plpgsql""",
+        "DROP TRIGGER IF EXISTS posts_daily_stats ON posts",
+        f"CREATE TRIGGER posts_daily_stats AFTER INSERT OR DELETE OR UPDATE OF {tracked} ON posts "
+        "FOR EACH ROW EXECUTE FUNCTION posts_daily_stats()",
+    ]
+
+
+def install_daily_stats_triggers(conn):
+    """(Re)creates the posts triggers that maintain daily_account_stats. Does not commit."""
+    for statement in _trigger_ddl(conn.dialect.name):
+        conn.execute(text(statement))
+
+
+def rebuild_daily_stats(conn) -> int:
+    """Recomputes daily_account_stats from posts. Does not commit. Returns the number of rows."""
+    columns = ", ".join(["username", "day"] + STAT_COLUMNS)
+    username, day, *stats = _contribution("posts", conn.dialect.name)
+    contributions = ", ".join([f"{username} AS username", f"{day} AS day"] + [f"{expr} AS {c}" for expr, c in zip(stats, STAT_COLUMNS)])
+    sums = ", ".join(f"SUM({c})" for c in STAT_COLUMNS)
+    conn.execute(text("DELETE FROM daily_account_stats"))
+    conn.execute(text(f"""
+        INSERT INTO daily_account_stats ({columns})
+        SELECT username, day, {sums}
+        FROM (SELECT {contributions} FROM posts WHERE COALESCE(published_at, created_at) IS NOT NULL) contributions
+        GROUP BY username, day
+    """))
+    rows = conn.execute(text("SELECT COUNT(*) FROM daily_account_stats")).scalar()
+    logger.info(f"Rebuilt daily_account_stats: {rows} rows.")
+    return rows
+
+
+def stats_totals(db: Session, username: Optional[str] = None, since: Optional[date] = None) -> dict:
+    """Sums of every stat over the matching (account, day) rows."""
+    query = db.query(*[func.coalesce(func.sum(getattr(DailyAccountStats, c)), 0).label(c) for c in STAT_COLUMNS])
+    if username is not None:
+        query = query.filter(DailyAccountStats.username == username)
+    if since is not None:
+        query = query.filter(DailyAccountStats.day >= since)
+    row = query.one()
+    return {c: int(getattr(row, c)) for c in STAT_COLUMNS}
+
+
+def stats_by_day(db: Session, since: date, username: Optional[str] = None):
+    """Per-day sums (all accounts unless username is given), oldest first."""
+    query = db.query(
+        DailyAccountStats.day,
+        *[func.sum(getattr(DailyAccountStats, c)).label(c) for c in STAT_COLUMNS]
+    ).filter(DailyAccountStats.day >= since)
+    if username is not None:
+        query = query.filter(DailyAccountStats.username == username)
+    return query.group_by(DailyAccountStats.day).order_by(DailyAccountStats.day).all()
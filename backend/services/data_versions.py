@@ -0,0 +1,113 @@
+import hashlib
+import random
+import time
+from typing import Iterable, Optional
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+from backend.models import DataVersion
+
+# data_versions holds one write counter per table. Triggers bump it on every insert, update
+# or delete, so ORM writes, bulk UPDATEs and raw SQL all count (same approach as daily_stats).
+# An endpoint's ETag is a hash of the counters of the tables it reads: when none moved,
+# the client's copy is still good and the API answers 304 without running the query.
+#   SQLite:   row triggers (no statement triggers); the counter row stays hot in the page cache.
+#             SQLite has a single writer anyway, so the shared counter rows cost no concurrency.
+#   Postgres: one statement trigger per table calling bump_data_version(), which bumps a
+#             per-table SEQUENCE instead. An UPDATE of a data_versions row would hold its row
+#             lock until commit and serialize every writer of the table; nextval() never waits.
+#             Sequences aren't transactional, so a rolled back write moves the ETag too: that
+#             only costs the client one full response.
+
+POSTS_TABLES = ["posts"]
+ANALYTICS_TABLES = [
+    "posts", "post_metrics_snapshots", "post_metrics_rollups",
+    "account_metrics", "publish_attempts", "job_runs",
+]
+ACCOUNT_TABLES = ["account_metrics", "post_metrics_latest"]
+TRACKED_TABLES = list(dict.fromkeys(POSTS_TABLES + ANALYTICS_TABLES + ACCOUNT_TABLES))
+
+# Responses over "the last N hours/days" change as time passes, not only on writes:
+# their ETags also change every WINDOW_BUCKET_SECONDS
+WINDOW_BUCKET_SECONDS = 300
+
+
+def _sequence(table: str) -> str:
+    return f"data_version_{table}"
+
+
+def _trigger_ddl(dialect: str):
+    if dialect == "sqlite":
+        statements = []
+        for table in TRACKED_TABLES:
+            for op in ("INSERT", "UPDATE", "DELETE"):
+                name = f"{table}_data_version_{op.lower()}"
+                statements += [
+                    f"DROP TRIGGER IF EXISTS {name}",
+                    f"CREATE TRIGGER {name} AFTER {op} ON {table} BEGIN "
+                    f"UPDATE data_versions SET version = version + 1 WHERE name = '{table}'; END",
+                ]
+        return statements
+
+    statements = ["""CREATE OR REPLACE FUNCTION bump_data_version() RETURNS trigger AS $$
+        BEGIN
+            PERFORM nextval(TG_ARGV[0]);
+            RETURN NULL;
+        END $$ LANGUAGE plpgsql"""]
+    for table in TRACKED_TABLES:
+        statements += [
+            # Random start: a rebuilt database doesn't hand out ETags a client cached before
+            f"CREATE SEQUENCE IF NOT EXISTS {_sequence(table)} START WITH {random.randint(1, 2 ** 30)}",
+            f"DROP TRIGGER IF EXISTS {table}_data_version ON {table}",
+            f"CREATE TRIGGER {table}_data_version AFTER INSERT OR UPDATE OR DELETE ON {table} "
+            f"FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version('{_sequence(table)}')",
+        ]
+    return statements
+
+
+def install_version_triggers(conn):
+    """Seeds the counters and (re)creates the triggers that bump them. Does not commit."""
+    for table in TRACKED_TABLES if conn.dialect.name == "sqlite" else []:
+        # Random start: a rebuilt database doesn't hand out ETags a client cached before
+        conn.execute(text("INSERT INTO data_versions (name, version) VALUES (:name, :version) ON CONFLICT (name) DO NOTHING"),
+                     {"name": table, "version": random.randint(0, 2 ** 30)})
+    for statement in _trigger_ddl(conn.dialect.name):
+        conn.execute(text(statement))
+
+
+def resource_etag(db: Session, tables: Iterable[str], key: str, windowed: bool = False, extra: str = "") -> Optional[str]:
+    """
+    Weak ETag for a response built from `tables`. key identifies the representation
+    (path and query string). None when a counter is missing (triggers not installed):
+    no ETag is better than one that never changes.
+    """
+    tables = list(tables)
+    if db.get_bind().dialect.name == "postgresql":
+        # last_value stays NULL until the first nextval(): start_value - 1 keeps it moving
+        rows = db.execute(text(
+            "SELECT sequencename, COALESCE(last_value, start_value - 1) FROM pg_sequences "
+            "WHERE schemaname = current_schema() AND sequencename IN :names"
+        ).bindparams(bindparam("names", expanding=True)), {"names": [_sequence(t) for t in tables]}).all()
+        versions = {name.removeprefix("data_version_"): version for name, version in rows}
+    else:
+        versions = dict(db.query(DataVersion.name, DataVersion.version).filter(DataVersion.name.in_(tables)).all())
+    if len(versions) < len(tables):
+        return None
+    parts = [key, extra] + [f"{t}:{versions[t]}" for t in tables]
+    if windowed:
+        parts.append(str(int(time.time() // WINDOW_BUCKET_SECONDS)))
+    return 'W/"' + hashlib.sha1("|".join(parts).encode()).hexdigest()[:24] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check, weak comparison (RFC 9110): a list of tags or *."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in [tag.removeprefix("W/") for tag in tags]
+
+
+class NotModified(Exception):
+    """Raised by the conditional GET dependency; main.py turns it into a bodiless 304."""
+
+    def __init__(self, etag: str):
+        self.etag = etag
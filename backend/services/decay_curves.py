@@ -0,0 +1,135 @@
+from datetime import datetime, timedelta, timezone
+from itertools import chain
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from backend.services.snapshot_rollup import METRICS
+
+# Engagement decay curves: how far a post had got at the same age (1 h, 6 h, 24 h, 7 d...).
+# Snapshots are taken at irregular times, so each post's series is interpolated onto a common
+# age grid, then posts of the same account are summarized as percentile bands.
+# Everything after the SQL query is vectorized over all samples of all posts at once:
+# the series are never walked row by row in Python.
+
+DEFAULT_AGES_HOURS = (1, 6, 24, 168)
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def _age_hours(dialect: str, column: str) -> str:
+    published = "COALESCE(p.published_at, p.created_at)"
+    if dialect == "sqlite":
+        return f"(julianday({column}) - julianday({published})) * 24.0"
+    return f"EXTRACT(EPOCH FROM ({column} - {published})) / 3600.0"
+
+
+def load_samples(db: Session, metric: str, since: datetime, username: Optional[str] = None):
+    """
+    (post_ids, usernames) of the own sent posts published since `since`, and their samples as
+    one float array of (post index, age in hours, value) rows, raw snapshots and rollups alike
+    (see snapshot_rollup: the tiers cover disjoint periods), sorted by post then age.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric {metric}. Valid: {', '.join(METRICS)}")
+    dialect = db.get_bind().dialect.name
+    own = "p.is_repost IS NOT 1" if dialect == "sqlite" else "p.is_repost IS NOT TRUE"
+    where = f"p.status = 'sent' AND {own} AND COALESCE(p.published_at, p.created_at) >= :since"
+    if username:
+        where += " AND p.username = :username"
+    params = {"since": since, "username": username}
+
+    posts = db.execute(text(f"SELECT p.id, COALESCE(p.username, '') FROM posts p WHERE {where} ORDER BY p.id"), params).fetchall()
+    if not posts:
+        return np.array([], dtype=np.int64), [], np.empty((0, 3))
+    post_ids = np.array([p[0] for p in posts], dtype=np.int64)
+    usernames = [p[1] for p in posts]
+
+    samples = db.execute(text(f"""
+        SELECT s.post_id, {_age_hours(dialect, 's.timestamp')}, COALESCE(s.{metric}, 0)
+        FROM post_metrics_snapshots s JOIN posts p ON p.id = s.post_id WHERE {where}
+        UNION ALL
+        SELECT r.post_id, {_age_hours(dialect, 'r.timestamp')}, COALESCE(r.{metric}, 0)
+        FROM post_metrics_rollups r JOIN posts p ON p.id = r.post_id WHERE {where}
+    """), params).fetchall()
+    # fromiter over the flattened rows: np.array() on Row objects is ~40x slower
+    data = np.fromiter(chain.from_iterable(samples), dtype=float, count=3 * len(samples)).reshape(-1, 3)
+    data = data[data[:, 1] >= 0]
+
+    # post_id -> index into post_ids (ids are sorted), then sort by (post, age)
+    data[:, 0] = np.searchsorted(post_ids, data[:, 0].astype(np.int64))
+    data = data[np.lexsort((data[:, 1], data[:, 0]))]
+    return post_ids, usernames, data
+
+
+def interpolate_on_grid(data: np.ndarray, n_posts: int, ages: Sequence[float]) -> np.ndarray:
+    """
+    (n_posts, len(ages)) matrix of each post's value at each age, linearly interpolated
+    between its surrounding samples. Every post starts at 0 when published (age 0).
+    NaN past a post's last sample: it isn't extrapolated to ages it hasn't been seen at.
+    data: (post index, age, value) rows sorted by post then age.
+    """
+    ages = np.asarray(ages, dtype=float)
+    # Implicit (age 0, value 0) point at the start of every post
+    origin = np.column_stack([np.arange(n_posts, dtype=float), np.zeros(n_posts), np.zeros(n_posts)])
+    data = np.concatenate([origin, data])
+    data = data[np.lexsort((data[:, 1], data[:, 0]))]
+    post, age, value = data[:, 0].astype(np.int64), data[:, 1], data[:, 2]
+
+    # One sorted key per sample; ages are spread over disjoint per-post ranges
+    span = max(age.max(initial=0.0), ages.max(initial=0.0)) + 1.0
+    keys = post * span + age
+    targets = (np.arange(n_posts)[:, None] * span + ages[None, :]).ravel()
+    target_post = np.repeat(np.arange(n_posts), len(ages))
+
+    right = np.searchsorted(keys, targets, side="left")  # First sample at or after the target age
+    left = np.clip(right - 1, 0, len(keys) - 1)
+    right_c = np.clip(right, 0, len(keys) - 1)
+    exact = (right < len(keys)) & (post[right_c] == target_post) & (keys[right_c] == targets)
+    inside = (right < len(keys)) & (post[right_c] == target_post) & (post[left] == target_post)
+
+    gap = age[right_c] - age[left]
+    weight = np.divide(targets - keys[left], gap, out=np.zeros_like(gap), where=gap > 0)
+    result = np.where(inside, value[left] + weight * (value[right_c] - value[left]), np.nan)
+    result = np.where(exact, value[right_c], result)
+    return result.reshape(n_posts, len(ages))
+
+
+def _nullable(values: np.ndarray) -> List[Optional[float]]:
+    return [None if np.isnan(v) else round(float(v), 2) for v in values]
+
+
+def decay_bands(
+    db: Session,
+    metric: str = "views",
+    ages: Sequence[float] = DEFAULT_AGES_HOURS,
+    days: int = 90,
+    username: Optional[str] = None,
+) -> Dict:
+    """
+    Per-account percentile bands of `metric` at each age, over the own posts published in
+    the last `days` days. posts[i] is how many posts reached ages[i] (were seen at or after it).
+    Raises ValueError for an unknown metric.
+    """
+    since = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=days)
+    post_ids, usernames, data = load_samples(db, metric, since, username)
+    ages = sorted(float(a) for a in ages)
+    matrix = interpolate_on_grid(data, len(post_ids), ages) if len(post_ids) else np.empty((0, len(ages)))
+
+    accounts = {}
+    names = np.array(usernames, dtype=object)
+    for account in sorted(set(usernames)):
+        rows = matrix[names == account]
+        reached = (~np.isnan(rows)).sum(axis=0)
+        bands = {f"p{q}": [None] * len(ages) for q in PERCENTILES}
+        if reached.any():
+            # Only ages some post reached: the others stay None
+            values = np.nanpercentile(rows[:, reached > 0], PERCENTILES, axis=0)
+            for q, column in zip(PERCENTILES, values):
+                band = np.full(len(ages), np.nan)
+                band[reached > 0] = column
+                bands[f"p{q}"] = _nullable(band)
+        accounts[account] = {"posts": reached.tolist(), **bands}
+
+    logger.debug(f"Decay bands for {metric}: {len(post_ids)} posts, {len(data)} samples, {len(accounts)} accounts")
+    return {"metric": metric, "ages_hours": ages, "days": days, "accounts": accounts}
@@ -0,0 +1,186 @@
+import asyncio
+import heapq
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from loguru import logger
+from backend.config import settings
+from sqlalchemy import select
+from backend.db import AsyncSessionLocal
+from backend.models import Post
+
+
+def _to_naive_utc(value: datetime) -> datetime:
+    # DB timestamps are naive UTC; API payloads may carry a timezone
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class Dispatcher:
+    """
+    In-process timer heap of upcoming publish times.
+    Sleeps until the earliest entry is due and hands the due post ids to on_due,
+    which submits the ones still due. Submitted posts run concurrently, bounded by
+    PUBLISH_CONCURRENCY overall and one at a time per account.
+    The periodic scan in scheduler.py is only a safety net on top of this.
+
+    schedule()/cancel() are thread safe: sync routes call them from the threadpool.
+    """
+
+    def __init__(self):
+        self._heap = []  # (due_at, post_id), may contain stale entries
+        self._due_at: Dict[int, datetime] = {}  # post_id -> current due time
+        self._in_flight = set()
+        self._tasks = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._on_due: Optional[Callable[[List[int]], Awaitable[None]]] = None
+        self._executor: Optional[Callable[[int, int], Awaitable[None]]] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._account_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    async def start(self, on_due: Callable[[List[int]], Awaitable[None]], executor: Callable[[int, int], Awaitable[None]]):
+        """
+        Starts the wake loop on the running event loop and loads upcoming posts.
+        executor(post_id, queue_wait_ms) publishes one post.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._on_due = on_due
+        self._executor = executor
+        await self.load()
+        self._task = self._loop.create_task(self._run())
+
+    async def load(self):
+        """Loads every scheduled post and pending retry into the heap (startup)."""
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(select(Post.id, Post.scheduled_at, Post.next_attempt_at).where(
+                (Post.status == "scheduled") & Post.scheduled_at.isnot(None) |
+                (Post.status == "failed") & Post.next_attempt_at.isnot(None)
+            ))).all()
+        for post_id, scheduled_at, next_attempt_at in rows:
+            self._schedule(post_id, next_attempt_at or scheduled_at)
+        logger.info(f"Dispatcher loaded {len(rows)} scheduled posts and retries.")
+
+    def schedule(self, post_id: int, due_at: datetime):
+        self._call(self._schedule, post_id, _to_naive_utc(due_at))
+
+    def schedule_many(self, entries: List[Tuple[int, datetime]]):
+        """Schedules several (post_id, due_at) at once with a single loop hand-off."""
+        if entries:
+            self._call(self._schedule_many, [(post_id, _to_naive_utc(due_at)) for post_id, due_at in entries])
+
+    def cancel(self, post_id: int):
+        self._call(self._cancel, post_id)
+
+    def submit(self, post_id: int, username: Optional[str]) -> bool:
+        """
+        Queues a due post for publication. Must be called from the event loop.
+        False if the post is already queued or running in this process.
+        """
+        if post_id in self._in_flight:
+            return False
+        self._in_flight.add(post_id)
+        task = asyncio.get_running_loop().create_task(self._execute(post_id, username))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    @asynccontextmanager
+    async def slot(self, username: Optional[str]):
+        """
+        Waits for this account's turn and a global publish slot.
+        Yields the time spent waiting, in ms.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(max(1, settings.PUBLISH_CONCURRENCY))
+        queued = time.perf_counter()
+        # Account first, so a busy account doesn't hold a global slot while waiting
+        async with self._account_locks[username or ""]:
+            async with self._slots:
+                yield int((time.perf_counter() - queued) * 1000)
+
+    async def _execute(self, post_id: int, username: Optional[str]):
+        try:
+            async with self.slot(username) as queue_wait_ms:
+                await self._executor(post_id, queue_wait_ms)
+        except Exception as e:
+            logger.exception(f"Dispatcher failed to publish post {post_id}: {e}")
+        finally:
+            self._in_flight.discard(post_id)
+
+    async def wait_idle(self):
+        """Waits until every submitted post has finished (scripts)."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def _call(self, fn, *args):
+        if self._loop is None or self._loop.is_closed():
+            return  # Not running (scripts, tests): the safety scan covers it
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            fn(*args)
+        else:
+            self._loop.call_soon_threadsafe(fn, *args)
+
+    def _schedule(self, post_id: int, due_at: datetime):
+        self._due_at[post_id] = due_at
+        heapq.heappush(self._heap, (due_at, post_id))
+        if self._wakeup:
+            self._wakeup.set()
+
+    def _schedule_many(self, entries: List[Tuple[int, datetime]]):
+        for post_id, due_at in entries:
+            self._due_at[post_id] = due_at
+            heapq.heappush(self._heap, (due_at, post_id))
+        if self._wakeup:
+            self._wakeup.set()
+
+    def _cancel(self, post_id: int):
+        # Lazy deletion: the heap entry is skipped when popped
+        self._due_at.pop(post_id, None)
+
+    def _pop_due(self, now: datetime) -> List[int]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due_at, post_id = heapq.heappop(self._heap)
+            if self._due_at.get(post_id) == due_at:
+                del self._due_at[post_id]
+                due.append(post_id)
+        return due
+
+    def _next_timeout(self, now: datetime) -> Optional[float]:
+        while self._heap and self._due_at.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)  # Drop stale entries
+        if not self._heap:
+            return None
+        return max(0.0, (self._heap[0][0] - now).total_seconds())
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            due = self._pop_due(now)
+            if due:
+                logger.info(f"Dispatcher woke up for posts {due}")
+                try:
+                    await self._on_due(due)
+                except Exception as e:
+                    logger.exception(f"Dispatcher handler error: {e}")
+                continue
+
+            timeout = self._next_timeout(now)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+dispatcher = Dispatcher()
@@ -0,0 +1,102 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from apscheduler.events import EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED
+from loguru import logger
+from backend.db import AsyncSessionLocal, SessionLocal
+from backend.models import JobRun
+
+
+class JobRunStats:
+    """Counters a job fills in while it runs."""
+
+    def __init__(self):
+        self.items = 0
+        self.errors = 0
+
+
+def _record(**fields):
+    db = SessionLocal()
+    try:
+        db.add(JobRun(**fields))
+        db.commit()
+    except Exception as e:
+        # The ledger must never break the job it is measuring
+        logger.error(f"Failed to record job run {fields.get('job')}: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+async def _record_async(**fields):
+    try:
+        async with AsyncSessionLocal() as db:
+            db.add(JobRun(**fields))
+            await db.commit()
+    except Exception as e:
+        logger.error(f"Failed to record job run {fields.get('job')}: {e}")
+
+
+@asynccontextmanager
+async def track_job(job: str):
+    """
+    Records one run of a scheduler job in job_runs: start, end, duration,
+    items processed and errors. An exception escaping the job marks the run
+    as 'error' and is re-raised.
+    """
+    stats = JobRunStats()
+    started_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    started = time.perf_counter()
+    status, error = "ok", None
+    try:
+        yield stats
+    except asyncio.CancelledError:
+        status = "cancelled"
+        raise
+    except Exception as e:
+        status, error = "error", str(e)
+        stats.errors += 1
+        raise
+    finally:
+        if status == "ok" and stats.errors:
+            status = "partial"
+        await _record_async(
+            job=job,
+            status=status,
+            started_at=started_at,
+            finished_at=datetime.now(timezone.utc).replace(tzinfo=None),
+            duration_ms=int((time.perf_counter() - started) * 1000),
+            items=stats.items,
+            errors=stats.errors,
+            error=error
+        )
+
+
+# Ledger writes started by the listener, kept referenced until they finish
+_pending_records = set()
+
+
+def on_job_not_run(event):
+    """
+    APScheduler listener: runs it never started, either because the previous run
+    was still going (max_instances) or because the run time was missed.
+    AsyncIOScheduler calls it on the event loop, so the row is written by a task
+    instead of a blocking insert; outside a loop (scripts) it is written inline.
+    """
+    status = "skipped" if event.code == EVENT_JOB_MAX_INSTANCES else "missed"
+    run_times = getattr(event, "scheduled_run_times", None) or [event.scheduled_run_time]
+    for run_time in run_times:
+        if run_time.tzinfo is not None:
+            run_time = run_time.astimezone(timezone.utc).replace(tzinfo=None)
+        logger.warning(f"Job {event.job_id} {status} its run at {run_time}.")
+        try:
+            task = asyncio.get_running_loop().create_task(_record_async(job=event.job_id, status=status, started_at=run_time))
+        except RuntimeError:
+            _record(job=event.job_id, status=status, started_at=run_time)
+            continue
+        _pending_records.add(task)
+        task.add_done_callback(_pending_records.discard)
+
+
+JOB_NOT_RUN_EVENTS = EVENT_JOB_MAX_INSTANCES | EVENT_JOB_MISSED
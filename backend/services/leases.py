@@ -0,0 +1,200 @@
+import asyncio
+import os
+import socket
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import case, exists, func, select, update
+from sqlalchemy.orm import Session, aliased
+from loguru import logger
+from backend.config import settings
+from backend.db import AsyncSessionLocal
+from backend.models import Post
+from backend.services.dispatcher import dispatcher
+
+# Identifies this process when several replicas share one database
+LEASE_OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def lease_expiry(now: datetime = None) -> datetime:
+    return (now or _now()) + timedelta(seconds=settings.LEASE_SECONDS)
+
+
+def claimable_filter(now: datetime):
+    """
+    Posts any replica may claim: scheduled and due, failed with a due next_attempt_at,
+    or 'processing' with an expired lease (the owner died mid-publish).
+    Legacy 'processing' rows without a lease fall back to the old 10 minute rule.
+    """
+    return (
+        (Post.status == "scheduled") & (Post.scheduled_at <= now) |
+        (Post.status == "failed") & (Post.next_attempt_at <= now) |
+        (Post.status == "processing") & (
+            (Post.lease_expires_at <= now) |
+            Post.lease_expires_at.is_(None) & (Post.updated_at <= now - timedelta(minutes=10))
+        )
+    )
+
+
+def parent_ready_filter():
+    """
+    Posts whose thread parent doesn't hold them back: no parent, a deleted parent,
+    or a published one (tweet_id set, or 'sent' without one).
+    Children of pending parents are released by the parent's publish instead.
+    """
+    parent = aliased(Post)
+    return ~exists().where(
+        parent.id == Post.parent_id,
+        parent.tweet_id.is_(None),
+        parent.status != "sent"
+    )
+
+
+async def release_children(parent_id: int):
+    """
+    Dependency release, once a parent's final publish result is committed (no retry pending).
+    Published (or deleted) parent: submits its due thread children right away instead of
+    waiting for the next scan; children scheduled later stay in the dispatcher heap as usual.
+    Parent failed for good: its waiting children could never go out as replies and would stay
+    out of parent_ready_filter forever, so they fail too, and so on down the thread.
+    """
+    db = AsyncSessionLocal()
+    try:
+        now = _now()
+        parent = await db.get(Post, parent_id)
+        if parent is None or parent.tweet_id or parent.status == "sent":
+            children = (await db.execute(select(Post.id, Post.username).where(
+                Post.parent_id == parent_id, claimable_filter(now), parent_ready_filter()
+            ))).all()
+            for child_id, username in children:
+                logger.info(f"Parent {parent_id} published. Releasing child {child_id}.")
+                dispatcher.submit(child_id, username)
+            return
+
+        if parent.status != "failed" or parent.next_attempt_at is not None:
+            return  # Still going: the next result decides
+        failed_parents = [parent_id]
+        while failed_parents:
+            children = (await db.scalars(select(Post).where(
+                Post.parent_id.in_(failed_parents), Post.tweet_id.is_(None),
+                (Post.status == "scheduled") | (Post.status == "failed") & Post.next_attempt_at.isnot(None)
+            ))).all()
+            for child in children:
+                logger.warning(f"Parent {child.parent_id} failed for good. Failing child {child.id}.")
+                child.status = "failed"
+                child.next_attempt_at = None
+                child.updated_at = now
+                child.logs = (child.logs or "") + f"\n[Thread] Parent post {child.parent_id} failed. Not published."
+                dispatcher.cancel(child.id)
+            await db.flush()
+            failed_parents = [child.id for child in children]
+        await db.commit()
+
+    except Exception as e:
+        logger.exception(f"Child Release Error: {e}")
+    finally:
+        await db.close()
+
+
+def claim_post(db: Session, post_id: int) -> bool:
+    """
+    Atomically moves a due post to 'processing' under this process' lease.
+    Only one replica can win: SQLite relies on a conditional UPDATE,
+    Postgres locks the row first with FOR UPDATE SKIP LOCKED so competing
+    replicas skip it instead of queueing behind the lock.
+    Commits on success.
+    """
+    now = _now()
+    if db.bind.dialect.name == "postgresql":
+        locked = db.query(Post.id).filter(Post.id == post_id, claimable_filter(now))\
+            .with_for_update(skip_locked=True).first()
+        if not locked:
+            db.rollback()
+            return False
+
+    claimed = db.query(Post).filter(Post.id == post_id, claimable_filter(now)).update({
+        # Evaluated against the old row, so a failed post counts one more retry
+        Post.retry_count: func.coalesce(Post.retry_count, 0) + case((Post.status == "failed", 1), else_=0),
+        Post.status: "processing",
+        Post.lease_owner: LEASE_OWNER,
+        Post.lease_expires_at: lease_expiry(now),
+        Post.updated_at: now
+    }, synchronize_session=False)
+    db.commit()
+    return claimed == 1
+
+
+def claim_for_immediate_publish(db: Session, post_id: int) -> bool:
+    """
+    "Publish now" on an existing post: takes the lease unless the post is already on X or
+    another publish holds a live lease (scheduler, retry, an earlier click), which would
+    publish it twice. Same conditional UPDATE as claim_post, without the due-time rules.
+    Does not commit: the caller saves its other changes in the same transaction.
+    """
+    now = _now()
+    free = (Post.status != "sent") & Post.tweet_id.is_(None) & (
+        Post.lease_owner.is_(None) | (Post.lease_expires_at <= now)
+    )
+    if db.bind.dialect.name == "postgresql":
+        if not db.query(Post.id).filter(Post.id == post_id, free).with_for_update(skip_locked=True).first():
+            return False
+
+    return db.query(Post).filter(Post.id == post_id, free).update({
+        Post.status: "processing",
+        Post.scheduled_at: now,
+        Post.lease_owner: LEASE_OWNER,
+        Post.lease_expires_at: lease_expiry(now),
+        Post.updated_at: now
+    }, synchronize_session=False) == 1
+
+
+async def renew_lease(post_id: int) -> bool:
+    """Extends our lease on a post. False if another owner took it over."""
+    async with AsyncSessionLocal() as db:
+        renewed = await db.execute(
+            update(Post).where(Post.id == post_id, Post.lease_owner == LEASE_OWNER)
+            .values(lease_expires_at=lease_expiry())
+        )
+        await db.commit()
+        return renewed.rowcount == 1
+
+
+def hold_lease(db: Session, post_id: int) -> bool:
+    """
+    Confirms (and extends) our lease right before the publish result is written, in the caller's
+    transaction. The conditional UPDATE keeps the row write-locked until the caller commits, so no
+    replica can claim the post between this check and the result. False if another owner took over.
+    """
+    return db.query(Post).filter(Post.id == post_id, Post.lease_owner == LEASE_OWNER).update(
+        {Post.lease_expires_at: lease_expiry()}, synchronize_session=False
+    ) == 1
+
+
+def release_lease(post: Post):
+    """Clears the lease once the publish result is written (caller commits)."""
+    post.lease_owner = None
+    post.lease_expires_at = None
+
+
+@asynccontextmanager
+async def lease_heartbeat(post_id: int):
+    """Renews the lease in the background while the publish is running."""
+    async def beat():
+        while True:
+            await asyncio.sleep(settings.LEASE_SECONDS / 3)
+            try:
+                if not await renew_lease(post_id):
+                    logger.warning(f"Lost lease on post {post_id} (owner: {LEASE_OWNER}).")
+                    return
+            except Exception as e:
+                logger.error(f"Lease heartbeat failed for post {post_id}: {e}")
+
+    task = asyncio.create_task(beat())
+    try:
+        yield
+    finally:
+        task.cancel()
@@ -0,0 +1,181 @@
+import hashlib
+import mimetypes
+import os
+import struct
+from typing import Optional, Tuple
+
+# Reads what the publisher needs to know about an upload straight from the file header:
+# MIME type, pixel size and (for MP4/MOV) duration. Stdlib only, so no Pillow/ffprobe on the server.
+
+SIGNATURES = [
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"\x1aE\xdf\xa3", "video/webm"),
+]
+
+# ISO-BMFF major brands (bytes 8-12, after "ftyp"). HEIF/AVIF images share the container with MP4:
+# only known video brands are videos, unknown ones fall back to the file extension
+FTYP_BRANDS = {
+    b"isom": "video/mp4", b"iso2": "video/mp4", b"iso4": "video/mp4", b"iso5": "video/mp4", b"iso6": "video/mp4",
+    b"mp41": "video/mp4", b"mp42": "video/mp4", b"avc1": "video/mp4", b"dash": "video/mp4",
+    b"M4V ": "video/x-m4v", b"M4VP": "video/x-m4v",
+    b"qt  ": "video/quicktime",
+    b"3gp4": "video/3gpp", b"3gp5": "video/3gpp", b"3gp6": "video/3gpp",
+    b"heic": "image/heic", b"heix": "image/heic",
+    b"hevc": "image/heic-sequence", b"hevx": "image/heic-sequence",
+    b"mif1": "image/heif", b"heim": "image/heif", b"heis": "image/heif",
+    b"msf1": "image/heif-sequence",
+    b"avif": "image/avif", b"avis": "image/avif",
+}
+
+
+def sniff_mime(head: bytes, path: str) -> Optional[str]:
+    for signature, mime in SIGNATURES:
+        if head.startswith(signature):
+            return mime
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:8] == b"ftyp" and head[8:12] in FTYP_BRANDS:
+        return FTYP_BRANDS[head[8:12]]
+    return mimetypes.guess_type(path)[0]
+
+
+def _png_size(head: bytes) -> Optional[Tuple[int, int]]:
+    if len(head) >= 24 and head[12:16] == b"IHDR":
+        return struct.unpack(">II", head[16:24])
+    return None
+
+
+def _gif_size(head: bytes) -> Optional[Tuple[int, int]]:
+    return struct.unpack("<HH", head[6:10]) if len(head) >= 10 else None
+
+
+def _webp_size(head: bytes) -> Optional[Tuple[int, int]]:
+    chunk = head[12:16]
+    if chunk == b"VP8 " and len(head) >= 30:
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and len(head) >= 25:
+        bits = int.from_bytes(head[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X" and len(head) >= 30:
+        return int.from_bytes(head[24:27], "little") + 1, int.from_bytes(head[27:30], "little") + 1
+    return None
+
+
+def _jpeg_size(f) -> Optional[Tuple[int, int]]:
+    f.seek(2)
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        if marker[1] in (0xD8, 0x01) or 0xD0 <= marker[1] <= 0xD7:
+            continue
+        length = f.read(2)
+        if len(length) < 2:
+            return None
+        segment = struct.unpack(">H", length)[0]
+        # SOF0..SOF15 carry the frame size, except DHT (C4), JPG (C8) and DAC (CC)
+        if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+            data = f.read(5)
+            if len(data) < 5:
+                return None
+            height, width = struct.unpack(">HH", data[1:5])
+            return width, height
+        f.seek(segment - 2, os.SEEK_CUR)
+
+
+def _mp4_boxes(f, start: int, end: int):
+    """Yields (type, payload offset, payload end) of the ISO-BMFF boxes in [start, end)."""
+    offset = start
+    while offset + 8 <= end:
+        f.seek(offset)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        size, box = struct.unpack(">I4s", header)
+        payload = offset + 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            payload += 8
+        elif size == 0:
+            size = end - offset
+        if size < 8:
+            return
+        yield box, payload, min(offset + size, end)
+        offset += size
+
+
+def _mp4_info(f, file_size: int) -> Tuple[Optional[int], Optional[Tuple[int, int]]]:
+    """Duration (ms) from moov/mvhd and the largest track size from moov/trak/tkhd."""
+    duration_ms, dimensions = None, None
+    for box, start, end in _mp4_boxes(f, 0, file_size):
+        if box != b"moov":
+            continue
+        for child, child_start, child_end in _mp4_boxes(f, start, end):
+            if child == b"mvhd":
+                f.seek(child_start)
+                version = f.read(1)[0]
+                f.seek(child_start + (20 if version == 1 else 12))
+                if version == 1:
+                    timescale, duration = struct.unpack(">IQ", f.read(12))
+                else:
+                    timescale, duration = struct.unpack(">II", f.read(8))
+                if timescale:
+                    duration_ms = int(duration * 1000 / timescale)
+            elif child == b"trak":
+                for leaf, leaf_start, _ in _mp4_boxes(f, child_start, child_end):
+                    if leaf != b"tkhd":
+                        continue
+                    f.seek(leaf_start)
+                    version = f.read(1)[0]
+                    # Width/height are the last 8 bytes (16.16 fixed point)
+                    f.seek(leaf_start + (88 if version == 1 else 76))
+                    width, height = struct.unpack(">II", f.read(8))
+                    width, height = width >> 16, height >> 16
+                    if width and height and (not dimensions or width * height > dimensions[0] * dimensions[1]):
+                        dimensions = (width, height)
+        break
+    return duration_ms, dimensions
+
+
+def probe_media(path: str) -> dict:
+    """
+    Size, sha256, MIME type, dimensions and duration of a local file.
+    Fields that can't be read are None; a missing file raises OSError.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+        size = f.tell()
+
+        f.seek(0)
+        head = f.read(64)
+        mime = sniff_mime(head, path)
+        dimensions, duration_ms = None, None
+        try:
+            if mime == "image/png":
+                dimensions = _png_size(head)
+            elif mime == "image/gif":
+                dimensions = _gif_size(head)
+            elif mime == "image/webp":
+                dimensions = _webp_size(head)
+            elif mime == "image/jpeg":
+                dimensions = _jpeg_size(f)
+            elif mime in ("video/mp4", "video/x-m4v", "video/quicktime"):
+                duration_ms, dimensions = _mp4_info(f, size)
+        except (struct.error, IndexError, ValueError):
+            # Truncated or unusual header: the file is still uploadable, just undescribed
+            pass
+
+    return {
+        "size_bytes": size,
+        "sha256": digest.hexdigest(),
+        "mime_type": mime,
+        "width": dimensions[0] if dimensions else None,
+        "height": dimensions[1] if dimensions else None,
+        "duration_ms": duration_ms,
+    }
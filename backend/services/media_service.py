@@ -0,0 +1,114 @@
+import json
+import os
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+from loguru import logger
+from sqlalchemy.orm import Session
+from backend.config import settings
+from backend.models import Post, PostMedia
+from backend.services.media_probe import probe_media, sniff_mime
+
+UPLOAD_DIR = os.path.join(settings.DATA_DIR, "uploads")
+
+
+def parse_media_paths(media_paths: Optional[str]) -> List[str]:
+    """Post.media_paths as a list: a JSON list (or JSON string), else a comma separated string."""
+    if not media_paths:
+        return []
+    try:
+        paths = json.loads(media_paths)
+        if isinstance(paths, str):
+            paths = paths.split(",")
+    except (ValueError, TypeError):
+        paths = str(media_paths).split(",")
+    return [str(p).strip() for p in paths if p and str(p).strip()]
+
+
+def describe_file(path: str) -> dict:
+    """PostMedia fields for a path: probed metadata for local files, a status otherwise."""
+    if path.startswith("http"):
+        return {"path": path, "status": "remote", "mime_type": sniff_mime(b"", path.split("?")[0])}
+
+    resolved = path
+    if not os.path.exists(resolved):
+        # Paths saved on another machine/container: same file name in our upload dir
+        resolved = os.path.join(UPLOAD_DIR, os.path.basename(path.replace("\\", "/")))
+    if not os.path.exists(resolved):
+        return {"path": path, "status": "missing"}
+
+    info = probe_media(resolved)
+    status = "ready" if info["size_bytes"] > 0 else "empty"
+    return {"path": os.path.abspath(resolved), "status": status, **info}
+
+
+def register_upload(db: Session, path: str, url: str, info: dict) -> PostMedia:
+    """Records a freshly saved upload (not linked to a post yet) and commits."""
+    media = PostMedia(
+        path=path,
+        url=url,
+        status="ready" if info.get("size_bytes") else "empty",
+        created_at=datetime.now(timezone.utc).replace(tzinfo=None),
+        **info
+    )
+    db.add(media)
+    db.commit()
+    db.refresh(media)
+    return media
+
+
+def sync_post_media(db: Session, post: Post):
+    """
+    Makes the post's post_media rows match its media_paths, in order.
+    Uploads registered by /api/upload are linked as they are; other paths are probed once here.
+    Attachments no longer listed are dropped. Sets post.has_media. Does not commit.
+    """
+    paths = parse_media_paths(post.media_paths)
+    current = {m.path: m for m in db.query(PostMedia).filter(PostMedia.post_id == post.id).all()}
+
+    kept = []
+    for position, path in enumerate(paths):
+        media = current.pop(path, None)
+        if media is None:
+            media = db.query(PostMedia).filter(PostMedia.post_id.is_(None), PostMedia.path == path).first()
+        if media is None:
+            media = PostMedia(**describe_file(path))
+            db.add(media)
+        media.post_id = post.id
+        media.position = position
+        kept.append(media)
+
+    for media in current.values():
+        db.delete(media)
+
+    post.has_media = bool(kept) or bool(post.media_url)
+    return kept
+
+
+def delete_post_media(db: Session, post_id: int) -> int:
+    """Drops the post_media rows of a post being deleted. Does not commit. Returns how many."""
+    # posts.id can be reused (SQLite hands out max(id) + 1): rows left behind would
+    # attach themselves to the next post created with that id
+    return db.query(PostMedia).filter(PostMedia.post_id == post_id).delete(synchronize_session=False)
+
+
+def media_for_publish(db: Session, post: Post) -> Tuple[List[dict], Optional[str]]:
+    """
+    The post's attachments for publish_post_task, in order, as {"path", "mime_type", "size_bytes"}.
+    Returns an error instead when one of them can't be uploaded, so the browser isn't launched for nothing.
+    Remote URLs (imported tweets' media, copied by "Clone") are skipped, as the publisher always did.
+    """
+    rows = db.query(PostMedia).filter(PostMedia.post_id == post.id).order_by(PostMedia.position).all()
+    if not rows and post.media_paths:
+        # Saved before post_media existed, or by a writer that skipped sync_post_media
+        rows = sync_post_media(db, post)
+
+    remote = [m for m in rows if m.status == "remote"]
+    if remote:
+        logger.info(f"Post {post.id}: skipping {len(remote)} remote media URL(s), only local files are uploaded")
+        rows = [m for m in rows if m.status != "remote"]
+
+    broken = [f"{os.path.basename(m.path)} ({m.status})" for m in rows if m.status != "ready"]
+    if broken:
+        logger.warning(f"Post {post.id} has media that can't be uploaded: {', '.join(broken)}")
+        return [], f"Media not available: {', '.join(broken)}"
+    return [{"path": m.path, "mime_type": m.mime_type, "size_bytes": m.size_bytes} for m in rows], None
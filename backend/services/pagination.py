@@ -0,0 +1,27 @@
+import base64
+import json
+from datetime import datetime
+from typing import List
+
+# Opaque keyset cursors: the sort key of the last row of a page, base64(JSON).
+# The next page starts strictly after that key, so deep pages cost the same as the first
+# and rows inserted meanwhile don't shift or repeat results (unlike OFFSET).
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: List) -> str:
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List:
+    """Raises ValueError for cursors we didn't issue."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
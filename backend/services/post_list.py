@@ -0,0 +1,61 @@
+from typing import List, Optional, Tuple
+from loguru import logger
+from sqlalchemy.orm import Session
+from backend.models import Post
+from backend.schemas import PostListItem, PostResponse
+from backend.services.pagination import decode_cursor, encode_cursor
+
+# GET /api/posts loads only the columns it returns: PostListItem's by default (no logs or
+# screenshot path), or the ones asked for with fields=. Rows come back as dicts, so unselected
+# columns are never read from the database nor serialized.
+
+DEFAULT_FIELDS = list(PostListItem.model_fields)
+SELECTABLE_FIELDS = list(PostResponse.model_fields)
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """fields= as a column list (id always included). Raises ValueError for unknown names."""
+    if not fields:
+        return DEFAULT_FIELDS
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in names if f not in SELECTABLE_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Valid: {', '.join(SELECTABLE_FIELDS)}")
+    return ["id"] + [f for f in dict.fromkeys(names) if f != "id"]
+
+
+def list_posts(
+    db: Session,
+    status: Optional[str] = None,
+    username: Optional[str] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    skip: int = 0,
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Newest posts first (by id), keyset paginated: pass the returned cursor to get the next page.
+    skip is the old offset pagination, kept for existing clients; it can't be combined with a cursor.
+    Quarantined posts are left out unless asked for by status.
+    Raises ValueError for a cursor we didn't issue, or for skip together with a cursor.
+    """
+    if skip and cursor:
+        raise ValueError("Use either skip or cursor, not both.")
+    fields = fields or DEFAULT_FIELDS
+    query = db.query(*[getattr(Post, f) for f in fields])
+
+    if cursor:
+        (last_id,) = decode_cursor(cursor)
+        query = query.filter(Post.id < int(last_id))
+    if status:
+        query = query.filter(Post.status == status)
+    else:
+        query = query.filter(Post.status != "quarantine")
+    if username:
+        query = query.filter(Post.username == username)
+
+    rows = query.order_by(Post.id.desc()).offset(skip).limit(limit + 1).all()
+    page = [row._asdict() for row in rows[:limit]]
+    next_cursor = encode_cursor([page[-1]["id"]]) if len(rows) > limit else None
+    logger.debug(f"Listed {len(page)} posts ({len(fields)} fields, more: {next_cursor is not None})")
+    return page, next_cursor
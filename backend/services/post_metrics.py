@@ -0,0 +1,73 @@
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from backend.models import Post, PostMetricSnapshot, PostMetricLatest
+
+# Snapshot columns and the Post counters they copy
+SNAPSHOT_FIELDS = {
+    "views": "views_count",
+    "likes": "likes_count",
+    "reposts": "reposts_count",
+    "bookmarks": "bookmarks_count",
+    "replies": "replies_count",
+    "url_link_clicks": "url_link_clicks",
+    "user_profile_clicks": "user_profile_clicks",
+    "detail_expands": "detail_expands",
+}
+
+
+def apply_scraped_stats(post: Post, stats: dict):
+    """
+    Copies a stats scrape onto the post's counters. Counters missing from stats are kept:
+    the HTTP transport can't see the deep analytics (link clicks, profile visits, detail
+    expands), and writing 0 for them would also put zeros into the snapshot history.
+    """
+    for field, counter in SNAPSHOT_FIELDS.items():
+        if field in stats:
+            setattr(post, counter, stats[field])
+
+
+def record_snapshot(db: Session, post: Post, timestamp: Optional[datetime] = None) -> PostMetricSnapshot:
+    """
+    Adds a snapshot of the post's current counters and upserts its post_metrics_latest row,
+    in the caller's transaction (does not commit). The post must have an id (flush first).
+    """
+    timestamp = timestamp or datetime.now(timezone.utc).replace(tzinfo=None)
+    values = {field: getattr(post, counter) or 0 for field, counter in SNAPSHOT_FIELDS.items()}
+
+    snapshot = PostMetricSnapshot(post_id=post.id, timestamp=timestamp, **values)
+    db.add(snapshot)
+
+    latest = db.get(PostMetricLatest, post.id)
+    if latest is None:
+        latest = PostMetricLatest(post_id=post.id)
+        db.add(latest)
+    latest.username = post.username
+    latest.timestamp = timestamp
+    for field, value in values.items():
+        setattr(latest, field, value)
+    # Sessions don't autoflush: flush so a second snapshot of the post in this transaction finds the row
+    db.flush([latest])
+    return snapshot
+
+
+def metrics_changed(db: Session, post: Post) -> bool:
+    """True when the post's counters differ from its latest snapshot (or it has none)."""
+    latest = db.get(PostMetricLatest, post.id)
+    if latest is None:
+        return True
+    return any((getattr(latest, field) or 0) != (getattr(post, counter) or 0) for field, counter in SNAPSHOT_FIELDS.items())
+
+
+def last_metrics_refresh(db: Session, username: str) -> Optional[datetime]:
+    """Time of the newest snapshot of any of the account's posts."""
+    return db.query(func.max(PostMetricLatest.timestamp)).filter(PostMetricLatest.username == username).scalar()
+
+
+def drop_latest_metrics(db: Session, post_id: int) -> int:
+    """
+    Removes the post's post_metrics_latest row: the post was deleted (its id can be reused)
+    or is gone from X (it no longer counts towards the account's last refresh). Does not commit.
+    """
+    return db.query(PostMetricLatest).filter(PostMetricLatest.post_id == post_id).delete(synchronize_session=False)
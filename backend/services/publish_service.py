@@ -0,0 +1,107 @@
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+from loguru import logger
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from backend.config import settings
+from backend.models import Post, PublishAttempt
+from backend.services.leases import hold_lease, release_lease
+from backend.services.media_service import media_for_publish
+from backend.services.post_metrics import record_snapshot
+from backend.services.refresh_planner import plan_next_refresh
+
+
+def next_retry_at(retry_count: int, now: datetime) -> datetime:
+    """
+    Exponential backoff with jitter: the delay doubles per retry (capped), and
+    the second half is random so posts that failed together don't retry together.
+    """
+    delay = min(settings.RETRY_MAX_SECONDS, settings.RETRY_BASE_SECONDS * (2 ** retry_count))
+    return now + timedelta(seconds=delay / 2 + random.uniform(0, delay / 2))
+
+def find_duplicate(db: Session, post: Post) -> Optional[Post]:
+    """Another post of the same account with the same content that is already live on X."""
+    if not post.content_hash:
+        return None
+    query = db.query(Post).filter(
+        Post.content_hash == post.content_hash,
+        Post.id != post.id,
+        Post.status == "sent",
+        Post.tweet_id.isnot(None),
+        Post.is_repost.isnot(True)
+    )
+    query = query.filter(Post.username == post.username) if post.username else query.filter(Post.username.is_(None))
+    if settings.DUPLICATE_CHECK_DAYS > 0:
+        since = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=settings.DUPLICATE_CHECK_DAYS)
+        query = query.filter(func.coalesce(Post.published_at, Post.created_at) >= since)
+    return query.first()
+
+def check_publishable(db: Session, post: Post) -> Tuple[List[dict], Optional[dict]]:
+    """
+    Pre-publish checks that need no browser: duplicate content, then media.
+    Returns (media for publish_post_task, None), or ([], a failed result) to apply instead of publishing.
+    A duplicate is marked permanent: X would reject every retry the same way.
+    """
+    duplicate = find_duplicate(db, post)
+    if duplicate:
+        logger.warning(f"Post {post.id} duplicates post {duplicate.id} (tweet {duplicate.tweet_id}). Not publishing.")
+        return [], {
+            "success": False,
+            "permanent": True,
+            "log": f"Duplicate content: already published as post {duplicate.id} (tweet {duplicate.tweet_id})"
+        }
+    media, media_error = media_for_publish(db, post)
+    if media_error:
+        return [], {"success": False, "log": media_error}
+    return media, None
+
+def apply_publish_result(db: Session, post: Post, result: dict, label: str, source: str, started_at: datetime, queue_wait_ms: int = None, due_at: datetime = None) -> bool:
+    """
+    Writes a publish_post_task result onto the post (status, logs, tweet_id, next retry/refresh),
+    releases its lease, adds the Day 0 baseline snapshot and records the timed attempt.
+    queue_wait_ms is the time spent waiting for a publish slot, kept apart from total_ms.
+    due_at is when the post should have gone out; started_at - due_at is the dispatch lag.
+    Returns False, leaving the post alone (only the attempt is recorded), when this process
+    lost the lease meanwhile: the replica that re-claimed the post owns its status now.
+    Does not commit: the caller owns the transaction.
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    timings = result.get("timings") or {}
+    db.add(PublishAttempt(
+        post_id=post.id,
+        source=source,
+        success=bool(result.get("success")),
+        started_at=started_at,
+        queue_wait_ms=queue_wait_ms,
+        dispatch_lag_ms=int((started_at - due_at).total_seconds() * 1000) if due_at else None,
+        total_ms=timings.get("total_ms"),
+        phases=json.dumps(timings.get("phases", []))
+    ))
+
+    if not hold_lease(db, post.id):
+        logger.warning(f"Post {post.id}: lease lost to another replica, result not written "
+                       f"(success={bool(result.get('success'))}, tweet_id={result.get('tweet_id')}).")
+        return False
+
+    post.status = "sent" if result.get("success") else "failed"
+    if post.status == "failed" and not result.get("permanent") and (post.retry_count or 0) < settings.PUBLISH_MAX_RETRIES:
+        post.next_attempt_at = next_retry_at(post.retry_count or 0, now)
+    else:
+        post.next_attempt_at = None
+    post.logs = (post.logs or "") + f"\n[{label}] " + (result.get("log") or result.get("error") or "No log provided")
+    post.screenshot_path = result.get("screenshot_path")
+    if result.get("tweet_id") and db.query(Post.id).filter(Post.tweet_id == result["tweet_id"], Post.id != post.id).first():
+        # tweet_id is unique: a discovered id that belongs to another post is a mis-detection
+        post.logs += f"\n[{label}] Discovered tweet_id {result['tweet_id']} already belongs to another post. Not linked."
+    elif result.get("tweet_id"):
+        post.tweet_id = result["tweet_id"]
+        post.published_at = now
+        post.next_refresh_at = plan_next_refresh(now, now)
+        # Day 0 baseline snapshot
+        record_snapshot(db, post, now)
+    post.updated_at = now
+    release_lease(post)
+    return True
@@ -0,0 +1,25 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+# (age since publish, refresh interval while younger than that age)
+# Older than the last tier: metrics are considered settled and refreshing stops.
+REFRESH_TIERS = [
+    (timedelta(hours=6), timedelta(minutes=15)),
+    (timedelta(hours=48), timedelta(hours=1)),
+    (timedelta(days=7), timedelta(days=1)),
+]
+
+
+def plan_next_refresh(published_at: Optional[datetime], now: datetime) -> Optional[datetime]:
+    """
+    When a sent post's metrics should be scraped next, based on its age.
+    Young posts refresh often, older ones hourly then daily; None once they age out
+    (or the publish time is unknown), which takes them off the refresh queue.
+    """
+    if published_at is None:
+        return None
+    age = now - published_at
+    for max_age, interval in REFRESH_TIERS:
+        if age < max_age:
+            return now + interval
+    return None
@@ -0,0 +1,139 @@
+import re
+from datetime import datetime
+from typing import List, Optional, Tuple
+from loguru import logger
+from sqlalchemy import Column, Integer, MetaData, Table, Text, and_, func, literal, literal_column, or_, select, text
+from sqlalchemy.orm import Session
+from backend.models import Post
+from backend.services.pagination import decode_cursor, encode_cursor
+
+# Full-text index over posts.content and posts.tags.
+#   SQLite:   posts_fts, an external-content FTS5 table (no copy of the text), kept in sync by triggers.
+#   Postgres: posts.search_vector, a generated tsvector column with a GIN index.
+# Neither is part of the ORM models: install_search_index() creates them (migration 13).
+
+_fts = Table("posts_fts", MetaData(), Column("rowid", Integer), Column("content", Text), Column("tags", Text))
+
+_SQLITE_DDL = [
+    # remove_diacritics: "publicación" matches "publicacion"
+    "CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5("
+    "content, tags, content='posts', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "DROP TRIGGER IF EXISTS posts_fts_insert",
+    "DROP TRIGGER IF EXISTS posts_fts_delete",
+    "DROP TRIGGER IF EXISTS posts_fts_update",
+    "CREATE TRIGGER posts_fts_insert AFTER INSERT ON posts BEGIN "
+    "INSERT INTO posts_fts(rowid, content, tags) VALUES (NEW.id, NEW.content, NEW.tags); END",
+    "CREATE TRIGGER posts_fts_delete AFTER DELETE ON posts BEGIN "
+    "INSERT INTO posts_fts(posts_fts, rowid, content, tags) VALUES ('delete', OLD.id, OLD.content, OLD.tags); END",
+    "CREATE TRIGGER posts_fts_update AFTER UPDATE OF content, tags ON posts BEGIN "
+    "INSERT INTO posts_fts(posts_fts, rowid, content, tags) VALUES ('delete', OLD.id, OLD.content, OLD.tags); "
+    "INSERT INTO posts_fts(rowid, content, tags) VALUES (NEW.id, NEW.content, NEW.tags); END",
+    # Index the rows that existed before the table
+    "INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')",
+]
+
+_POSTGRES_DDL = [
+    "ALTER TABLE posts ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS "
+    "(to_tsvector('simple', coalesce(content, '') || ' ' || coalesce(tags, ''))) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_posts_search_vector ON posts USING GIN (search_vector)",
+]
+
+
+def install_search_index(conn):
+    """Creates (or rebuilds) the full-text index for the connection's dialect. Does not commit."""
+    for statement in _SQLITE_DDL if conn.dialect.name == "sqlite" else _POSTGRES_DDL:
+        conn.execute(text(statement))
+
+
+def _escape_like(value: str) -> str:
+    """value as a literal inside a LIKE pattern (escape character: backslash)."""
+    return re.sub(r"([\\%_])", r"\\\1", value)
+
+
+def _fts5_query(q: str) -> Optional[str]:
+    """User text -> FTS5 query: every word must match, the last one as a prefix (search as you type)."""
+    words = re.findall(r"\w+", q, re.UNICODE)
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _ranked(db: Session, q: str):
+    """Subquery of (post_id, rank) for posts matching q; lower rank = better match."""
+    if db.get_bind().dialect.name == "sqlite":
+        match = _fts5_query(q)
+        if match is None:
+            return None
+        return select(
+            _fts.c.rowid.label("post_id"),
+            func.bm25(literal_column("posts_fts")).label("rank")
+        ).where(text("posts_fts MATCH :match").bindparams(match=match)).subquery()
+
+    tsquery = func.websearch_to_tsquery("simple", q)
+    vector = literal_column("posts.search_vector")
+    return select(
+        Post.id.label("post_id"),
+        (-func.ts_rank(vector, tsquery)).label("rank")
+    ).where(vector.op("@@")(tsquery)).subquery()
+
+
+def search_posts(
+    db: Session,
+    q: Optional[str] = None,
+    status: Optional[str] = None,
+    username: Optional[str] = None,
+    tag: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Post], Optional[str]]:
+    """
+    Posts matching the text query and filters, best match first (newest first without q).
+    Keyset pagination: pass the returned cursor to get the next page; None means no more rows.
+    Raises ValueError for a cursor that doesn't belong to this kind of query.
+    """
+    after = decode_cursor(cursor) if cursor else None
+
+    if q and q.strip():
+        ranked = _ranked(db, q)
+        if ranked is None:
+            return [], None
+        query = db.query(Post, ranked.c.rank).join(ranked, ranked.c.post_id == Post.id)
+        order = [ranked.c.rank, Post.id]
+        if after:
+            rank, last_id = float(after[0]), int(after[1])
+            query = query.filter(or_(ranked.c.rank > rank, and_(ranked.c.rank == rank, Post.id > last_id)))
+    else:
+        query = db.query(Post, Post.created_at)
+        order = [Post.created_at.desc(), Post.id.desc()]
+        if after:
+            created_at, last_id = datetime.fromisoformat(after[0]), int(after[1])
+            query = query.filter(or_(Post.created_at < created_at, and_(Post.created_at == created_at, Post.id < last_id)))
+
+    if status:
+        query = query.filter(Post.status == status)
+    else:
+        query = query.filter(Post.status != "quarantine")
+    if username:
+        query = query.filter(Post.username == username)
+    if tag:
+        # tags is a comma separated list: match whole tags only
+        query = query.filter(
+            literal(",").concat(func.replace(Post.tags, " ", "")).concat(",").like(f"%,{_escape_like(tag.strip())},%", escape="\\")
+        )
+    if date_from:
+        query = query.filter(Post.created_at >= date_from)
+    if date_to:
+        query = query.filter(Post.created_at < date_to)
+
+    rows = query.order_by(*order).limit(limit + 1).all()
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last_post, last_key = page[-1]
+        next_cursor = encode_cursor([last_key, last_post.id])
+    logger.debug(f"Search q={q!r} returned {len(page)} posts (more: {next_cursor is not None})")
+    return [post for post, _ in page], next_cursor
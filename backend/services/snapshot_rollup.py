@@ -0,0 +1,199 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from loguru import logger
+from sqlalchemy.orm import Session
+from backend.config import settings
+from backend.models import PostMetricSnapshot, PostMetricRollup
+
+# Snapshot storage tiers, newest to oldest:
+#   raw   post_metrics_snapshots, every scrape, for SNAPSHOT_RAW_DAYS
+#   hour  post_metrics_rollups, one row per post and hour, until SNAPSHOT_HOURLY_DAYS
+#   day   post_metrics_rollups, one row per post and day, until SNAPSHOT_RETENTION_DAYS (0 = forever)
+# A rollup keeps the last value seen in its bucket plus the growth since the previous bucket,
+# so both the cumulative curve and per-period gains survive the downsampling.
+
+METRICS = (
+    "views", "likes", "reposts", "bookmarks", "replies",
+    "url_link_clicks", "user_profile_clicks", "detail_expands",
+)
+
+
+def _floor_hour(ts: datetime) -> datetime:
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def _floor_day(ts: datetime) -> datetime:
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _values(row) -> Dict[str, int]:
+    return {m: getattr(row, m) or 0 for m in METRICS}
+
+
+def _baseline(db: Session, post_id: int, before: datetime) -> Optional[Dict[str, int]]:
+    """Last value recorded by any rollup of the post before `before`, if there is one."""
+    previous = db.query(PostMetricRollup).filter(
+        PostMetricRollup.post_id == post_id,
+        PostMetricRollup.bucket_start < before
+    ).order_by(PostMetricRollup.timestamp.desc()).first()
+    return _values(previous) if previous else None
+
+
+def _merge(db: Session, post_id: int, tier: str, bucket_start: datetime,
+           timestamp: datetime, samples: int, last: Dict[str, int], base: Dict[str, int]):
+    """
+    Writes a bucket whose values went from `base` (end of the previous bucket) to `last`.
+    An existing row for the same bucket (late snapshots, re-runs) is folded into:
+    it keeps its own starting point and takes the newer last value.
+    """
+    rollup = db.query(PostMetricRollup).filter(
+        PostMetricRollup.post_id == post_id,
+        PostMetricRollup.tier == tier,
+        PostMetricRollup.bucket_start == bucket_start
+    ).first()
+    if rollup is None:
+        rollup = PostMetricRollup(post_id=post_id, tier=tier, bucket_start=bucket_start, timestamp=timestamp, samples=0)
+        db.add(rollup)
+    else:
+        existing = _values(rollup)
+        base = {m: existing[m] - (getattr(rollup, f"{m}_delta") or 0) for m in METRICS}
+        if timestamp < rollup.timestamp:
+            last, timestamp = existing, rollup.timestamp
+
+    for m in METRICS:
+        setattr(rollup, m, last[m])
+        setattr(rollup, f"{m}_delta", last[m] - base[m])
+    rollup.timestamp = timestamp
+    rollup.samples = (rollup.samples or 0) + samples
+
+
+def _rollup_raw(db: Session, cutoff: datetime) -> int:
+    """Folds raw snapshots older than cutoff into hourly rollups and deletes them."""
+    post_ids = [row[0] for row in db.query(PostMetricSnapshot.post_id)
+                .filter(PostMetricSnapshot.timestamp < cutoff).distinct().all()]
+    folded = 0
+    for post_id in post_ids:
+        snapshots = db.query(PostMetricSnapshot).filter(
+            PostMetricSnapshot.post_id == post_id,
+            PostMetricSnapshot.timestamp < cutoff
+        ).order_by(PostMetricSnapshot.timestamp).all()
+
+        buckets = OrderedDict()
+        for snap in snapshots:
+            buckets.setdefault(_floor_hour(snap.timestamp), []).append(snap)
+
+        # Growth is measured from the previous bucket; the post's first bucket starts from its first sample
+        previous = _baseline(db, post_id, next(iter(buckets))) or _values(snapshots[0])
+        for bucket_start, rows in buckets.items():
+            last = _values(rows[-1])
+            _merge(db, post_id, "hour", bucket_start, rows[-1].timestamp, len(rows), last, previous)
+            previous = last
+
+        db.query(PostMetricSnapshot).filter(
+            PostMetricSnapshot.post_id == post_id,
+            PostMetricSnapshot.timestamp < cutoff
+        ).delete(synchronize_session=False)
+        # One post per transaction keeps the write lock short for the publisher
+        db.commit()
+        folded += len(snapshots)
+    return folded
+
+
+def _rollup_hourly(db: Session, cutoff: datetime) -> int:
+    """Folds hourly rollups that start before cutoff into daily rollups and deletes them."""
+    post_ids = [row[0] for row in db.query(PostMetricRollup.post_id).filter(
+        PostMetricRollup.tier == "hour",
+        PostMetricRollup.bucket_start < cutoff
+    ).distinct().all()]
+    folded = 0
+    for post_id in post_ids:
+        hours = db.query(PostMetricRollup).filter(
+            PostMetricRollup.post_id == post_id,
+            PostMetricRollup.tier == "hour",
+            PostMetricRollup.bucket_start < cutoff
+        ).order_by(PostMetricRollup.bucket_start).all()
+
+        days = OrderedDict()
+        for hour in hours:
+            days.setdefault(_floor_day(hour.bucket_start), []).append(hour)
+
+        for day_start, rows in days.items():
+            first = _values(rows[0])
+            base = {m: first[m] - (getattr(rows[0], f"{m}_delta") or 0) for m in METRICS}
+            _merge(db, post_id, "day", day_start, rows[-1].timestamp,
+                   sum(r.samples or 0 for r in rows), _values(rows[-1]), base)
+
+        for hour in hours:
+            db.delete(hour)
+        db.commit()
+        folded += len(hours)
+    return folded
+
+
+def compact_snapshots(db: Session, now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Moves post snapshots down the storage tiers and applies retention.
+    Cutoffs are aligned to whole hours/days so a bucket is only rolled up once it is complete.
+    Safe to re-run: buckets that already exist are merged into, never duplicated.
+    Returns how many rows each stage folded or deleted.
+    """
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+    raw_cutoff = _floor_hour(now - timedelta(days=settings.SNAPSHOT_RAW_DAYS))
+    hourly_cutoff = _floor_day(now - timedelta(days=settings.SNAPSHOT_HOURLY_DAYS))
+
+    result = {
+        "raw": _rollup_raw(db, raw_cutoff),
+        "hourly": _rollup_hourly(db, hourly_cutoff),
+        "expired": 0,
+    }
+
+    if settings.SNAPSHOT_RETENTION_DAYS > 0:
+        expire_before = _floor_day(now - timedelta(days=settings.SNAPSHOT_RETENTION_DAYS))
+        result["expired"] = db.query(PostMetricRollup).filter(
+            PostMetricRollup.tier == "day",
+            PostMetricRollup.bucket_start < expire_before
+        ).delete(synchronize_session=False)
+        db.commit()
+
+    if any(result.values()):
+        logger.info(f"Snapshot compaction: {result['raw']} raw snapshots -> hourly, "
+                    f"{result['hourly']} hourly rollups -> daily, {result['expired']} daily rollups expired.")
+    return result
+
+
+def load_post_history(db: Session, post_id: int, since: Optional[datetime] = None) -> List[dict]:
+    """
+    Metric history of a post across all tiers, oldest first: daily rollups, then hourly,
+    then raw snapshots. The tiers cover disjoint periods, so callers get one continuous
+    series whose resolution drops with age. Every point carries its tier and the
+    growth since the previous point.
+    """
+    rollups = db.query(PostMetricRollup).filter(PostMetricRollup.post_id == post_id)
+    raw = db.query(PostMetricSnapshot).filter(PostMetricSnapshot.post_id == post_id)
+    if since:
+        rollups = rollups.filter(PostMetricRollup.timestamp >= since)
+        raw = raw.filter(PostMetricSnapshot.timestamp >= since)
+
+    rows = sorted(rollups.all(), key=lambda r: ({"day": 0, "hour": 1}.get(r.tier, 0), r.bucket_start))
+    points = []
+    for rollup in rows:
+        points.append({
+            "timestamp": rollup.timestamp.isoformat(),
+            "tier": rollup.tier,
+            **_values(rollup),
+            **{f"{m}_delta": getattr(rollup, f"{m}_delta") or 0 for m in METRICS},
+        })
+
+    previous = {m: points[-1][m] for m in METRICS} if points else None
+    for snap in raw.order_by(PostMetricSnapshot.timestamp).all():
+        values = _values(snap)
+        base = previous or values
+        points.append({
+            "timestamp": snap.timestamp.isoformat(),
+            "tier": "raw",
+            **values,
+            **{f"{m}_delta": values[m] - base[m] for m in METRICS},
+        })
+        previous = values
+    return points
@@ -1,18 +1,22 @@
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timezone
 from loguru import logger
 from fastapi import HTTPException
-from backend.models import Post, PostMetricSnapshot, AccountMetricSnapshot
+from backend.models import Post, AccountMetricSnapshot
 from worker.publisher import sync_history_task
 from backend.schemas import ScrapedTweet
+from backend.services.refresh_planner import plan_next_refresh
+from backend.services.post_metrics import drop_latest_metrics, metrics_changed, record_snapshot
 
-async def sync_account_history(username: str, db: Session):
+async def sync_account_history(username: str, db: AsyncSession):
     """
     Orchestrates the sync process:
     1. Calls worker to scrape X.
     2. Updates Account Metrics (Followers).
     3. Auto-heals 'deleted_on_x' false positives.
     4. Upserts Posts and creates metric snapshots.
+    Steps 2-4 run through run_sync on the async session, so they don't block the event loop.
     """
     logger.info(f"Syncing history for {username}...")
     
@@ -28,6 +32,16 @@ async def sync_account_history(username: str, db: Session):
     if not result["success"]:
         raise HTTPException(status_code=500, detail=result["log"])
 
+    count = await db.run_sync(_apply_sync_result, username, result)
+
+    return {
+        "status": "success", 
+        "imported": count, 
+        "log": result["log"]
+    }
+
+def _apply_sync_result(db: Session, username: str, result: dict) -> int:
+    """Writes a sync_history_task result to the DB and commits. Returns the number of upserted posts."""
     # 2. Save Profile Stats (Followers)
     if "profile" in result and result["profile"]:
         try:
@@ -69,6 +83,7 @@ async def sync_account_history(username: str, db: Session):
                 if post.tweet_id not in scanned_tweet_ids:
                     logger.warning(f"Post {post.id} (tweet_id: {post.tweet_id}) not found in X scan. Marking as deleted.")
                     post.status = "deleted_on_x"
+                    drop_latest_metrics(db, post.id)
                     post.logs = (post.logs or "") + f"\n[Sync] {datetime.now().isoformat()} - Post not found on X profile. Marked as deleted."
                     deleted_count += 1
             
@@ -158,43 +173,25 @@ async def sync_account_history(username: str, db: Session):
 
             if post_data.get("media_url"):
                 existing_post.media_url = post_data["media_url"]
+                existing_post.has_media = True
             
             if pub_date:
                 existing_post.created_at = pub_date
                 existing_post.updated_at = pub_date 
+                existing_post.published_at = pub_date
+
+            # The sync just refreshed the metrics: push the next scrape out
+            existing_post.next_refresh_at = plan_next_refresh(
+                existing_post.published_at, datetime.now(timezone.utc).replace(tzinfo=None)
+            )
 
             if post_data.get("content") and (not existing_post.content or existing_post.content == "(No content)"):
                 existing_post.content = post_data["content"]
             
-            # Update Snapshot for existing
+            # Update Snapshot for existing (only when a metric moved)
             try:
-                latest_snap = db.query(PostMetricSnapshot).filter(PostMetricSnapshot.post_id == existing_post.id).order_by(PostMetricSnapshot.timestamp.desc()).first()
-                
-                has_changes = not latest_snap or (
-                    latest_snap.views != post_data["views"] or 
-                    latest_snap.likes != post_data["likes"] or 
-                    latest_snap.reposts != post_data["reposts"] or
-                    latest_snap.bookmarks != post_data.get("bookmarks", 0) or
-                    latest_snap.replies != post_data.get("replies", 0) or
-                    latest_snap.url_link_clicks != post_data.get("url_link_clicks", 0) or
-                    latest_snap.user_profile_clicks != post_data.get("user_profile_clicks", 0) or
-                    latest_snap.detail_expands != post_data.get("detail_expands", 0)
-                )
-
-                if has_changes:
-                        snapshot = PostMetricSnapshot(
-                        post_id=existing_post.id,
-                        views=post_data["views"],
-                        likes=post_data["likes"],
-                        reposts=post_data["reposts"],
-                        bookmarks=post_data.get("bookmarks", 0),
-                        replies=post_data.get("replies", 0),
-                        url_link_clicks=post_data.get("url_link_clicks", 0),
-                        user_profile_clicks=post_data.get("user_profile_clicks", 0),
-                        detail_expands=post_data.get("detail_expands", 0),
-                        timestamp=datetime.now(timezone.utc).replace(tzinfo=None)
-                    )
-                        db.add(snapshot)
+                if metrics_changed(db, existing_post):
+                    record_snapshot(db, existing_post)
             except Exception as e:
                 logger.error(f"Sync: Snapshot error existing: {e}")
 
@@ -211,8 +208,11 @@ async def sync_account_history(username: str, db: Session):
                 tweet_id=tweet_id,
                 content=post_data["content"] or "(No content)",
                 media_url=post_data.get("media_url"),
+                has_media=bool(post_data.get("media_url")),
                 created_at=final_date,
                 updated_at=final_date,
+                published_at=pub_date,
+                next_refresh_at=plan_next_refresh(pub_date, datetime.now(timezone.utc).replace(tzinfo=None)),
                 status=new_status,
                 username=username,
                 views_count=post_data["views"],
@@ -230,19 +230,7 @@ async def sync_account_history(username: str, db: Session):
             try:
                 db.flush()
                 # Create Day 0 snapshot for new post
-                snap = PostMetricSnapshot(
-                    post_id=new_post.id,
-                    views=new_post.views_count,
-                    likes=new_post.likes_count,
-                    reposts=new_post.reposts_count,
-                    bookmarks=new_post.bookmarks_count,
-                    replies=new_post.replies_count,
-                    url_link_clicks=new_post.url_link_clicks,
-                    user_profile_clicks=new_post.user_profile_clicks,
-                    detail_expands=new_post.detail_expands,
-                    timestamp=datetime.now(timezone.utc).replace(tzinfo=None)
-                )
-                db.add(snap)
+                record_snapshot(db, new_post)
                 count += 1
             except Exception as e:
                 logger.error(f"Sync: Failed to flush post {tweet_id}: {e}")
@@ -256,8 +244,4 @@ async def sync_account_history(username: str, db: Session):
         logger.error(f"Sync: CRITICAL DB COMMIT FAILED: {e}")
         db.rollback()
     
-    return {
-        "status": "success", 
-        "imported": count, 
-        "log": result["log"]
-    }
+    return count
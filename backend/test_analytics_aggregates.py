@@ -0,0 +1,45 @@
+from datetime import datetime
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from backend.db import Base
+from backend.models import Post
+from backend.routes.analytics import get_best_times, get_performance_data
+
+
+def test_performance_and_best_times_aggregate_in_sql():
+    print("Testing analytics aggregates...")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+
+    try:
+        assert get_best_times(None, None, None, db)["best_hours"] == [9, 12, 18, 21]
+
+        db.add_all([
+            # 9h: rates 10% and 30%
+            Post(content="a", status="sent", username="a", has_media=True, published_at=datetime(2026, 1, 1, 9),
+                 created_at=datetime(2026, 1, 1), views_count=100, likes_count=10),
+            Post(content="b", status="sent", username="a", has_media=False, published_at=datetime(2026, 1, 2, 9),
+                 created_at=datetime(2026, 1, 2), views_count=100, likes_count=20, replies_count=10),
+            # 18h, no views: raw engagement
+            Post(content="c", status="sent", username="b", published_at=datetime(2026, 2, 1, 18),
+                 created_at=datetime(2026, 2, 1), views_count=None, likes_count=4),
+            # Not counted: repost, draft
+            Post(content="d", status="sent", username="a", is_repost=True, created_at=datetime(2026, 1, 3), views_count=999),
+            Post(content="e", status="draft", username="a", created_at=datetime(2026, 1, 3), views_count=999),
+        ])
+        db.commit()
+
+        performance = get_performance_data(None, None, None, db)
+        assert performance["media"] == {"count": 1, "views": 100, "engagement": 10, "avg_engagement": 10, "engagement_rate": 10}
+        assert performance["text"]["count"] == 2 and performance["text"]["engagement"] == 34
+
+        only_a = get_performance_data("a", None, datetime(2026, 1, 2), db)
+        assert only_a["media"]["count"] == 1 and only_a["text"]["count"] == 0
+
+        best = get_best_times(None, None, None, db)
+        assert best["hourly_data"] == {9: 20.0, 18: 4.0}
+        assert best["best_hours"] == [9, 18] and best["total_posts_analyzed"] == 3
+        assert get_best_times("b", None, None, db)["hourly_data"] == {18: 4.0}
+    finally:
+        db.close()
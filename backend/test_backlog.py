@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from backend.config import settings
+from backend.db import Base
+from backend.models import Post
+from backend.services import backlog
+from backend.services.backlog import _triage_backlog, release_backlog
+
+
+def test_rescheduled_post_starts_a_fresh_retry_budget(monkeypatch):
+    print("Testing backlog reschedule of a failed post...")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    monkeypatch.setattr(settings, "BACKLOG_STALE_HOURS", 24)
+    now = datetime(2026, 5, 10, 12, 0)
+
+    try:
+        # Failed twice, its last retry fell due three days ago while we were down
+        post = Post(content="retrying", status="failed", username="a", retry_count=2,
+                    scheduled_at=datetime(2026, 5, 7, 8, 0), next_attempt_at=datetime(2026, 5, 7, 9, 30))
+        db.add(post)
+        db.commit()
+
+        overdue, by_account, skipped, rescheduled = _triage_backlog(db, "reschedule", now)
+        db.refresh(post)
+        assert overdue == 1 and not by_account and not skipped
+        assert rescheduled == [(post.id, datetime(2026, 5, 11, 9, 30))], "same time of day, next day ahead"
+        assert post.status == "scheduled" and post.scheduled_at == datetime(2026, 5, 11, 9, 30)
+        assert post.next_attempt_at is None and post.retry_count == 0
+    finally:
+        db.close()
+
+
+class RecordingDispatcher:
+    def __init__(self):
+        self.scheduled, self.cancelled = {}, []
+
+    def schedule(self, post_id, due_at):
+        self.scheduled[post_id] = due_at
+
+    def schedule_many(self, entries):
+        self.scheduled.update(entries)
+
+    def cancel(self, post_id):
+        self.cancelled.append(post_id)
+
+
+def _overdue_posts(db, now):
+    parent = Post(content="parent", status="scheduled", username="a", scheduled_at=now - timedelta(hours=3))
+    db.add(parent)
+    db.flush()
+    db.add_all([
+        Post(content="a old", status="scheduled", username="a", scheduled_at=now - timedelta(days=2)),
+        Post(content="a recent", status="scheduled", username="a", scheduled_at=now - timedelta(hours=1)),
+        Post(content="b retry", status="failed", username="b", retry_count=1, next_attempt_at=now - timedelta(hours=2)),
+        # Waits for its parent; the parent's publish releases it
+        Post(content="child", status="scheduled", username="a", parent_id=parent.id, scheduled_at=now - timedelta(hours=3)),
+        Post(content="future", status="scheduled", username="a", scheduled_at=now + timedelta(hours=1)),
+        Post(content="draft", status="draft", username="a"),
+    ])
+    db.commit()
+    return {p.content: p.id for p in db.query(Post)}
+
+
+def test_backlog_publish_policy_spreads_accounts_out(monkeypatch):
+    print("Testing backlog release spacing...")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    recorder = RecordingDispatcher()
+    monkeypatch.setattr(backlog, "dispatcher", recorder)
+    monkeypatch.setattr(backlog, "pending_backlog", set())
+    monkeypatch.setattr(settings, "BACKLOG_STALE_HOURS", 24)
+    monkeypatch.setattr(settings, "BACKLOG_RELEASE_SECONDS", 120)
+    now = datetime(2026, 5, 10, 12, 0)
+
+    try:
+        ids = _overdue_posts(db, now)
+        plan = (now, *_triage_backlog(db, "publish", now))
+        release_backlog(plan)
+        slot = timedelta(seconds=120)
+        # Oldest first within an account, one slot apart; accounts in parallel
+        assert recorder.scheduled == {
+            ids["a old"]: now, ids["parent"]: now + slot, ids["a recent"]: now + 2 * slot,
+            ids["b retry"]: now,
+        }
+        assert backlog.pending_backlog == set(recorder.scheduled), "the safety scan leaves them to the dispatcher"
+        assert all(p.status in ("scheduled", "failed", "draft") for p in db.query(Post)), "publish policy changes nothing"
+    finally:
+        db.close()
+
+
+def test_backlog_skip_policy_moves_stale_posts_to_drafts(monkeypatch):
+    print("Testing backlog skip policy...")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    recorder = RecordingDispatcher()
+    monkeypatch.setattr(backlog, "dispatcher", recorder)
+    monkeypatch.setattr(backlog, "pending_backlog", set())
+    monkeypatch.setattr(settings, "BACKLOG_STALE_HOURS", 24)
+    now = datetime(2026, 5, 10, 12, 0)
+
+    try:
+        ids = _overdue_posts(db, now)
+        release_backlog((now, *_triage_backlog(db, "skip", now)))
+        stale = db.get(Post, ids["a old"])
+        assert stale.status == "draft" and "Moved back to drafts" in stale.logs
+        assert recorder.cancelled == [ids["a old"]]
+        assert ids["a old"] not in recorder.scheduled and ids["a recent"] in recorder.scheduled, "only stale posts are skipped"
+        assert ids["child"] not in recorder.scheduled and ids["future"] not in recorder.scheduled
+
+        # Nothing overdue: nothing to do
+        release_backlog((now, *_triage_backlog(db, "skip", now - timedelta(days=3))))
+        assert len(recorder.cancelled) == 1
+    finally:
+        db.close()
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from backend.db import Base
+from backend.models import Post
+from backend.routes import posts as posts_route
+from backend.schemas import BulkPostCreate
+
+
+class RecordingDispatcher:
+    def __init__(self):
+        self.scheduled = []
+
+    def schedule_many(self, items):
+        self.scheduled += list(items)
+
+
+def _bulk(db, *items):
+    return posts_route.create_posts_bulk(BulkPostCreate(posts=list(items)), db)
+
+
+def test_bulk_create_validates_the_whole_batch(monkeypatch):
+    print("Testing bulk post validation...")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    monkeypatch.setattr(posts_route, "dispatcher", RecordingDispatcher())
+
+    try:
+        with pytest.raises(HTTPException) as rejected:
+            _bulk(db,
+                  {"content": "reply first", "parent_ref": "root"},
+                  {"content": "root", "ref": "root"},
+                  {"content": "same ref", "ref": "root"},
+                  {"content": "orphan", "parent_id": 999},
+                  {"content": "both", "parent_id": 1, "parent_ref": "root"})
+        assert rejected.value.status_code == 422
+        errors = {(e["index"], e["error"]) for e in rejected.value.detail}
+        assert (0, "parent_ref 'root' must refer to an earlier item.") in errors
+        assert (2, "Duplicate ref 'root'.") in errors
+        assert (3, "Parent post 999 not found.") in errors
+        assert (4, "Use either parent_id or parent_ref, not both.") in errors
+        assert db.query(Post).count() == 0, "nothing is created when one item is invalid"
+    finally:
+        db.close()
+
+
+def test_bulk_create_links_threads_level_by_level(monkeypatch):
+    print("Testing bulk thread creation...")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    recorder = RecordingDispatcher()
+    monkeypatch.setattr(posts_route, "dispatcher", recorder)
+    at = datetime(2030, 1, 1, 9)
+
+    try:
+        existing = Post(content="already there", status="sent", tweet_id="1")
+        db.add(existing)
+        db.commit()
+
+        result = _bulk(db,
+                       {"content": "1/3", "ref": "a", "status": "scheduled", "scheduled_at": at},
+                       {"content": "2/3", "ref": "b", "parent_ref": "a", "status": "scheduled", "scheduled_at": at + timedelta(minutes=1)},
+                       {"content": "standalone draft"},
+                       {"content": "3/3", "parent_ref": "b", "status": "scheduled", "scheduled_at": at + timedelta(minutes=2)},
+                       {"content": "reply to an existing post", "parent_id": existing.id})
+        ids = result["ids"]
+        assert result["refs"] == {"a": ids[0], "b": ids[1]}
+
+        posts = {p.id: p for p in db.query(Post).filter(Post.id.in_(ids))}
+        assert [posts[i].content for i in ids] == ["1/3", "2/3", "standalone draft", "3/3", "reply to an existing post"]
+        assert posts[ids[1]].parent_id == ids[0] and posts[ids[3]].parent_id == ids[1]
+        assert posts[ids[4]].parent_id == existing.id and posts[ids[2]].parent_id is None
+        # Each thread level is flushed once: top-level items get their ids before any reply
+        assert max(ids[0], ids[2], ids[4]) < ids[1] < ids[3]
+
+        assert sorted(recorder.scheduled) == sorted([
+            (ids[0], at), (ids[1], at + timedelta(minutes=1)), (ids[3], at + timedelta(minutes=2))
+        ]), "only scheduled posts go to the dispatcher"
+    finally:
+        db.close()
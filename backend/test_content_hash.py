@@ -0,0 +1,46 @@
+from datetime import datetime, timezone
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from backend.db import Base
+from backend.models import Post
+from backend.services.content_hash import content_hash
+from backend.services.leases import LEASE_OWNER
+from backend.services.publish_service import apply_publish_result, check_publishable
+
+
+def test_content_hash_and_duplicate_check():
+    print("Testing content hash and pre-publish duplicate check...")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    try:
+        assert content_hash("Hello   world\n") == content_hash("Ｈello world"), "whitespace and NFKC forms should not matter"
+        assert content_hash("Hello world") != content_hash("hello world")
+        assert content_hash("  ") is None
+        assert content_hash("Line one  \r\nLine\ttwo\n") == content_hash("Line one\n Line two"), "line ending styles and line edges don't matter"
+        assert content_hash("Line one\nLine two") != content_hash("Line one Line two"), "line breaks are kept"
+        assert content_hash("Line one\n\nLine two") != content_hash("Line one\nLine two"), "so are blank lines"
+
+        sent = Post(content="Launch day!", status="sent", username="a", tweet_id="100", published_at=now)
+        # Claimed by this process, as the scheduler would have
+        draft = Post(content="Launch  day! ", status="scheduled", username="a", lease_owner=LEASE_OWNER)
+        other_account = Post(content="Launch day!", status="scheduled", username="b")
+        db.add_all([sent, draft, other_account])
+        db.commit()
+        assert draft.content_hash == sent.content_hash, "hash should be set on insert"
+
+        media, rejected = check_publishable(db, draft)
+        assert rejected and rejected["permanent"] and "post 1" in rejected["log"]
+        assert check_publishable(db, other_account) == ([], None), "other accounts may post the same text"
+
+        apply_publish_result(db, draft, rejected, "Retry 0", "scheduler", now)
+        assert draft.status == "failed" and draft.next_attempt_at is None, "duplicates should not be retried"
+
+        draft.content = "Launch day, part 2"
+        db.commit()
+        assert draft.content_hash == content_hash("Launch day, part 2"), "hash should follow content updates"
+        assert check_publishable(db, draft)[1] is None
+    finally:
+        db.close()
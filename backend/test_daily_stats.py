@@ -0,0 +1,66 @@
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from backend.db import Base
+from backend.models import Post, DailyAccountStats
+from backend.services.daily_stats import install_daily_stats_triggers, rebuild_daily_stats, STAT_COLUMNS
+
+
+def _table(db):
+    rows = db.query(DailyAccountStats).order_by(DailyAccountStats.username, DailyAccountStats.day).all()
+    # Rows emptied by moves stay behind as zeros; they don't change any total
+    return [(r.username, r.day, *[getattr(r, c) for c in STAT_COLUMNS]) for r in rows if any(getattr(r, c) for c in STAT_COLUMNS)]
+
+
+def test_triggers_match_rebuild():
+    print("Testing daily_account_stats triggers...")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        install_daily_stats_triggers(conn)
+    db = sessionmaker(bind=engine)()
+    rng = random.Random(7)
+    start = datetime(2026, 1, 1)
+    statuses = ["draft", "scheduled", "sent", "failed", "processing"]
+
+    try:
+        posts = []
+        for i in range(200):
+            post = Post(content=f"p{i}", status=rng.choice(statuses), username=rng.choice(["a", "b", None]),
+                        created_at=start + timedelta(hours=rng.randint(0, 24 * 20)),
+                        is_repost=rng.random() < 0.1, views_count=rng.randint(0, 100))
+            db.add(post)
+            posts.append(post)
+        db.commit()
+
+        for _ in range(300):
+            post = rng.choice(posts)
+            action = rng.random()
+            if action < 0.4:
+                post.status = rng.choice(statuses)
+                if post.status == "sent":
+                    post.published_at = start + timedelta(hours=rng.randint(0, 24 * 20))
+            elif action < 0.8:
+                post.views_count = rng.randint(0, 1000)
+                post.likes_count = rng.randint(0, 50)
+            else:
+                post.username = rng.choice(["a", "b", None])
+            db.commit()
+        # Bulk UPDATE and DELETE bypass the ORM
+        db.query(Post).filter(Post.status == "failed").update({"status": "scheduled"})
+        db.delete(posts[0])
+        db.commit()
+
+        incremental = _table(db)
+        assert incremental, "triggers wrote nothing"
+        with engine.begin() as conn:
+            rebuild_daily_stats(conn)
+        db.expire_all()
+        assert incremental == _table(db)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    test_triggers_match_rebuild()
@@ -0,0 +1,48 @@
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from backend.db import Base
+from backend.models import Post
+from backend.services.data_versions import POSTS_TABLES, TRACKED_TABLES, _trigger_ddl, etag_matches, install_version_triggers, resource_etag
+
+
+def test_etag_follows_writes():
+    print("Testing data version ETags...")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+
+    try:
+        assert resource_etag(db, POSTS_TABLES, "/api/posts/?") is None, "no ETag without the triggers"
+        with engine.begin() as conn:
+            install_version_triggers(conn)
+
+        etag = resource_etag(db, POSTS_TABLES, "/api/posts/?")
+        assert etag == resource_etag(db, POSTS_TABLES, "/api/posts/?")
+        assert etag != resource_etag(db, POSTS_TABLES, "/api/posts/?status=sent"), "each URL has its own tag"
+
+        db.add(Post(content="hello"))
+        db.commit()
+        after_insert = resource_etag(db, POSTS_TABLES, "/api/posts/?")
+        assert after_insert != etag
+
+        db.execute(text("UPDATE posts SET status = 'sent'"))
+        db.commit()
+        assert resource_etag(db, POSTS_TABLES, "/api/posts/?") != after_insert, "bulk SQL counts too"
+
+        assert etag_matches(f'"x", {etag}', etag)
+        assert etag_matches(etag.removeprefix("W/"), etag), "weak comparison"
+        assert etag_matches("*", etag)
+        assert not etag_matches(after_insert, etag) and not etag_matches(None, etag)
+    finally:
+        db.close()
+
+
+def test_postgres_counters_are_sequences():
+    print("Testing Postgres data version DDL...")
+    ddl = _trigger_ddl("postgresql")
+    # Writers must not queue behind a shared counter row
+    assert not any("data_versions" in statement for statement in ddl)
+    assert "nextval(TG_ARGV[0])" in ddl[0]
+    for table in TRACKED_TABLES:
+        assert any(s.startswith(f"CREATE SEQUENCE IF NOT EXISTS data_version_{table} ") for s in ddl)
+        assert any(s.endswith(f"bump_data_version('data_version_{table}')") for s in ddl)
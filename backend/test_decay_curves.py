@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from backend.db import Base
+from backend.models import Post, PostMetricRollup, PostMetricSnapshot
+from backend.services.decay_curves import decay_bands, interpolate_on_grid
+
+
+def test_interpolation_matches_per_post_interp():
+    print("Testing vectorized decay interpolation...")
+    rng = np.random.default_rng(7)
+    ages = [0.5, 1, 6, 24, 168]
+    rows, expected = [], []
+    for post in range(200):
+        n = int(rng.integers(0, 12))
+        sample_ages = np.sort(rng.uniform(0.1, 200, n))
+        values = np.cumsum(rng.integers(0, 100, n)).astype(float)
+        rows += [(post, a, v) for a, v in zip(sample_ages, values)]
+        # Reference: the same series through np.interp, starting at (0, 0), no extrapolation
+        xs, ys = np.concatenate([[0.0], sample_ages]), np.concatenate([[0.0], values])
+        expected.append([np.interp(a, xs, ys) if a <= xs[-1] else np.nan for a in ages])
+
+    result = interpolate_on_grid(np.array(rows).reshape(-1, 3), 200, ages)
+    assert np.allclose(result, np.array(expected), equal_nan=True)
+
+
+def test_decay_bands_per_account():
+    print("Testing decay bands...")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    published = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=10)
+
+    try:
+        for i, views in enumerate([100, 200, 300]):
+            post = Post(content=f"post {i}", status="sent", username="a", published_at=published)
+            db.add(post)
+            db.flush()
+            # Raw snapshot at 12 h, then an hourly rollup (last sample at 36 h)
+            db.add(PostMetricSnapshot(post_id=post.id, timestamp=published + timedelta(hours=12), views=views // 2))
+            db.add(PostMetricRollup(post_id=post.id, tier="hour", bucket_start=published + timedelta(hours=36),
+                                    timestamp=published + timedelta(hours=36), views=views * 2))
+        db.add(Post(content="repost", status="sent", username="a", is_repost=True, published_at=published))
+        db.commit()
+
+        bands = decay_bands(db, "views", [6, 24, 168], days=30)
+        account = bands["accounts"]["a"]
+        assert account["posts"] == [3, 3, 0], "no post was seen at 7 days"
+        assert account["p50"] == [50.0, 250.0, None], "halfway between 100 at 12 h and 400 at 36 h"
+        assert account["p10"][1] < account["p50"][1] < account["p90"][1]
+        assert decay_bands(db, "views", [6], days=30, username="b")["accounts"] == {}
+    finally:
+        db.close()
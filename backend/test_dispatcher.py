@@ -0,0 +1,137 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from backend.config import settings
+from backend.services.dispatcher import Dispatcher
+
+
+def _now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+async def _started(monkeypatch, on_due, executor=None):
+    async def no_posts(self):
+        pass
+
+    async def unused(post_id, queue_wait_ms):
+        raise AssertionError("nothing should be published")
+
+    # No database: the heap starts empty
+    monkeypatch.setattr(Dispatcher, "load", no_posts)
+    dispatcher = Dispatcher()
+    await dispatcher.start(on_due, executor or unused)
+    return dispatcher
+
+
+def test_timer_heap_lazy_deletion():
+    print("Testing dispatcher heap bookkeeping...")
+    dispatcher = Dispatcher()
+    t0 = datetime(2026, 1, 1, 9, 0)
+
+    dispatcher._schedule(1, t0 + timedelta(minutes=5))
+    dispatcher._schedule(2, t0 + timedelta(minutes=1))
+    dispatcher._schedule(1, t0 + timedelta(minutes=2))  # Moved earlier: the old entry goes stale
+    dispatcher._schedule(3, t0 + timedelta(minutes=3))
+    dispatcher._cancel(3)
+    assert len(dispatcher._heap) == 4, "cancel and reschedule don't touch the heap"
+
+    assert dispatcher._next_timeout(t0) == 60.0
+    assert dispatcher._pop_due(t0 + timedelta(minutes=2)) == [2, 1]
+    # Stale entries of 1 and 3 are dropped when they reach the top, never handed out
+    assert dispatcher._next_timeout(t0 + timedelta(minutes=2)) is None and not dispatcher._heap
+    assert dispatcher._pop_due(t0 + timedelta(hours=1)) == []
+
+    # Overdue entries time out right away
+    dispatcher._schedule(4, t0)
+    assert dispatcher._next_timeout(t0 + timedelta(minutes=1)) == 0.0
+
+
+def test_wakes_up_for_due_posts_only(monkeypatch):
+    print("Testing dispatcher wakeups...")
+    woken = []
+
+    async def on_due(post_ids):
+        woken.append(post_ids)
+
+    async def run():
+        dispatcher = await _started(monkeypatch, on_due)
+        try:
+            now = _now()
+            dispatcher.schedule(1, now + timedelta(milliseconds=50))
+            dispatcher.schedule(2, now + timedelta(milliseconds=50))
+            dispatcher.cancel(2)
+            dispatcher.schedule(3, now + timedelta(hours=1))
+            dispatcher.schedule(3, now + timedelta(milliseconds=100))  # Rescheduled earlier
+            # Timezone-aware times from the API are converted to naive UTC
+            dispatcher.schedule_many([(4, datetime.now(timezone.utc) + timedelta(milliseconds=150)), (5, now + timedelta(hours=2))])
+            await asyncio.sleep(0.4)
+            assert woken == [[1], [3], [4]], woken
+            assert list(dispatcher._due_at) == [5]
+        finally:
+            dispatcher._task.cancel()
+
+    asyncio.run(run())
+
+
+def test_submit_and_wait_idle(monkeypatch):
+    print("Testing dispatcher submit/wait_idle...")
+    published = []
+
+    async def on_due(post_ids):
+        pass
+
+    async def executor(post_id, queue_wait_ms):
+        await asyncio.sleep(0.05)
+        if post_id == 2:
+            raise RuntimeError("browser crashed")
+        published.append(post_id)
+
+    async def run():
+        dispatcher = await _started(monkeypatch, on_due, executor)
+        try:
+            assert dispatcher.submit(1, "a") and dispatcher.submit(2, "b")
+            assert not dispatcher.submit(1, "a"), "already queued in this process"
+            await dispatcher.wait_idle()
+            assert published == [1] and not dispatcher._in_flight and not dispatcher._tasks
+            assert dispatcher.submit(1, "a"), "a finished post can be submitted again"
+            await dispatcher.wait_idle()
+            assert published == [1, 1]
+        finally:
+            dispatcher._task.cancel()
+
+    asyncio.run(run())
+
+
+def test_publish_slots_are_bounded_globally_and_per_account(monkeypatch):
+    print("Testing publish concurrency limits...")
+    monkeypatch.setattr(settings, "PUBLISH_CONCURRENCY", 2)
+    running, peak, per_account, waits = set(), [0], {}, {}
+    accounts = {1: "a", 2: "a", 3: "b", 4: "c", 5: "d"}
+
+    async def on_due(post_ids):
+        pass
+
+    async def executor(post_id, queue_wait_ms):
+        account = accounts[post_id]
+        assert account not in per_account.values(), f"two posts of @{account} at once"
+        running.add(post_id)
+        per_account[post_id] = account
+        peak[0] = max(peak[0], len(running))
+        waits[post_id] = queue_wait_ms
+        await asyncio.sleep(0.05)
+        running.discard(post_id)
+        del per_account[post_id]
+
+    async def run():
+        dispatcher = await _started(monkeypatch, on_due, executor)
+        try:
+            for post_id, account in accounts.items():
+                dispatcher.submit(post_id, account)
+            await dispatcher.wait_idle()
+        finally:
+            dispatcher._task.cancel()
+
+    asyncio.run(run())
+    assert peak[0] == 2, "PUBLISH_CONCURRENCY caps the publishes in flight"
+    assert sorted(waits) == [1, 2, 3, 4, 5]
+    assert waits[2] >= 40, "the second post of an account waits for the first"
+    assert max(waits.values()) >= 80, "five posts through two slots take three rounds"
@@ -0,0 +1,65 @@
+from datetime import datetime
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+from backend.db import Base
+from backend.models import Post, PostMetricSnapshot, PostMetricLatest
+
+
+def _plan(db, query) -> str:
+    # EXPLAIN QUERY PLAN with the same bound parameters the app sends
+    compiled = query.statement.compile(db.bind)
+    rows = db.connection().exec_driver_sql(
+        "EXPLAIN QUERY PLAN " + str(compiled), tuple(compiled.params.values())
+    ).fetchall()
+    return " | ".join(row[-1] for row in rows)
+
+
+def test_hot_queries_use_indexes():
+    print("Testing query plans...")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    now = datetime(2026, 1, 1)
+
+    expectations = [
+        ("due scheduled posts",
+         db.query(Post.id).filter(Post.status == "scheduled", Post.scheduled_at <= now),
+         "ix_posts_status_scheduled_at"),
+        ("due retries",
+         db.query(Post.id).filter(Post.status == "failed", Post.next_attempt_at <= now),
+         "ix_posts_status_next_attempt_at"),
+        ("tweet_id lookup (sync/import)",
+         db.query(Post).filter(Post.tweet_id == "123"),
+         "uq_posts_tweet_id"),
+        ("latest own post",
+         db.query(Post).filter(Post.status == "sent", Post.is_repost.isnot(True)).order_by(Post.created_at.desc()).limit(1),
+         "ix_posts_original_status_created_at"),
+        ("account history",
+         db.query(Post).filter(Post.username == "me", Post.status == "sent").order_by(Post.created_at.desc()),
+         "ix_posts_username_status_created_at"),
+        ("thread children",
+         db.query(Post.id).filter(Post.parent_id == 1),
+         "ix_posts_parent_id"),
+        ("due analytics refresh",
+         db.query(Post).filter(Post.next_refresh_at <= now).order_by(Post.next_refresh_at),
+         "ix_posts_next_refresh_at"),
+        ("latest snapshot of a post",
+         db.query(PostMetricSnapshot).filter(PostMetricSnapshot.post_id == 1).order_by(PostMetricSnapshot.timestamp.desc()),
+         "ix_post_metrics_snapshots_post_id_timestamp"),
+        ("last metrics refresh of an account",
+         db.query(func.max(PostMetricLatest.timestamp)).filter(PostMetricLatest.username == "me"),
+         "ix_post_metrics_latest_username_timestamp"),
+    ]
+
+    try:
+        for name, query, index in expectations:
+            plan = _plan(db, query)
+            print(f"{name}: {plan}")
+            assert index in plan, f"{name} does not use {index}: {plan}"
+            assert "TEMP B-TREE" not in plan, f"{name} sorts without an index: {plan}"
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    test_hot_queries_use_indexes()
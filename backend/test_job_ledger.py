@@ -0,0 +1,101 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import pytest
+from apscheduler.events import EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED, JobSubmissionEvent
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from backend.db import Base
+from backend.models import JobRun, Post, PublishAttempt
+from backend.services import job_ledger
+from backend.services.job_ledger import on_job_not_run, track_job
+from backend.services.leases import LEASE_OWNER
+from backend.services.publish_service import apply_publish_result
+
+
+def _ledger(tmp_path, monkeypatch):
+    path = tmp_path / "ledger.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(job_ledger, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(job_ledger, "AsyncSessionLocal", async_sessionmaker(
+        create_async_engine(f"sqlite+aiosqlite:///{path}"), class_=AsyncSession, expire_on_commit=False))
+    return sessionmaker(bind=engine)
+
+
+def test_track_job_records_each_run(tmp_path, monkeypatch):
+    print("Testing the job run ledger...")
+    Session = _ledger(tmp_path, monkeypatch)
+
+    async def run():
+        async with track_job("update_analytics") as stats:
+            stats.items = 3
+        async with track_job("update_analytics") as stats:
+            stats.items, stats.errors = 2, 1
+        with pytest.raises(ValueError):
+            async with track_job("sync_history_job"):
+                raise ValueError("X is down")
+
+    asyncio.run(run())
+    db = Session()
+    try:
+        runs = db.query(JobRun).order_by(JobRun.id).all()
+        assert [(r.job, r.status, r.items, r.errors) for r in runs] == [
+            ("update_analytics", "ok", 3, 0),
+            ("update_analytics", "partial", 2, 1),
+            ("sync_history_job", "error", 0, 1),
+        ]
+        assert runs[2].error == "X is down"
+        assert all(r.finished_at >= r.started_at and r.duration_ms >= 0 for r in runs)
+    finally:
+        db.close()
+
+
+def test_runs_that_never_started_are_recorded(tmp_path, monkeypatch):
+    print("Testing skipped/missed job runs...")
+    Session = _ledger(tmp_path, monkeypatch)
+    missed_at = datetime(2026, 1, 1, 9, 0, tzinfo=timezone.utc)
+
+    # Outside an event loop (scripts): written inline
+    on_job_not_run(JobSubmissionEvent(EVENT_JOB_MISSED, "update_analytics", None, [missed_at]))
+
+    async def on_loop():
+        # AsyncIOScheduler calls listeners on the loop: written by a task
+        on_job_not_run(JobSubmissionEvent(
+            EVENT_JOB_MAX_INSTANCES, "check_scheduled_posts", None, [missed_at, missed_at + timedelta(minutes=1)]
+        ))
+        await asyncio.gather(*job_ledger._pending_records)
+
+    asyncio.run(on_loop())
+    db = Session()
+    try:
+        runs = db.query(JobRun.job, JobRun.status, JobRun.started_at).order_by(JobRun.started_at, JobRun.job).all()
+        assert runs == [
+            ("check_scheduled_posts", "skipped", datetime(2026, 1, 1, 9, 0)),
+            ("update_analytics", "missed", datetime(2026, 1, 1, 9, 0)),
+            ("check_scheduled_posts", "skipped", datetime(2026, 1, 1, 9, 1)),
+        ], "times are stored as naive UTC"
+    finally:
+        db.close()
+
+
+def test_publish_attempt_records_dispatch_lag():
+    print("Testing per-post dispatch lag...")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    due_at = datetime(2026, 1, 1, 9, 0)
+
+    try:
+        post = Post(content="lagging", status="processing", username="a", lease_owner=LEASE_OWNER)
+        db.add(post)
+        db.commit()
+        result = {"success": True, "tweet_id": "5", "timings": {"total_ms": 900, "phases": [{"phase": "compose", "ms": 400, "ok": True}]}}
+        apply_publish_result(db, post, result, "Retry 0", "scheduler", due_at + timedelta(seconds=2.5), 1200, due_at)
+        db.commit()
+
+        attempt = db.query(PublishAttempt).one()
+        assert (attempt.dispatch_lag_ms, attempt.queue_wait_ms, attempt.total_ms) == (2500, 1200, 900)
+        assert attempt.success and '"compose"' in attempt.phases
+    finally:
+        db.close()
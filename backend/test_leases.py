@@ -0,0 +1,187 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import pytest
+from fastapi import BackgroundTasks, HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from backend.db import Base
+from backend.models import Post, PublishAttempt
+from backend.routes.posts import update_post
+from backend.schemas import PostUpdate
+from backend.services import leases
+from backend.services.leases import claim_post, claimable_filter
+from backend.services.publish_service import apply_publish_result
+
+
+def _sessions(tmp_path):
+    # A file database so each replica gets its own connection
+    engine = create_engine(f"sqlite:///{tmp_path / 'leases.db'}")
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+def test_only_one_replica_claims_a_due_post(tmp_path, monkeypatch):
+    print("Testing competing claims...")
+    Session = _sessions(tmp_path)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    first, second = Session(), Session()
+
+    try:
+        post = Post(content="due", status="scheduled", username="a", scheduled_at=now - timedelta(minutes=1))
+        first.add(post)
+        first.commit()
+        assert first.query(Post.id).filter(claimable_filter(now)).all() == [(post.id,)]
+
+        monkeypatch.setattr(leases, "LEASE_OWNER", "replica-a")
+        assert claim_post(first, post.id)
+        monkeypatch.setattr(leases, "LEASE_OWNER", "replica-b")
+        assert not claim_post(second, post.id), "a held lease can't be claimed again"
+
+        first.refresh(post)
+        assert post.status == "processing" and post.lease_owner == "replica-a"
+        assert first.query(Post.id).filter(claimable_filter(datetime.now(timezone.utc).replace(tzinfo=None))).count() == 0
+    finally:
+        first.close()
+        second.close()
+
+
+def test_expired_lease_is_reclaimed_and_the_stale_result_dropped(tmp_path, monkeypatch):
+    print("Testing expired lease takeover...")
+    Session = _sessions(tmp_path)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    db = Session()
+
+    try:
+        # replica-a died (or stalled) mid-publish: its lease ran out a minute ago
+        post = Post(content="stuck", status="processing", username="a", retry_count=0,
+                    lease_owner="replica-a", lease_expires_at=now - timedelta(minutes=1))
+        db.add(post)
+        db.commit()
+
+        monkeypatch.setattr(leases, "LEASE_OWNER", "replica-b")
+        assert claim_post(db, post.id)
+        db.refresh(post)
+        assert post.lease_owner == "replica-b" and post.lease_expires_at > now
+
+        # replica-a comes back with its result: recorded as an attempt, the post is left to replica-b
+        monkeypatch.setattr(leases, "LEASE_OWNER", "replica-a")
+        assert not apply_publish_result(db, post, {"success": False, "error": "timeout"}, "Retry 0", "scheduler", now)
+        db.commit()
+        db.refresh(post)
+        assert post.status == "processing" and post.lease_owner == "replica-b"
+        assert post.next_attempt_at is None and "timeout" not in (post.logs or "")
+        assert db.query(PublishAttempt).filter(PublishAttempt.post_id == post.id).count() == 1
+
+        # The current owner's result goes through and frees the post
+        monkeypatch.setattr(leases, "LEASE_OWNER", "replica-b")
+        assert apply_publish_result(db, post, {"success": True, "tweet_id": "42", "log": "ok"}, "Retry 0", "scheduler", now)
+        db.commit()
+        db.refresh(post)
+        assert post.status == "sent" and post.tweet_id == "42" and post.lease_owner is None
+    finally:
+        db.close()
+
+
+def test_publish_now_does_not_take_a_live_lease(tmp_path, monkeypatch):
+    print("Testing 'publish now' on a post being published...")
+    Session = _sessions(tmp_path)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    db = Session()
+    monkeypatch.setattr(leases, "LEASE_OWNER", "replica-b")
+
+    try:
+        busy = Post(content="busy", status="processing", username="a",
+                    lease_owner="replica-a", lease_expires_at=now + timedelta(minutes=1))
+        sent = Post(content="sent", status="sent", username="a", tweet_id="7")
+        stuck = Post(content="stuck", status="processing", username="a",
+                     lease_owner="replica-a", lease_expires_at=now - timedelta(minutes=1))
+        db.add_all([busy, sent, stuck])
+        db.commit()
+
+        for post in (busy, sent):
+            tasks = BackgroundTasks()
+            with pytest.raises(HTTPException) as conflict:
+                update_post(post.id, PostUpdate(status="immediate", content="edited"), tasks, db)
+            assert conflict.value.status_code == 409 and not tasks.tasks
+            db.refresh(post)
+            assert post.content != "edited", "the edit is rejected too"
+        assert busy.lease_owner == "replica-a" and busy.status == "processing"
+        assert sent.status == "sent"
+
+        # An expired lease is up for grabs
+        tasks = BackgroundTasks()
+        updated = update_post(stuck.id, PostUpdate(status="immediate", content="edited"), tasks, db)
+        assert updated.status == "processing" and updated.lease_owner == "replica-b" and updated.content == "edited"
+        assert len(tasks.tasks) == 1
+    finally:
+        db.close()
+
+
+class RecordingDispatcher:
+    def __init__(self):
+        self.submitted, self.cancelled = [], []
+
+    def submit(self, post_id, username):
+        self.submitted.append(post_id)
+        return True
+
+    def cancel(self, post_id):
+        self.cancelled.append(post_id)
+
+
+def test_release_children_follows_the_parent_result(tmp_path, monkeypatch):
+    print("Testing thread child release...")
+    Session = _sessions(tmp_path)
+    monkeypatch.setattr(leases, "AsyncSessionLocal", async_sessionmaker(
+        create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'leases.db'}"), class_=AsyncSession, expire_on_commit=False))
+    recorder = RecordingDispatcher()
+    monkeypatch.setattr(leases, "dispatcher", recorder)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    db = Session()
+
+    def thread(parent_status, **parent):
+        root = Post(content="1/3", status=parent_status, username="a", **parent)
+        db.add(root)
+        db.flush()
+        due = Post(content="2/3", status="scheduled", username="a", parent_id=root.id, scheduled_at=now - timedelta(seconds=1))
+        later = Post(content="2b", status="scheduled", username="a", parent_id=root.id, scheduled_at=now + timedelta(hours=1))
+        db.add_all([due, later])
+        db.flush()
+        grandchild = Post(content="3/3", status="scheduled", username="a", parent_id=due.id, scheduled_at=now - timedelta(seconds=1))
+        db.add(grandchild)
+        db.commit()
+        return root.id, due.id, later.id, grandchild.id
+
+    try:
+        # Parent published: its due child goes out now, the later one keeps its time, the grandchild waits
+        root, due, later, grandchild = thread("sent", tweet_id="100")
+        asyncio.run(leases.release_children(root))
+        assert recorder.submitted == [due] and not recorder.cancelled
+
+        # Parent failed with a retry pending: nothing to decide yet
+        recorder.submitted.clear()
+        root, due, later, grandchild = thread("failed", next_attempt_at=now + timedelta(minutes=5))
+        asyncio.run(leases.release_children(root))
+        assert not recorder.submitted and not recorder.cancelled
+        assert db.get(Post, due).status == "scheduled"
+
+        # Parent failed for good: the whole thread below it fails instead of waiting forever
+        db.get(Post, root).next_attempt_at = None
+        db.commit()
+        asyncio.run(leases.release_children(root))
+        db.expire_all()
+        for post_id in (due, later, grandchild):
+            post = db.get(Post, post_id)
+            assert post.status == "failed" and post.next_attempt_at is None, post.content
+            assert "failed. Not published" in post.logs
+        assert sorted(recorder.cancelled) == sorted([due, later, grandchild]) and not recorder.submitted
+
+        # Parent deleted: its children no longer wait on anything
+        root, due, later, grandchild = thread("scheduled", scheduled_at=now)
+        db.delete(db.get(Post, root))
+        db.commit()
+        asyncio.run(leases.release_children(root))
+        assert recorder.submitted == [due]
+    finally:
+        db.close()
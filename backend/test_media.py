@@ -0,0 +1,102 @@
+import json
+import os
+import struct
+import tempfile
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from backend.db import Base
+from backend.models import Post, PostMedia
+from backend.services.media_probe import probe_media
+from backend.services.media_service import delete_post_media, media_for_publish, sync_post_media
+
+
+def _box(kind: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I", 8 + len(payload)) + kind + payload
+
+
+def _mp4(brand: bytes = b"isom") -> bytes:
+    ftyp = _box(b"ftyp", brand + b"\0\0\0\0")
+    # mvhd v0: version/flags, creation, modification, timescale, duration
+    mvhd = _box(b"mvhd", struct.pack(">IIIII", 0, 0, 0, 1000, 12500) + b"\0" * 80)
+    # tkhd v0: width/height (16.16) are the last 8 of 84 bytes
+    tkhd = _box(b"tkhd", b"\0" * 76 + struct.pack(">II", 1280 << 16, 720 << 16))
+    return ftyp + _box(b"moov", mvhd + _box(b"trak", tkhd))
+
+
+FIXTURES = {
+    "image.png": (b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", 640, 480) + b"\x08\x06\0\0\0",
+                  "image/png", (640, 480)),
+    "image.jpg": (b"\xff\xd8" + b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\0" + b"\0" * 9
+                  + b"\xff\xc0" + struct.pack(">HBHH", 17, 8, 300, 400) + b"\0" * 10,
+                  "image/jpeg", (400, 300)),
+    "image.gif": (b"GIF89a" + struct.pack("<HH", 32, 16) + b"\0" * 6, "image/gif", (32, 16)),
+    "image.webp": (b"RIFF" + struct.pack("<I", 30) + b"WEBPVP8X" + struct.pack("<I", 10) + b"\0" * 4
+                   + (99).to_bytes(3, "little") + (49).to_bytes(3, "little"),
+                   "image/webp", (100, 50)),
+    "video.mp4": (_mp4(), "video/mp4", (1280, 720)),
+    "clip.mov": (_mp4(b"qt  "), "video/quicktime", (1280, 720)),
+    "photo.heic": (_box(b"ftyp", b"heic\0\0\0\0mif1heic"), "image/heic", None),
+    "photo.avif": (_box(b"ftyp", b"avif\0\0\0\0mif1avif"), "image/avif", None),
+}
+
+
+def test_probe_media_headers():
+    print("Testing media header probing...")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, (data, mime, dimensions) in FIXTURES.items():
+            path = os.path.join(tmp, name)
+            with open(path, "wb") as f:
+                f.write(data)
+            info = probe_media(path)
+            assert info["mime_type"] == mime, f"{name}: {info['mime_type']}"
+            assert info["size_bytes"] == len(data)
+            if dimensions:
+                assert (info["width"], info["height"]) == dimensions, f"{name}: {info['width']}x{info['height']}"
+        assert probe_media(os.path.join(tmp, "video.mp4"))["duration_ms"] == 12500
+
+
+def test_post_media_sync_delete_and_publish():
+    print("Testing post_media sync, delete and publish checks...")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        png = os.path.join(tmp, "image.png")
+        with open(png, "wb") as f:
+            f.write(FIXTURES["image.png"][0])
+        missing = os.path.join(tmp, "gone.png")
+        remote = "https://pbs.twimg.com/media/abc.jpg"
+
+        try:
+            post = Post(content="with media", media_paths=json.dumps([remote, png, missing]))
+            db.add(post)
+            db.flush()
+            rows = sync_post_media(db, post)
+            db.commit()
+            assert [m.status for m in rows] == ["remote", "ready", "missing"]
+            assert post.has_media
+
+            media, error = media_for_publish(db, post)
+            assert media == [] and "gone.png (missing)" in error
+
+            # Remote URLs (e.g. a clone of an imported tweet) are skipped, not failed
+            post.media_paths = json.dumps([remote, png])
+            sync_post_media(db, post)
+            db.commit()
+            media, error = media_for_publish(db, post)
+            assert error is None and media == [{"path": os.path.abspath(png), "mime_type": "image/png", "size_bytes": 29}]
+            assert db.query(PostMedia).filter(PostMedia.path == missing).count() == 0, "unlisted rows are dropped"
+
+            # A deleted post's attachments go with it, so a reused id starts clean
+            post_id = post.id
+            delete_post_media(db, post_id)
+            db.delete(post)
+            db.commit()
+            text_only = Post(content="text only")
+            db.add(text_only)
+            db.commit()
+            assert text_only.id == post_id
+            assert media_for_publish(db, text_only) == ([], None)
+        finally:
+            db.close()
@@ -0,0 +1,82 @@
+import json
+import struct
+from sqlalchemy import create_engine, inspect, text
+from backend import migrate
+from backend.services.content_hash import content_hash
+
+# The schema create_all produced before versioned migrations existed
+BASELINE_SCHEMA = [
+    """CREATE TABLE posts (
+        id INTEGER NOT NULL, content TEXT NOT NULL, media_paths VARCHAR, scheduled_at DATETIME,
+        status VARCHAR, created_at DATETIME, updated_at DATETIME, logs TEXT, screenshot_path VARCHAR,
+        retry_count INTEGER, parent_id INTEGER, tweet_id VARCHAR, views_count INTEGER, likes_count INTEGER,
+        reposts_count INTEGER, bookmarks_count INTEGER, replies_count INTEGER, url_link_clicks INTEGER,
+        user_profile_clicks INTEGER, detail_expands INTEGER, username VARCHAR, media_url VARCHAR,
+        is_repost BOOLEAN, tags VARCHAR,
+        PRIMARY KEY (id), FOREIGN KEY(parent_id) REFERENCES posts (id)
+    )""",
+    "CREATE INDEX ix_posts_id ON posts (id)",
+    """CREATE TABLE account_metrics (
+        id INTEGER NOT NULL, username VARCHAR, followers_count INTEGER, following_count INTEGER,
+        timestamp DATETIME, PRIMARY KEY (id)
+    )""",
+    "CREATE INDEX ix_account_metrics_id ON account_metrics (id)",
+    "CREATE INDEX ix_account_metrics_username ON account_metrics (username)",
+    """CREATE TABLE post_metrics_snapshots (
+        id INTEGER NOT NULL, post_id INTEGER NOT NULL, views INTEGER, likes INTEGER, reposts INTEGER,
+        bookmarks INTEGER, replies INTEGER, url_link_clicks INTEGER, user_profile_clicks INTEGER,
+        detail_expands INTEGER, timestamp DATETIME,
+        PRIMARY KEY (id), FOREIGN KEY(post_id) REFERENCES posts (id)
+    )""",
+    "CREATE INDEX ix_post_metrics_snapshots_id ON post_metrics_snapshots (id)",
+]
+
+
+def test_baseline_database_migrates_to_latest(tmp_path, monkeypatch):
+    print("Testing migrations from the baseline schema...")
+    engine = create_engine(f"sqlite:///{tmp_path / 'baseline.db'}")
+    monkeypatch.setattr(migrate, "engine", engine)
+    image = tmp_path / "image.png"
+    image.write_bytes(b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", 64, 32) + b"\x08\x06\0\0\0")
+
+    with engine.begin() as conn:
+        for statement in BASELINE_SCHEMA:
+            conn.execute(text(statement))
+        conn.execute(text(
+            "INSERT INTO posts (id, content, status, created_at, updated_at, retry_count, tweet_id, username, views_count, media_paths) VALUES "
+            "(1, 'Sent with media', 'sent', '2026-01-01 09:00:00', '2026-01-01 09:00:00', 0, '100', 'a', 50, :media), "
+            "(2, 'A draft', 'draft', NULL, NULL, 0, NULL, 'a', NULL, NULL)"
+        ), {"media": json.dumps([str(image)])})
+        conn.execute(text("INSERT INTO post_metrics_snapshots (post_id, views, likes, timestamp) VALUES (1, 50, 5, '2026-01-02 00:00:00')"))
+
+    migrate.run_migrations()
+
+    with engine.connect() as conn:
+        versions = conn.execute(text("SELECT version FROM schema_migrations ORDER BY version")).scalars().all()
+        assert versions == [m[0] for m in migrate.MIGRATIONS], f"stopped after {versions[-1:]}"
+
+        inspector = inspect(conn)
+        indexes = {i["name"] for i in inspector.get_indexes("posts")}
+        assert {"uq_posts_tweet_id", "ix_posts_has_media", "ix_posts_created_at", "ix_posts_content_hash"} <= indexes
+        assert "ix_post_metrics_snapshots_post_id_timestamp" in {i["name"] for i in inspector.get_indexes("post_metrics_snapshots")}
+
+        post = conn.execute(text("SELECT has_media, content_hash, published_at FROM posts WHERE id = 1")).one()
+        assert post.has_media and post.content_hash == content_hash("Sent with media") and post.published_at
+        media = conn.execute(text("SELECT post_id, position, status, mime_type, width, height FROM post_media")).all()
+        assert media == [(1, 0, "ready", "image/png", 64, 32)]
+        assert conn.execute(text("SELECT post_id, views FROM post_metrics_latest")).all() == [(1, 50)]
+        assert conn.execute(text("SELECT created_at IS NOT NULL FROM posts WHERE id = 2")).scalar()
+
+    # Up to date: the second run applies nothing
+    migrate.run_migrations()
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM schema_migrations")).scalar() == len(migrate.MIGRATIONS)
+
+        # Steps are idempotent: a database that predates schema_migrations goes through all of them again
+        conn.execute(text("DELETE FROM schema_migrations"))
+        conn.commit()
+    migrate.run_migrations()
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM schema_migrations")).scalar() == len(migrate.MIGRATIONS)
+        assert conn.execute(text("SELECT COUNT(*) FROM post_media")).scalar() == 1
+        assert conn.execute(text("SELECT COUNT(*) FROM post_metrics_latest")).scalar() == 1
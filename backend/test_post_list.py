@@ -0,0 +1,45 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from backend.db import Base
+from backend.models import Post
+from backend.services.post_list import DEFAULT_FIELDS, list_posts, parse_fields
+
+
+def test_list_posts_pages_and_projects():
+    print("Testing post listing...")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+
+    try:
+        for i in range(25):
+            db.add(Post(content=f"post {i}", status="quarantine" if i % 5 == 0 else "sent",
+                        username="a" if i % 2 else "b", logs="long log " * 100))
+        db.commit()
+
+        page, cursor = list_posts(db, limit=10)
+        assert "logs" not in page[0] and "screenshot_path" not in page[0]
+        assert set(page[0]) == set(DEFAULT_FIELDS)
+
+        seen = [p["id"] for p in page]
+        while cursor:
+            page, cursor = list_posts(db, limit=10, cursor=cursor)
+            seen += [p["id"] for p in page]
+        assert seen == sorted(seen, reverse=True) and len(seen) == len(set(seen)) == 20, "quarantine is excluded"
+
+        # Old offset paging still lands on the same pages, and hands over to the cursor
+        _, cursor = list_posts(db, limit=10)
+        second, _ = list_posts(db, limit=10, skip=10)
+        assert [p["id"] for p in second] == seen[10:20]
+        assert [p["id"] for p in list_posts(db, limit=10, cursor=cursor)[0]] == seen[10:20]
+        with pytest.raises(ValueError):
+            list_posts(db, skip=10, cursor=cursor)
+
+        page, cursor = list_posts(db, status="quarantine", username="b", fields=parse_fields("logs,content"))
+        assert cursor is None and [set(p) for p in page] == [{"id", "logs", "content"}] * 3
+
+        with pytest.raises(ValueError):
+            parse_fields("content,password")
+    finally:
+        db.close()
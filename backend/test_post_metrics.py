@@ -0,0 +1,75 @@
+from datetime import datetime
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from backend.db import Base
+from backend.models import Post, PostMetricLatest, PostMetricSnapshot
+from backend.services.post_metrics import apply_scraped_stats, drop_latest_metrics, last_metrics_refresh, metrics_changed, record_snapshot
+from worker.http_transport import parse_tweet_result
+
+
+def test_latest_metrics_follow_the_post():
+    print("Testing post_metrics_latest upkeep...")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+
+    try:
+        old = Post(content="old", status="sent", username="a", views_count=10)
+        new = Post(content="new", status="sent", username="a", views_count=5)
+        db.add_all([old, new])
+        db.flush()
+        record_snapshot(db, old, datetime(2026, 1, 1))
+        record_snapshot(db, new, datetime(2026, 2, 1))
+        db.commit()
+        assert not metrics_changed(db, new)
+        assert last_metrics_refresh(db, "a") == datetime(2026, 2, 1)
+
+        # Deleting the post takes its latest row along
+        new_id = new.id
+        drop_latest_metrics(db, new_id)
+        db.delete(new)
+        db.commit()
+        assert last_metrics_refresh(db, "a") == datetime(2026, 1, 1)
+
+        # A post that reuses the id starts without someone else's metrics
+        reused = Post(content="reused", status="sent", username="b", views_count=0)
+        db.add(reused)
+        db.commit()
+        assert reused.id == new_id
+        assert db.get(PostMetricLatest, reused.id) is None and metrics_changed(db, reused)
+    finally:
+        db.close()
+
+
+def test_http_scrape_keeps_deep_analytics():
+    print("Testing HTTP stats scrapes against deep analytics...")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+
+    try:
+        # Click counts from an earlier browser scrape
+        post = Post(content="clicks", status="sent", username="a", tweet_id="1790000000000000000", views_count=100,
+                    url_link_clicks=7, user_profile_clicks=3, detail_expands=12)
+        db.add(post)
+        db.flush()
+
+        tweet = parse_tweet_result({
+            "rest_id": post.tweet_id, "views": {"count": "250"},
+            "legacy": {"id_str": post.tweet_id, "full_text": "clicks", "favorite_count": 9},
+        })
+        assert "url_link_clicks" not in tweet, "the HTTP read can't see deep analytics"
+        apply_scraped_stats(post, {key: tweet[key] for key in ("views", "likes", "reposts", "replies", "bookmarks")})
+        record_snapshot(db, post, datetime(2026, 3, 1))
+        db.commit()
+
+        assert (post.views_count, post.likes_count) == (250, 9)
+        assert (post.url_link_clicks, post.user_profile_clicks, post.detail_expands) == (7, 3, 12)
+        snapshot = db.query(PostMetricSnapshot).one()
+        assert (snapshot.views, snapshot.url_link_clicks, snapshot.detail_expands) == (250, 7, 12)
+
+        # A browser scrape reports them, zeros included
+        apply_scraped_stats(post, {"views": 260, "url_link_clicks": 0})
+        assert post.views_count == 260 and post.url_link_clicks == 0 and post.detail_expands == 12
+    finally:
+        db.close()
@@ -0,0 +1,23 @@
+from datetime import datetime, timedelta
+from backend.services.refresh_planner import plan_next_refresh
+
+
+def test_refresh_interval_follows_post_age():
+    print("Testing refresh planner tiers...")
+    published = datetime(2026, 1, 1, 12, 0)
+
+    for age, interval in [
+        (timedelta(0), timedelta(minutes=15)),
+        (timedelta(hours=6) - timedelta(seconds=1), timedelta(minutes=15)),
+        (timedelta(hours=6), timedelta(hours=1)),  # Tier boundaries belong to the next, slower tier
+        (timedelta(hours=48) - timedelta(seconds=1), timedelta(hours=1)),
+        (timedelta(hours=48), timedelta(days=1)),
+        (timedelta(days=7) - timedelta(seconds=1), timedelta(days=1)),
+    ]:
+        now = published + age
+        assert plan_next_refresh(published, now) == now + interval, age
+
+    # Settled after a week, unknown publish time: off the refresh queue
+    assert plan_next_refresh(published, published + timedelta(days=7)) is None
+    assert plan_next_refresh(published, published + timedelta(days=30)) is None
+    assert plan_next_refresh(None, published) is None
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from backend.config import settings
+from backend.db import Base
+from backend.models import Post
+from backend.services.leases import LEASE_OWNER, claim_post, claimable_filter
+from backend.services.publish_service import apply_publish_result, next_retry_at
+
+
+def test_backoff_doubles_with_jitter_and_a_cap(monkeypatch):
+    print("Testing retry backoff...")
+    monkeypatch.setattr(settings, "RETRY_BASE_SECONDS", 300)
+    monkeypatch.setattr(settings, "RETRY_MAX_SECONDS", 3600)
+    now = datetime(2026, 1, 1)
+
+    for retry_count, delay in [(0, 300), (1, 600), (2, 1200), (3, 2400), (4, 3600), (10, 3600)]:
+        waits = [(next_retry_at(retry_count, now) - now).total_seconds() for _ in range(200)]
+        # Second half of the delay is random: never sooner than half, never later than the full delay
+        assert all(delay / 2 <= w <= delay for w in waits), (retry_count, min(waits), max(waits))
+        assert len(set(waits)) > 1, "posts that failed together don't retry together"
+
+
+def test_failed_publish_retries_until_the_budget_is_spent(monkeypatch):
+    print("Testing next_attempt_at scheduling...")
+    monkeypatch.setattr(settings, "PUBLISH_MAX_RETRIES", 2)
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    started = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    try:
+        post = Post(content="flaky", status="scheduled", username="a", scheduled_at=started - timedelta(minutes=1))
+        db.add(post)
+        db.commit()
+
+        attempts = []
+        for _ in range(3):
+            assert claim_post(db, post.id)
+            db.refresh(post)
+            assert post.lease_owner == LEASE_OWNER
+            attempts.append(post.retry_count)
+            assert apply_publish_result(db, post, {"success": False, "error": "timeout"}, f"Retry {post.retry_count}", "scheduler", started)
+            db.commit()
+            if post.next_attempt_at is None:
+                break
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            assert post.status == "failed" and post.next_attempt_at > now
+            assert not db.query(Post.id).filter(claimable_filter(now)).count(), "not due before next_attempt_at"
+            # Fast-forward to the retry time
+            post.next_attempt_at = now - timedelta(seconds=1)
+            db.commit()
+
+        # First attempt, then one claim per retry, each counted when the failed post is claimed
+        assert attempts == [0, 1, 2]
+        assert post.status == "failed" and post.next_attempt_at is None
+        assert not db.query(Post.id).filter(claimable_filter(datetime.now(timezone.utc).replace(tzinfo=None))).count()
+    finally:
+        db.close()
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from backend.db import Base
+from backend.models import Post
+from backend.services.search import install_search_index, search_posts
+
+
+def test_search_ranks_filters_and_pages():
+    print("Testing full-text search...")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    start = datetime(2026, 1, 1)
+
+    try:
+        # Rows written before the index exists are picked up by its rebuild
+        db.add(Post(content="Nueva publicación sobre Python", status="sent", username="a", tags="tech,ai", created_at=start))
+        db.commit()
+        with engine.begin() as conn:
+            install_search_index(conn)
+
+        for i in range(30):
+            db.add(Post(content=f"python tip {i}" + (" python python" if i == 7 else ""), status="draft" if i % 2 else "sent",
+                        username="b", tags="tech", created_at=start + timedelta(hours=i)))
+        db.add(Post(content="quarantined python", status="quarantine", created_at=start))
+        db.add(Post(content="ops notes", status="draft", tags="ml_ops", created_at=start))
+        db.commit()
+
+        posts, _ = search_posts(db, "publicacion")
+        assert [p.content for p in posts] == ["Nueva publicación sobre Python"], "accents should be folded"
+
+        posts, _ = search_posts(db, "python", limit=1)
+        assert posts[0].content.endswith("python python"), "densest match should rank first"
+
+        posts, _ = search_posts(db, "pyth", status="sent", tag="ai")
+        assert [p.username for p in posts] == ["a"], "prefix match + filters"
+        # LIKE wildcards in a tag are matched literally
+        assert search_posts(db, None, tag="_")[0] == [] and search_posts(db, None, tag="%")[0] == []
+        assert search_posts(db, None, tag="t_ch")[0] == [] and search_posts(db, None, tag="te%")[0] == []
+        assert [p.content for p in search_posts(db, None, tag="ml_ops")[0]] == ["ops notes"]
+        assert search_posts(db, None, tag="ml%ops")[0] == []
+
+        seen, cursor = [], None
+        while True:
+            posts, cursor = search_posts(db, "python tip", limit=7, cursor=cursor)
+            seen += [p.id for p in posts]
+            if not cursor:
+                break
+        assert len(seen) == len(set(seen)) == 30, "keyset pages must not repeat or skip"
+
+        newest, _ = search_posts(db, None, username="b", limit=2)
+        assert [p.content for p in newest] == ["python tip 29", "python tip 28"]
+
+        post = db.query(Post).filter(Post.content == "python tip 3").one()
+        post.content = "zebra"
+        db.commit()
+        assert [p.id for p in search_posts(db, "zebra")[0]] == [post.id]
+        db.delete(post)
+        db.commit()
+        assert search_posts(db, "zebra")[0] == []
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    test_search_ranks_filters_and_pages()
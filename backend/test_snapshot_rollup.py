@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from backend.config import settings
+from backend.db import Base
+from backend.models import Post, PostMetricSnapshot, PostMetricRollup
+from backend.services.snapshot_rollup import compact_snapshots, load_post_history
+
+
+def test_rollup_keeps_totals_and_tiers():
+    print("Testing snapshot rollups...")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    now = datetime(2026, 6, 1, 12, 0)
+    start = now - timedelta(days=120)
+
+    try:
+        post = Post(content="x", status="sent", tweet_id="1")
+        db.add(post)
+        db.commit()
+        # Every 30 minutes for 120 days, one view per sample
+        db.execute(PostMetricSnapshot.__table__.insert(), [
+            {"post_id": post.id, "views": i, "likes": i // 10, "timestamp": start + timedelta(minutes=30 * i)}
+            for i in range(120 * 48)
+        ])
+        db.commit()
+
+        compact_snapshots(db, now)
+        assert compact_snapshots(db, now) == {"raw": 0, "hourly": 0, "expired": 0}, "re-run should be a no-op"
+
+        history = load_post_history(db, post.id)
+        tiers = [point["tier"] for point in history]
+        assert tiers == sorted(tiers, key=["day", "hour", "raw"].index), "tiers out of order"
+        assert [p["timestamp"] for p in history] == sorted(p["timestamp"] for p in history)
+        assert history[-1]["views"] == 120 * 48 - 1
+        # Deltas add up to the total growth across every tier
+        assert sum(p["views_delta"] for p in history) == history[-1]["views"]
+        assert db.query(PostMetricSnapshot).filter(
+            PostMetricSnapshot.timestamp < now - timedelta(days=settings.SNAPSHOT_RAW_DAYS + 1)
+        ).count() == 0
+
+        original = settings.SNAPSHOT_RETENTION_DAYS
+        settings.SNAPSHOT_RETENTION_DAYS = 100
+        try:
+            assert compact_snapshots(db, now)["expired"] > 0
+        finally:
+            settings.SNAPSHOT_RETENTION_DAYS = original
+        assert db.query(PostMetricRollup).filter(PostMetricRollup.bucket_start < now - timedelta(days=101)).count() == 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    test_rollup_keeps_totals_and_tiers()
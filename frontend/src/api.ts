@@ -64,15 +64,23 @@ const fetchWithToken = async (url: string, options: RequestInit = {}) => {
 };
 
 export const api = {
-    getPosts: async (status?: string): Promise<Post[]> => {
-        const url = status
-            ? `${API_URL}/?status=${encodeURIComponent(status)}`
-            : `${API_URL}/`;
-        const res = await fetchWithToken(url);
+    // The list leaves out logs/screenshot_path unless requested through `fields`
+    getPosts: async (status?: string, fields?: string[]): Promise<Post[]> => {
+        const params = new URLSearchParams();
+        if (status) params.set('status', status);
+        if (fields) params.set('fields', fields.join(','));
+        const query = params.toString();
+        const res = await fetchWithToken(`${API_URL}/${query ? '?' + query : ''}`);
         if (!res.ok) throw new Error('Failed to fetch posts');
         return res.json();
     },
 
+    getPost: async (id: number): Promise<Post> => {
+        const res = await fetchWithToken(`${API_URL}/${id}`);
+        if (!res.ok) throw new Error('Failed to fetch post');
+        return res.json();
+    },
+
     getLatestPost: async (): Promise<Post> => {
         const res = await fetchWithToken(API_URL + '/latest');
         if (!res.ok) throw new Error('Failed to fetch latest post');
@@ -23,6 +23,18 @@ export const PostModal: React.FC<PostModalProps> = ({ isOpen, onClose, onSave, p
     const [parentId, setParentId] = useState<number | undefined>(undefined);
     const [username, setUsername] = useState<string>('');
     const [uploading, setUploading] = useState(false);
+    const [logs, setLogs] = useState<string | undefined>(undefined);
+
+    // Listings don't carry the logs: load them for the opened post
+    useEffect(() => {
+        setLogs(undefined);
+        if (!isOpen || !post?.id) return;
+        let cancelled = false;
+        api.getPost(post.id)
+            .then(full => { if (!cancelled) setLogs(full.logs); })
+            .catch(() => { });
+        return () => { cancelled = true; };
+    }, [isOpen, post?.id]);
 
     // Get thread sequence
     const threadSequence = useMemo(() => {
@@ -331,13 +343,13 @@ export const PostModal: React.FC<PostModalProps> = ({ isOpen, onClose, onSave, p
                             </div>
 
                             {/* Activity Logs (Debug section) */}
-                            {post?.logs && (
+                            {logs && (
                                 <div className="space-y-2">
                                     <label className="text-[11px] font-black text-muted-foreground uppercase tracking-widest ml-1 flex items-center gap-2">
                                         <Terminal size={14} className="text-primary" /> Registro de Actividad
                                     </label>
                                     <div className="w-full p-6 bg-slate-950 rounded-[2rem] font-mono text-[10px] text-emerald-400/80 leading-relaxed overflow-hidden shadow-2xl border border-white/5 whitespace-pre-wrap max-h-40 overflow-y-auto">
-                                        {post.logs}
+                                        {logs}
                                     </div>
                                 </div>
                             )}
@@ -7,7 +7,11 @@ export function useQuarantinePosts() {
 
     const { data: posts = [], isLoading, error, refetch } = useQuery<Post[]>({
         queryKey: ['posts', 'quarantine'],
-        queryFn: () => api.getPosts('quarantine'),
+        // The quarantine reason is in the logs
+        queryFn: () => api.getPosts('quarantine', [
+            'id', 'content', 'status', 'username', 'tweet_id', 'created_at', 'logs',
+            'views_count', 'likes_count', 'reposts_count', 'bookmarks_count', 'replies_count'
+        ]),
         refetchInterval: 30000,
         enabled: !!localStorage.getItem('admin_token'),
     });
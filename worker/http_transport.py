@@ -0,0 +1,239 @@
+import json
+import os
+from datetime import datetime
+from typing import Optional
+
+import httpx
+from loguru import logger
+from backend.config import settings
+
+# Public bearer token used by the x.com web client itself.
+# Authenticated calls still rely on the account cookies (auth_token + ct0).
+WEB_BEARER_TOKEN = "AAAAAAAAAAAAAAAAAAAAANRILgAAAAAAnNwIzUejRCOuH5E6I8xnZz4puTs%3D1Zv7ttfk8LF81IUq16cHjhLTvJu4FA33AGWWjCpTnA"
+
+TWEET_FEATURES = {
+    "creator_subscriptions_tweet_preview_api_enabled": True,
+    "responsive_web_graphql_timeline_navigation_enabled": True,
+    "responsive_web_graphql_skip_user_profile_image_extensions_enabled": False,
+    "longform_notetweets_consumption_enabled": True,
+    "responsive_web_edit_tweet_api_enabled": True,
+    "view_counts_everywhere_api_enabled": True,
+    "tweetypie_unmention_optimization_enabled": True,
+    "freedom_of_speech_not_reach_fetch_enabled": True,
+    "standardized_nudges_misinfo": True,
+    "responsive_web_enhance_cards_enabled": False,
+}
+
+
+class HttpReadTransport:
+    """
+    Read-only access to X through plain authenticated HTTP requests.
+    Uses the same cookies as the browser worker, but no page rendering.
+
+    Every method returns None when the HTTP path cannot answer (network error,
+    unexpected status, schema change...). Callers then fall back to the browser.
+    """
+
+    def __init__(self, base_url: Optional[str] = None, timeout: Optional[float] = None):
+        self.base_url = (base_url or settings.X_HTTP_BASE_URL).rstrip("/")
+        self.timeout = timeout or settings.X_HTTP_TIMEOUT
+        self._client: Optional[httpx.AsyncClient] = None
+        # storage_state path -> (mtime, cookies dict)
+        self._cookie_cache = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # One pooled client for all accounts. Cookies are sent per request,
+        # so connections are shared without mixing sessions.
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                headers={
+                    "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+                    "authorization": f"Bearer {WEB_BEARER_TOKEN}",
+                    "x-twitter-active-user": "yes",
+                    "x-twitter-auth-type": "OAuth2Session",
+                },
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _load_cookies(self, storage_state: str) -> dict:
+        """
+        Reads cookies from a storage_state file (Playwright format or raw cookie list).
+        Cached by file mtime so repeated scrapes don't re-parse the file.
+        """
+        mtime = os.path.getmtime(storage_state)
+        cached = self._cookie_cache.get(storage_state)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        with open(storage_state, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        raw_cookies = data.get("cookies", []) if isinstance(data, dict) else data
+        cookies = {
+            c["name"]: c["value"]
+            for c in raw_cookies
+            if isinstance(c, dict) and c.get("name") and c.get("value") is not None
+        }
+        self._cookie_cache[storage_state] = (mtime, cookies)
+        return cookies
+
+    def _auth_headers(self, storage_state: str) -> Optional[dict]:
+        cookies = self._load_cookies(storage_state)
+        if not cookies.get("auth_token") or not cookies.get("ct0"):
+            return None
+        return {
+            "cookie": "; ".join(f"{k}={v}" for k, v in cookies.items()),
+            "x-csrf-token": cookies["ct0"],
+        }
+
+    async def fetch_tweet(self, tweet_id: str, storage_state: str, username: Optional[str] = None) -> Optional[dict]:
+        """
+        Fetches a single tweet through the GraphQL endpoint used by the web client.
+        Returns a dict shaped like scrape_tweet_from_article() output.
+        Deep analytics (link clicks, profile visits, detail expands) are not exposed here: their keys
+        are left out, so callers keep the values the browser scraper got last time.
+        """
+        try:
+            headers = self._auth_headers(storage_state)
+            if not headers:
+                logger.debug("[HTTP] auth_token/ct0 cookies missing, skipping HTTP read")
+                return None
+
+            params = {
+                "variables": json.dumps({
+                    "tweetId": str(tweet_id),
+                    "withCommunity": False,
+                    "includePromotedContent": False,
+                    "withVoice": False,
+                }),
+                "features": json.dumps(TWEET_FEATURES),
+            }
+            url = f"/i/api/graphql/{settings.X_GRAPHQL_TWEET_QUERY_ID}/TweetResultByRestId"
+            response = await self.client.get(url, params=params, headers=headers)
+            if response.status_code != 200:
+                logger.debug(f"[HTTP] Tweet {tweet_id} returned status {response.status_code}")
+                return None
+
+            result = response.json().get("data", {}).get("tweetResult", {}).get("result")
+            return parse_tweet_result(result, username)
+        except Exception as e:
+            logger.debug(f"[HTTP] Tweet {tweet_id} read failed: {e}")
+            return None
+
+    async def check_session(self, storage_state: str) -> Optional[bool]:
+        """
+        True if the cookies are accepted, False if X rejects them, None if undetermined.
+        """
+        try:
+            headers = self._auth_headers(storage_state)
+            if not headers:
+                # Cookies we can't build headers from (e.g. another login flow): let the browser decide
+                logger.debug("[HTTP] auth_token/ct0 cookies missing, session check left to the browser")
+                return None
+
+            response = await self.client.get("/i/api/1.1/account/settings.json", headers=headers)
+            if response.status_code == 200:
+                return bool(response.json().get("screen_name"))
+            if response.status_code in (401, 403):
+                return False
+            return None
+        except Exception as e:
+            logger.debug(f"[HTTP] Session check failed: {e}")
+            return None
+
+
+def parse_tweet_result(result: Optional[dict], username: Optional[str] = None) -> Optional[dict]:
+    """
+    Maps a GraphQL tweet result onto the scraper's tweet dict.
+    """
+    if not result:
+        return None
+    # Tweets with visibility notices come wrapped once more
+    if result.get("__typename") == "TweetWithVisibilityResults":
+        result = result.get("tweet") or {}
+
+    legacy = result.get("legacy")
+    if not legacy:
+        return None
+
+    tweet_id = legacy.get("id_str") or result.get("rest_id")
+    if not tweet_id:
+        return None
+
+    published_at = None
+    try:
+        # Snowflake formula: (id >> 22) + 1288834974657
+        timestamp_ms = (int(tweet_id) >> 22) + 1288834974657
+        published_at = datetime.utcfromtimestamp(timestamp_ms / 1000.0).isoformat() + "Z"
+    except Exception:
+        pass
+
+    media_url = None
+    media = (legacy.get("extended_entities") or legacy.get("entities") or {}).get("media") or []
+    if media:
+        media_url = media[0].get("media_url_https")
+
+    views = 0
+    try:
+        views = int((result.get("views") or {}).get("count") or 0)
+    except (TypeError, ValueError):
+        pass
+
+    author = (
+        result.get("core", {})
+        .get("user_results", {})
+        .get("result", {})
+        .get("legacy", {})
+        .get("screen_name")
+    )
+
+    # Same "Clean Policy" as the DOM scraper: reposts, replies, quotes and foreign authors are noise
+    is_repost = bool(
+        legacy.get("retweeted_status_result")
+        or legacy.get("in_reply_to_status_id_str")
+        or legacy.get("is_quote_status")
+    )
+    if not is_repost and username and author:
+        is_repost = author.lower() != username.lstrip("@").lower()
+
+    return {
+        "tweet_id": str(tweet_id),
+        "content": legacy.get("full_text") or "",
+        "views": views,
+        "likes": legacy.get("favorite_count", 0) or 0,
+        "reposts": legacy.get("retweet_count", 0) or 0,
+        "replies": legacy.get("reply_count", 0) or 0,
+        "bookmarks": legacy.get("bookmark_count", 0) or 0,
+        "published_at": published_at,
+        "media_url": media_url,
+        "is_repost": is_repost,
+    }
+
+
+_transport: Optional[HttpReadTransport] = None
+
+
+def get_read_transport() -> Optional[HttpReadTransport]:
+    """
+    Returns the shared HTTP read transport, or None when READ_TRANSPORT is 'browser'.
+    """
+    global _transport
+    if settings.READ_TRANSPORT != "http":
+        return None
+    if _transport is None:
+        _transport = HttpReadTransport()
+    return _transport
+
+
+def set_read_transport(transport: Optional[HttpReadTransport]):
+    """Overrides the shared transport (e.g. to point it at a stand-in server)."""
+    global _transport
+    _transport = transport
@@ -10,6 +10,8 @@ import random
 from loguru import logger
 from datetime import datetime
 from .config import XSelectors
+from .http_transport import get_read_transport
+from .timing import PhaseTimer
 from backend.config import settings
 
 # CONFIG
@@ -113,15 +115,33 @@ async def _get_storage_state(username: str, log_func):
             log_func(f"Failed to load cookies from environment: {e}")
             
 
+def _cleanup_temp_cookies(temp_cookies_path):
+    """Removes the temp cookies file created from X_COOKIES_JSON, if any."""
+    if temp_cookies_path and os.path.exists(temp_cookies_path):
+        try:
+            os.unlink(temp_cookies_path)
+        except:
+            pass
+
 async def human_delay(min_s=0.5, max_s=1.5):
     """Randomized delay to simulate human pause."""
     delay = random.uniform(min_s, max_s)
     await asyncio.sleep(delay)
 
-async def publish_post_task(content, media_paths=None, reply_to_id=None, username=None, dry_run=False):
+async def publish_post_task(content, media_paths=None, reply_to_id=None, username=None, dry_run=False, timer=None, media=None):
     """
     Publishes a post (tweet) or reply using Playwright.
+    media is the validated attachment list from post_media ({"path", "mime_type", "size_bytes"}, in order);
+    the raw media_paths string is only parsed and checked on disk when media isn't given.
+    The result carries per-phase "timings". Pass your own PhaseTimer to keep
+    the phases recorded so far when the task is cancelled (e.g. by wait_for).
     """
+    timer = timer or PhaseTimer()
+    result = await _publish_post_task(content, media_paths, reply_to_id, username, dry_run, timer, media)
+    result["timings"] = timer.summary(ok=bool(result.get("success")))
+    return result
+
+async def _publish_post_task(content, media_paths, reply_to_id, username, dry_run, timer, media=None):
     tweet_id = None
     success = False
     screenshot_file = None
@@ -140,6 +160,7 @@ async def publish_post_task(content, media_paths=None, reply_to_id=None, usernam
     if not storage_state:
         return {"success": False, "log": "No cookies found. Please input them.", "screenshot_path": None, "tweet_id": None}
 
+    timer.begin("browser_launch")
     async with async_playwright() as p:
         # Launch with stability and aggressive memory-saving flags
         browser = await p.chromium.launch(
@@ -198,6 +219,7 @@ async def publish_post_task(content, media_paths=None, reply_to_id=None, usernam
                 log(f"🚀 Post Initialization Attempt {attempt+1}/2 (ReplyTo={reply_to_id})")
                 
                 # 1. Navigation
+                timer.begin("navigation")
                 if not is_new_post:
                     # Thread Mode
                     log(f"Thread Mode: Replying to tweet {reply_to_id}...")
@@ -227,6 +249,7 @@ async def publish_post_task(content, media_paths=None, reply_to_id=None, usernam
                         await human_delay(2, 4)
 
                 # 2. Content Entry
+                timer.begin("typing")
                 textarea = page.locator(XSelectors.COMPOSE_BOX_HOME).first
                 if await textarea.is_visible():
                     await textarea.click()
@@ -241,46 +264,55 @@ async def publish_post_task(content, media_paths=None, reply_to_id=None, usernam
 
                 # 3. Media Upload
                 media_confirmed = True # Default if no media
-                if media_paths:
+                if media or media_paths:
+                    timer.begin("upload")
                     media_confirmed = False
-                    log(f"Media paths received (raw): {repr(media_paths)}")
-                    try:
-                        path_list = json.loads(media_paths)
-                        if isinstance(path_list, str):
-                            path_list = [p.strip() for p in path_list.split(',') if p.strip()]
-                    except:
-                        path_list = [p.strip() for p in str(media_paths).split(',') if p.strip()]
+                    if media:
+                        # Checked and described by the backend at upload time (post_media):
+                        # ordered, existing, non-empty files with a known MIME type
+                        valid_paths = [m["path"] for m in media]
+                        is_video = any((m.get("mime_type") or "").startswith("video/") for m in media)
+                        log(f"Uploading {len(valid_paths)} files (isVideo={is_video})")
+                    else:
+                        log(f"Media paths received (raw): {repr(media_paths)}")
+                        try:
+                            path_list = json.loads(media_paths)
+                            if isinstance(path_list, str):
+                                path_list = [p.strip() for p in path_list.split(',') if p.strip()]
+                        except:
+                            path_list = [p.strip() for p in str(media_paths).split(',') if p.strip()]
                     
-                    local_paths = [p for p in path_list if not p.startswith('http')]
-                    if local_paths:
-                        normalized_paths = []
-                        for p in local_paths:
-                            if os.path.exists(p): normalized_paths.append(p)
-                            else:
-                                filename = os.path.basename(p.replace('\\', '/'))
-                                from backend.routes.upload import UPLOAD_DIR as BACKEND_UPLOAD_DIR
-                                alt_path = os.path.join(BACKEND_UPLOAD_DIR, filename)
-                                if os.path.exists(alt_path): normalized_paths.append(alt_path)
-                        valid_paths = normalized_paths
+                        local_paths = [p for p in path_list if not p.startswith('http')]
+                        if local_paths:
+                            normalized_paths = []
+                            for p in local_paths:
+                                if os.path.exists(p): normalized_paths.append(p)
+                                else:
+                                    filename = os.path.basename(p.replace('\\', '/'))
+                                    from backend.routes.upload import UPLOAD_DIR as BACKEND_UPLOAD_DIR
+                                    alt_path = os.path.join(BACKEND_UPLOAD_DIR, filename)
+                                    if os.path.exists(alt_path): normalized_paths.append(alt_path)
+                            valid_paths = normalized_paths
                     
-                    if valid_paths:
-                        is_video = any(p.lower().endswith(('.mp4', '.mov', '.webm', '.ogg', '.m4v')) for p in valid_paths)
+                        if valid_paths:
+                            is_video = any(p.lower().endswith(('.mp4', '.mov', '.webm', '.ogg', '.m4v')) for p in valid_paths)
                         
-                        # Verify files exist and are readable
-                        actually_valid = []
-                        for p in valid_paths:
-                            if os.path.exists(p) and os.path.getsize(p) > 0:
-                                actually_valid.append(p)
-                            else:
-                                log(f"❌ File missing or empty: {p}")
-                        
-                        if not actually_valid:
-                            log("❌ No valid media files to upload. Aborting upload attempt.")
-                            valid_paths = []
-                        else:
-                            valid_paths = actually_valid
-                            log(f"Uploading {len(valid_paths)} files (isVideo={is_video})")
+                            # Verify files exist and are readable
+                            actually_valid = []
+                            for p in valid_paths:
+                                if os.path.exists(p) and os.path.getsize(p) > 0:
+                                    actually_valid.append(p)
+                                else:
+                                    log(f"❌ File missing or empty: {p}")
                         
+                            if not actually_valid:
+                                log("❌ No valid media files to upload. Aborting upload attempt.")
+                                valid_paths = []
+                            else:
+                                valid_paths = actually_valid
+                                log(f"Uploading {len(valid_paths)} files (isVideo={is_video})")
+
+                    if valid_paths:
                         # Removed pre-upload screenshot to save memory
                         
                         # Upload sequence
@@ -345,14 +377,14 @@ async def publish_post_task(content, media_paths=None, reply_to_id=None, usernam
                             # 4. Nuclear Fallback (Drag + Paste)
                             if is_video:
                                 log("⚠️ Nuclear fallback disabled for videos to prevent OOM. Aborting upload attempt.")
-                            elif os.path.getsize(valid_paths[0]) > 10 * 1024 * 1024:
+                            elif (media[0].get("size_bytes") if media else os.path.getsize(valid_paths[0])) > 10 * 1024 * 1024:
                                 log("⚠️ Image too large for nuclear base64 fallback. Skipping.")
                             else:
                                 try:
                                     import base64
                                     with open(valid_paths[0], "rb") as f:
                                         encoded_file = base64.b64encode(f.read()).decode('utf-8')
-                                    mime = "video/mp4" if is_video else "image/png"
+                                    mime = (media[0].get("mime_type") if media else None) or ("video/mp4" if is_video else "image/png")
                                     fname = os.path.basename(valid_paths[0])
                                     
                                     await page.evaluate("""async ({data, name, mime}) => {
@@ -380,6 +412,7 @@ async def publish_post_task(content, media_paths=None, reply_to_id=None, usernam
                                     log(f"Nuclear fallback failed: {fb_e}")
 
                         # 5. Media Confirmation
+                        timer.begin("media_confirm")
                         try:
                             # 5.1 Primary check: Look for the container
                             log("Waiting for attachments container (60s timeout)...")
@@ -425,6 +458,7 @@ async def publish_post_task(content, media_paths=None, reply_to_id=None, usernam
 
             # --- MONITORING & SENDING (CONTINUE) ---
             if is_video:
+                timer.begin("video_processing")
                 log("Video detected. Monitoring video processing status...")
                 
                 # Define tweet button early for monitoring (it's disabled during upload)
@@ -520,9 +554,11 @@ async def publish_post_task(content, media_paths=None, reply_to_id=None, usernam
                     # Abort logic
                     return {"success": False, "error": f"Video processing timed out after {max_wait}s"}
             else:
+                timer.begin("settle")
                 await human_delay(3, 6)
             
             # --- FINAL STATE DIAGNOSTIC ---
+            timer.begin("diagnostic_screenshot")
             try:
                 state_shot = os.path.join(settings.DATA_DIR, "screenshots", f"compose_state_{int(asyncio.get_event_loop().time())}.png")
                 os.makedirs(os.path.dirname(state_shot), exist_ok=True)
@@ -543,6 +579,7 @@ async def publish_post_task(content, media_paths=None, reply_to_id=None, usernam
                              tweet_button = page.locator(XSelectors.BTN_TWEET_MODAL).first
                 
                 # Wait for button to be enabled (upload processing)
+                timer.begin("button_wait")
                 log("Waiting for Tweet button to be enabled...")
                 try:
                     await tweet_button.wait_for(state="attached", timeout=60000)
@@ -594,6 +631,7 @@ async def publish_post_task(content, media_paths=None, reply_to_id=None, usernam
                         log("✅ Final video presence check passed.")
                 
                 # --- EXECUTE SEND ---
+                timer.begin("click")
                 log("Clicking Tweet button (Humanized)...")
                 try:
                     await tweet_button.hover()
@@ -612,6 +650,7 @@ async def publish_post_task(content, media_paths=None, reply_to_id=None, usernam
 
             # --- ID EXTRACTION (Post-Send) ---
             if success and not dry_run:
+                timer.begin("tweet_id_discovery")
                 log("Attempting to retrieve Tweet ID...")
                 try:
                     # Strategy: Click 'Profile' -> Get First Tweet Link
@@ -639,6 +678,7 @@ async def publish_post_task(content, media_paths=None, reply_to_id=None, usernam
                     log(f"ID Extraction failed: {e}")
 
             # Verification Screenshot
+            timer.begin("result_screenshot")
             try:
                 screenshot_file = os.path.join(SCREENSHOTS_DIR, f"result_{random.randint(1000,9999)}.png")
                 await page.screenshot(path=screenshot_file, timeout=5000)
@@ -681,6 +721,18 @@ async def scrape_stats_task(tweet_id: str, username: str = None):
     if not storage_state:
         return {"success": False, "log": "cookies.json missing", "stats": stats}
 
+    # HTTP first: no browser needed to read counters
+    transport = get_read_transport()
+    if transport:
+        tweet = await transport.fetch_tweet(tweet_id, storage_state, username)
+        if tweet:
+            for key in ("views", "likes", "reposts", "replies", "bookmarks"):
+                stats[key] = tweet[key]
+            log(f"Scraped (HTTP): {stats}")
+            _cleanup_temp_cookies(temp_cookies_path)
+            return {"success": True, "log": "\n".join(log_messages), "stats": stats}
+        log("HTTP read failed. Falling back to browser.")
+
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=True)
         try:
@@ -763,11 +815,7 @@ async def scrape_stats_task(tweet_id: str, username: str = None):
         finally:
             await browser.close()
             # Clean up temp file for cookies if it was created
-            if temp_cookies_path and os.path.exists(temp_cookies_path):
-                try:
-                    os.unlink(temp_cookies_path)
-                except:
-                    pass
+            _cleanup_temp_cookies(temp_cookies_path)
 
     return {"success": True, "log": "\n".join(log_messages), "stats": stats}
 
@@ -1345,11 +1393,22 @@ async def import_single_tweet(url: str, username: str):
         log_messages.append(msg)
 
     # Resolve cookies
-    storage_state, _ = await _get_storage_state(username, log)
+    storage_state, temp_cookies_path = await _get_storage_state(username, log)
     if not storage_state:
         return {"success": False, "log": "No cookies found."}
 
     tweet_data = None
+
+    # HTTP first, browser only if the tweet can't be read that way
+    transport = get_read_transport()
+    tweet_id_match = re.search(r'status/(\d+)', url)
+    if transport and tweet_id_match:
+        tweet_data = await transport.fetch_tweet(tweet_id_match.group(1), storage_state, username)
+        if tweet_data:
+            log(f"Successfully fetched tweet over HTTP: {tweet_data['tweet_id']}")
+            _cleanup_temp_cookies(temp_cookies_path)
+            return {"success": True, "log": "\n".join(log_messages), "tweet": tweet_data}
+        log("HTTP read failed. Falling back to browser.")
     
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=True)
@@ -1421,6 +1480,7 @@ async def import_single_tweet(url: str, username: str):
         
         finally:
             await browser.close()
+            _cleanup_temp_cookies(temp_cookies_path)
 
     return {
         "success": bool(tweet_data),
@@ -1438,10 +1498,19 @@ async def check_login_state(username: str) -> dict:
         logger.info(f"[HealthCheck] {msg}")
         log_messages.append(msg)
 
-    storage_state, _ = await _get_storage_state(username, log)
+    storage_state, temp_cookies_path = await _get_storage_state(username, log)
     if not storage_state:
         return {"status": "invalid", "log": "No cookies found"}
 
+    transport = get_read_transport()
+    if transport:
+        is_valid = await transport.check_session(storage_state)
+        if is_valid is not None:
+            log(f"Session checked over HTTP: {'valid' if is_valid else 'invalid'}")
+            _cleanup_temp_cookies(temp_cookies_path)
+            return {"status": "valid" if is_valid else "invalid", "log": "\n".join(log_messages)}
+        log("HTTP session check inconclusive. Falling back to browser.")
+
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=True)
         context = await browser.new_context(
@@ -1467,4 +1536,5 @@ async def check_login_state(username: str) -> dict:
             return {"status": "error", "log": str(e)}
         finally:
             await browser.close()
+            _cleanup_temp_cookies(temp_cookies_path)
 
@@ -0,0 +1,108 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from worker.http_transport import HttpReadTransport
+
+TWEET_ID = "1790000000000000000"
+
+TWEET_PAYLOAD = {
+    "data": {
+        "tweetResult": {
+            "result": {
+                "__typename": "Tweet",
+                "rest_id": TWEET_ID,
+                "core": {"user_results": {"result": {"legacy": {"screen_name": "TestUser"}}}},
+                "views": {"count": "1234"},
+                "legacy": {
+                    "id_str": TWEET_ID,
+                    "full_text": "Hello from the stand-in server",
+                    "favorite_count": 10,
+                    "retweet_count": 3,
+                    "reply_count": 2,
+                    "bookmark_count": 1,
+                },
+            }
+        }
+    }
+}
+
+
+class StandInXHandler(BaseHTTPRequestHandler):
+    """Minimal stand-in for the x.com endpoints used by the HTTP transport."""
+
+    def do_GET(self):
+        if "ct0=csrf" not in (self.headers.get("cookie") or "") or self.headers.get("x-csrf-token") != "csrf":
+            return self._send(401, {"errors": [{"message": "Could not authenticate you"}]})
+        if "/TweetResultByRestId" in self.path and TWEET_ID in self.path:
+            return self._send(200, TWEET_PAYLOAD)
+        if self.path.startswith("/i/api/1.1/account/settings.json"):
+            return self._send(200, {"screen_name": "TestUser"})
+        return self._send(404, {})
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def _write_cookies(cookies):
+    fd, path = tempfile.mkstemp(suffix=".json")
+    with os.fdopen(fd, "w") as f:
+        json.dump({"cookies": cookies, "origins": []}, f)
+    return path
+
+
+def test_http_transport_against_stand_in_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInXHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    valid = _write_cookies([{"name": "auth_token", "value": "abc"}, {"name": "ct0", "value": "csrf"}])
+    expired = _write_cookies([{"name": "auth_token", "value": "abc"}, {"name": "ct0", "value": "old"}])
+    no_csrf = _write_cookies([{"name": "auth_token", "value": "abc"}])
+
+    async def run():
+        transport = HttpReadTransport(base_url=f"http://127.0.0.1:{server.server_address[1]}", timeout=5)
+        try:
+            tweet = await transport.fetch_tweet(TWEET_ID, valid, "TestUser")
+            assert tweet["tweet_id"] == TWEET_ID
+            assert tweet["views"] == 1234
+            assert tweet["likes"] == 10
+            assert tweet["reposts"] == 3
+            assert tweet["is_repost"] is False
+            assert tweet["published_at"].endswith("Z")
+
+            # Unknown tweet or rejected cookies -> None, so callers fall back to the browser
+            assert await transport.fetch_tweet("1", valid, "TestUser") is None
+            assert await transport.fetch_tweet(TWEET_ID, expired, "TestUser") is None
+
+            assert await transport.check_session(valid) is True
+            assert await transport.check_session(expired) is False
+            # No headers to send: undetermined, so the health check still asks the browser
+            assert await transport.check_session(no_csrf) is None
+            assert await transport.fetch_tweet(TWEET_ID, no_csrf, "TestUser") is None
+        finally:
+            await transport.aclose()
+
+    try:
+        asyncio.run(run())
+    finally:
+        server.shutdown()
+        os.unlink(valid)
+        os.unlink(expired)
+        os.unlink(no_csrf)
+
+
+if __name__ == "__main__":
+    test_http_transport_against_stand_in_server()
+    print("SUCCESS: HTTP transport works against stand-in server.")
@@ -0,0 +1,46 @@
+import time
+from typing import Optional
+
+
+class PhaseTimer:
+    """
+    Span-style timer for the publish pipeline.
+    begin() opens a phase and closes the previous one, so long linear flows
+    only need one call per step. Closed spans are kept in order.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+        self._current: Optional[str] = None
+        self._current_start = 0.0
+
+    def begin(self, phase: str):
+        self.end()
+        self._current = phase
+        self._current_start = time.perf_counter()
+
+    def end(self, ok: bool = True):
+        if self._current is None:
+            return
+        self.spans.append({
+            "phase": self._current,
+            "ms": int((time.perf_counter() - self._current_start) * 1000),
+            "ok": ok,
+        })
+        self._current = None
+
+    @property
+    def current(self) -> Optional[str]:
+        return self._current
+
+    def summary(self, ok: bool = True) -> dict:
+        """
+        Closes any open phase and returns {"total_ms", "phases": [...]}.
+        Pass ok=False when the pipeline was interrupted (timeout, crash) so the open phase is flagged.
+        """
+        self.end(ok=ok)
+        return {
+            "total_ms": int((time.perf_counter() - self.started) * 1000),
+            "phases": list(self.spans),
+        }